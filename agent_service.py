@@ -0,0 +1,393 @@
+import os
+import io
+import json
+import hmac
+import time
+import argparse
+import secrets
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# A long-lived local service that keeps CSVs loaded and agents built between
+# commands. `python agent_service.py serve` starts it on localhost; the
+# other subcommands are a thin client that only needs the standard library:
+#
+#   python agent_service.py modify orders_data.csv "reduce TotalAmount by 1"
+#   python agent_service.py audit
+#   python agent_service.py ask "which customers have no orders?"
+#
+# Modification jobs for one file run one at a time against its buffered
+# frame (see write_buffer) and are committed when the job ends; jobs for
+# different files run in parallel. A file changed on disk by someone else
+# is reloaded before the next job touches it.
+#
+# Every request must carry the token `serve` writes (owner-only) to
+# TOKEN_FILE for its port, and POST bodies must be application/json, so a
+# web page open in the user's browser cannot drive the agents.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = int(os.getenv("AGENT_SERVICE_PORT", "8765"))
+MODEL_ID = "mistralai/mistral-small-3.1-24b-instruct:free"
+CLIENT_TIMEOUT = 600
+TOKEN_HEADER = "X-Agent-Service-Token"
+TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".agent_service_{port}.token")
+
+_state = {'started': None, 'files': {}, 'folders': {}, 'lock': threading.Lock(), 'llm': None, 'token': None}
+
+# --- service -----------------------------------------------------------------
+
+def disk_signature(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+def warm_entry(table, key, **fields):
+    # The per-file or per-folder slot, created with its own lock on first use
+    with _state['lock']:
+        if key not in _state[table]:
+            _state[table][key] = dict(lock=threading.Lock(), **fields)
+        return _state[table][key]
+
+def modification_llm():
+    with _state['lock']:
+        if _state['llm'] is None:
+            import data_modification_agent as dma
+            _state['llm'] = dma.make_llm()
+        return _state['llm']
+
+def load_file(entry, path):
+    # (Re)load when the file is new to the service or changed on disk
+    import data_modification_agent as dma
+    from write_buffer import open_buffer, is_dirty
+    signature = disk_signature(path)
+    if entry['buffer'] is not None and signature == entry['signature']:
+        return
+    if entry['buffer'] is not None and is_dirty(entry['buffer']):
+        print(f"'{os.path.basename(path)}' changed on disk; dropping its unsaved edits")
+    entry['buffer'] = open_buffer(path, dma.load_for_editing(path))
+    entry['agent'] = None
+    entry['signature'] = signature
+
+def request_folder(request, default):
+    # The folder a job works on; a bad one is the caller's mistake (400),
+    # not a server error
+    folder = request.get('folder') or default
+    if not os.path.isdir(folder):
+        source = "" if request.get('folder') else " (the default; pass --folder)"
+        raise ValueError(f"CSV folder '{folder}' not found{source}")
+    return folder
+
+def modify_job(request):
+    import data_modification_agent as dma
+    from instruction_compiler import compile_instruction
+    from write_buffer import working_frame, undo, redo, is_dirty
+    from langchain_experimental.agents import create_pandas_dataframe_agent
+
+    folder = request_folder(request, dma.CSV_DIR)
+    filename = request['file']
+    if (not isinstance(filename, str) or os.path.basename(filename) != filename
+            or filename in ('.', '..') or not filename.lower().endswith('.csv')):
+        raise ValueError(f"'{filename}' is not a CSV file name; give the name of a .csv file in the folder")
+    path = os.path.join(folder, filename)
+    # A symlink could still lead out of the folder
+    if os.path.dirname(os.path.realpath(path)) != os.path.realpath(folder):
+        raise ValueError(f"CSV file '{filename}' is outside '{folder}'")
+    if not os.path.isfile(path):
+        raise ValueError(f"CSV file '{filename}' not found in '{folder}'")
+    entry = warm_entry('files', os.path.abspath(path), buffer=None, agent=None, signature=None)
+
+    statuses = []
+    with entry['lock']:
+        load_file(entry, path)
+        buffer = entry['buffer']
+        for instruction in request.get('instructions', []):
+            status = {'instruction': instruction, 'via': 'compiled', 'status': 'applied', 'detail': ''}
+            statuses.append(status)
+            command = instruction.strip().lower()
+            try:
+                if command in ('undo', 'redo'):
+                    status['via'] = command
+                    undone = undo(buffer) if command == 'undo' else redo(buffer)
+                    status['status'] = 'applied' if undone else 'unchanged'
+                    status['detail'] = undone['summary'] if undone else f"nothing to {command}"
+                    continue
+                op = compile_instruction(instruction)
+                if op is not None:
+                    edit, status['detail'] = dma.apply_compiled_edit(buffer, op, instruction, filename)
+                else:
+                    status['via'] = 'agent'
+                    if entry['agent'] is None:
+                        entry['agent'] = create_pandas_dataframe_agent(
+                            modification_llm(), working_frame(buffer), verbose=False, allow_dangerous_code=True
+                        )
+                    response = dma.invoke_agent_edit(entry['agent'], buffer, instruction, filename)
+                    status['detail'] = str(response.get("output"))
+                    edit = dma.finish_agent_edit(entry['agent'], buffer, instruction)
+                if edit is None:
+                    status['status'] = 'unchanged'
+            except Exception as e:
+                status.update(status='failed', detail=str(e))
+
+        saved = False
+        if request.get('save', True) and is_dirty(buffer):
+            saved = dma.commit_buffer(buffer, filename)
+            entry['signature'] = disk_signature(path)
+        return {'file': filename, 'statuses': statuses, 'saved': saved, 'unsaved_edits': is_dirty(buffer)}
+
+def folder_state(folder):
+    # Audit results, loaded tables and the question agent for a folder,
+    # rebuilt whenever any CSV in it changes. Call with the folder lock held.
+    import data_error_recognition_agent as dera
+    from quick_answers import data_fingerprint, load_answer_cache
+    from join_graph import build_join_graph
+
+    entry = warm_entry('folders', os.path.abspath(folder), fingerprint=None)
+    fingerprint = data_fingerprint(folder)
+    if entry['fingerprint'] != fingerprint:
+        analysis_results = dera.analyze_all_csv_files(folder, workers=os.cpu_count() or 1, use_cache=True)
+        dataframes = dera.load_and_prepare_csvs(folder)
+        entry.update(fingerprint=fingerprint, analysis_results=analysis_results, dataframes=dataframes,
+                     graph=build_join_graph(dataframes), integrity=None, agent=None,
+                     answers=load_answer_cache(folder))
+    return entry
+
+def audit_job(request):
+    import data_error_recognition_agent as dera
+    from integrity_check import check_integrity, print_integrity_report
+
+    folder = request_folder(request, dera.CSV_FOLDER)
+    entry = warm_entry('folders', os.path.abspath(folder), fingerprint=None)
+    with entry['lock']:
+        entry = folder_state(folder)
+        out = io.StringIO()
+        dera.print_incorrect_data_summary(entry['analysis_results'], out=out)
+        try:
+            if entry['integrity'] is None:
+                files = [r['file_name'] for r in entry['analysis_results'] if 'error' not in r]
+                entry['integrity'] = check_integrity(folder, files)
+            print_integrity_report(entry['integrity'], out=out)
+        except Exception as e:
+            print(f"Could not run the cross-file key checks: {e}", file=out)
+        return {'report': out.getvalue()}
+
+def ask_job(request):
+    import data_error_recognition_agent as dera
+    from quick_answers import answer_from_analysis, answer_key, save_answer_cache
+    from join_graph import make_view_loader
+    from data_modification_agent import AGENT_TOOL_LOCK
+    from langchain_community.chat_models import ChatOpenAI
+    from langchain_experimental.agents import create_pandas_dataframe_agent
+
+    folder = request_folder(request, dera.CSV_FOLDER)
+    question = request['question'].strip()
+    entry = warm_entry('folders', os.path.abspath(folder), fingerprint=None)
+    with entry['lock']:
+        entry = folder_state(folder)
+        quick = answer_from_analysis(question, entry['analysis_results'])
+        if quick is not None:
+            return {'answer': quick, 'source': 'audit'}
+        key = answer_key(question, entry['fingerprint'])
+        if key in entry['answers']:
+            return {'answer': entry['answers'][key], 'source': 'cache'}
+        if entry['agent'] is None:
+            if not entry['dataframes']:
+                raise ValueError("No CSV files found or data could not be loaded.")
+            entry['agent'] = create_pandas_dataframe_agent(
+                llm=ChatOpenAI(temperature=0, model=MODEL_ID),
+                df=list(entry['dataframes'].values()),
+                prefix=dera.agent_prefix(entry['dataframes'], entry['graph']),
+                verbose=False,
+                allow_dangerous_code=True
+            )
+            entry['agent'].tools[0].locals['view'] = make_view_loader(entry['graph'])
+        with AGENT_TOOL_LOCK:
+            result = entry['agent'].invoke({"input": question})
+        entry['answers'][key] = result["output"]
+        save_answer_cache(folder, entry['answers'])
+        return {'answer': result["output"], 'source': 'agent'}
+
+def status_job(request):
+    from write_buffer import is_dirty
+    files = {path: {'loaded': e['buffer'] is not None, 'agent': e['agent'] is not None,
+                    'unsaved_edits': e['buffer'] is not None and is_dirty(e['buffer'])}
+             for path, e in list(_state['files'].items())}
+    folders = {path: {'tables': len(e.get('dataframes') or {}), 'agent': e.get('agent') is not None}
+               for path, e in list(_state['folders'].items())}
+    return {'uptime_seconds': round(time.time() - _state['started'], 1), 'files': files, 'folders': folders}
+
+JOBS = {'/modify': modify_job, '/audit': audit_job, '/ask': ask_job, '/status': status_job}
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    def reply(self, code, payload):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authorized(self):
+        # Replies with an error and returns False for a request without the
+        # service token
+        token = self.headers.get(TOKEN_HEADER) or ""
+        if not hmac.compare_digest(token.encode(), _state['token'].encode()):
+            self.reply(401, {'error': "missing or wrong service token"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        if self.path != '/status':
+            return self.reply(404, {'error': f"unknown path '{self.path}'"})
+        self.reply(200, status_job({}))
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        if self.headers.get_content_type() != "application/json":
+            return self.reply(415, {'error': "request body must be application/json"})
+        if self.path == '/shutdown':
+            self.reply(200, {'stopping': True})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        job = JOBS.get(self.path)
+        if job is None:
+            return self.reply(404, {'error': f"unknown path '{self.path}'"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            from instrumentation import span
+            with span(f"service{self.path.replace('/', '_')}", kind='service'):
+                self.reply(200, job(request))
+        except (KeyError, ValueError) as e:
+            self.reply(400, {'error': str(e)})
+        except Exception as e:
+            self.reply(500, {'error': repr(e)})
+
+    def log_message(self, format, *args):
+        print(f"[{self.log_date_time_string()}] {format % args}")
+
+def write_token(port):
+    # A new token per run, readable by the user who started the service only
+    _state['token'] = secrets.token_urlsafe(32)
+    path = TOKEN_FILE.format(port=port)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(_state['token'])
+    os.chmod(path, 0o600)
+    return path
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    from dotenv import load_dotenv
+    load_dotenv()
+    os.environ["OPENAI_API_KEY"] = os.getenv("OPENROUTER_MISTRAL_SMALL_API_KEY") or ""
+    os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+    # Pay the heavy imports once, before the first job arrives
+    import data_modification_agent  # noqa: F401
+    import data_error_recognition_agent  # noqa: F401
+    import langchain_experimental.agents  # noqa: F401
+
+    _state['started'] = time.time()
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    token_file = write_token(port)
+    print(f"Agent service listening on http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(token_file):
+            os.remove(token_file)
+        from write_buffer import is_dirty
+        unsaved = [path for path, e in _state['files'].items() if e['buffer'] is not None and is_dirty(e['buffer'])]
+        if unsaved:
+            print(f"Unsaved edits dropped for: {', '.join(unsaved)}")
+        print("Agent service stopped.")
+
+# --- client ------------------------------------------------------------------
+
+def call_service(path, payload=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    token_file = TOKEN_FILE.format(port=port)
+    try:
+        with open(token_file, "r", encoding="utf-8") as f:
+            token = f.read().strip()
+    except OSError:
+        raise urllib.error.URLError(f"no service token at '{token_file}'")
+    data = json.dumps(payload or {}).encode()
+    request = urllib.request.Request(f"http://{host}:{port}{path}", data=data,
+                                     headers={"Content-Type": "application/json", TOKEN_HEADER: token})
+    try:
+        with urllib.request.urlopen(request, timeout=CLIENT_TIMEOUT) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read() or b"{}") or {'error': str(e)}
+
+def print_modify_result(result):
+    for status in result['statuses']:
+        detail = " ".join(status['detail'].split())
+        print(f"  [{status['via']}] {status['status']}: {status['instruction']}"
+              + (f" -> {detail}" if detail else ""))
+    if result['saved']:
+        print(f"Changes saved to '{result['file']}'.")
+    elif result['unsaved_edits']:
+        print(f"Edits to '{result['file']}' are buffered in the service and not saved yet.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-lived local service for the data agents")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="start the service")
+    modify = sub.add_parser("modify", help="apply edit instructions to one CSV")
+    modify.add_argument("file")
+    modify.add_argument("instructions", nargs="+", help="instructions, or 'undo'/'redo'")
+    modify.add_argument("--folder")
+    modify.add_argument("--no-save", action="store_true", help="keep the edits buffered in the service")
+    audit = sub.add_parser("audit", help="print the data-quality audit")
+    audit.add_argument("--folder")
+    ask = sub.add_parser("ask", help="ask a question about the CSV data")
+    ask.add_argument("question")
+    ask.add_argument("--folder")
+    sub.add_parser("status", help="show what the service has loaded")
+    sub.add_parser("stop", help="stop the service")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        return serve(args.host, args.port)
+
+    address = {'host': args.host, 'port': args.port}
+    try:
+        if args.command == "modify":
+            result = call_service("/modify", {'file': args.file, 'instructions': args.instructions,
+                                              'folder': args.folder, 'save': not args.no_save}, **address)
+        elif args.command == "audit":
+            result = call_service("/audit", {'folder': args.folder}, **address)
+        elif args.command == "ask":
+            result = call_service("/ask", {'question': args.question, 'folder': args.folder}, **address)
+        elif args.command == "status":
+            result = call_service("/status", **address)
+        else:
+            result = call_service("/shutdown", **address)
+    except urllib.error.URLError as e:
+        print(f"Agent service is not reachable on {args.host}:{args.port} ({e.reason}). "
+              f"Start it with: python agent_service.py serve")
+        return 1
+
+    if 'error' in result:
+        print("Error:", result['error'])
+        return 1
+    if args.command == "modify":
+        print_modify_result(result)
+    elif args.command == "audit":
+        print(result['report'])
+    elif args.command == "ask":
+        source = {'audit': " (from the audit)", 'cache': " (cached)"}.get(result['source'], "")
+        print(f"Answer{source}:\n{result['answer']}")
+    else:
+        print(json.dumps(result, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+import os
+import json
+import hashlib
+import pandas as pd
+from streaming_audit import (
+    DEFAULT_CHUNK_SIZE, MAX_OUTLIERS_PER_COLUMN, update_audit_state, audit_state_result,
+    collect_numeric_outliers, stream_bounds,
+)
+from outlier_engine import DEFAULT_METHOD
+
+CACHE_FILE_NAME = ".audit_cache.json"
+HASH_BLOCK_BYTES = 64 * 1024
+
+def block_hash(f, start, end):
+    f.seek(max(start, 0))
+    return hashlib.sha256(f.read(max(end - max(start, 0), 0))).hexdigest()
+
+def file_fingerprint(file_path):
+    # size + mtime decide "unchanged"; the head/tail hashes of the audited
+    # extent let a later run recognise pure appends without re-reading it all.
+    stat = os.stat(file_path)
+    with open(file_path, "rb") as f:
+        head = block_hash(f, 0, min(HASH_BLOCK_BYTES, stat.st_size))
+        tail = block_hash(f, stat.st_size - HASH_BLOCK_BYTES, stat.st_size)
+        f.seek(max(stat.st_size - 1, 0))
+        ends_with_newline = f.read(1) in (b"\n", b"")
+    return {'path': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'head_hash': head, 'tail_hash': tail, 'ends_with_newline': ends_with_newline}
+
+def classify_change(old, file_path):
+    # Returns 'unchanged', 'appended' or 'changed' for a cached fingerprint
+    stat = os.stat(file_path)
+    if old is None or old.get('path') != os.path.abspath(file_path):
+        return 'changed'
+    if stat.st_size == old['size'] and stat.st_mtime_ns == old['mtime_ns']:
+        return 'unchanged'
+    if stat.st_size <= old['size'] or not old.get('ends_with_newline'):
+        return 'changed'
+    with open(file_path, "rb") as f:
+        same_head = block_hash(f, 0, min(HASH_BLOCK_BYTES, old['size'])) == old['head_hash']
+        same_tail = block_hash(f, old['size'] - HASH_BLOCK_BYTES, old['size']) == old['tail_hash']
+    return 'appended' if same_head and same_tail else 'changed'
+
+def load_audit_cache(csv_folder):
+    path = os.path.join(csv_folder, CACHE_FILE_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Ignoring unreadable audit cache '{path}': {e}")
+        return {}
+
+def save_audit_cache(csv_folder, cache):
+    path = os.path.join(csv_folder, CACHE_FILE_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, default=str)
+    os.replace(tmp_path, path)
+
+def audit_appended_rows(file_path, entry, suspicious_list, chunk_size=DEFAULT_CHUNK_SIZE,
+                        max_outliers=MAX_OUTLIERS_PER_COLUMN, method=DEFAULT_METHOD, overrides=None):
+    # Fold only the bytes added since the cached audit into its running
+    # state. Only streamed audits have one (files over
+    # STREAMING_THRESHOLD_BYTES, or any file when a chunk_size is given);
+    # smaller files are cheap enough to re-audit in full and are.
+    # Previously found numeric outliers are kept while the new bounds (same
+    # method and overrides as the cached audit) still exclude them; if a
+    # bound tightened, old rows may have become outliers, so that column
+    # alone gets a numeric-only rescan of the whole file. Appends that move
+    # the quartiles therefore still cost one read of that column.
+    state = entry['state']
+    old_bounds = entry['result'].get('outlier_bounds', {})
+    old_size = entry['fingerprint']['size']
+
+    with open(file_path, "rb") as f:
+        f.seek(old_size)
+        for chunk in pd.read_csv(f, header=None, names=state['columns'], chunksize=chunk_size):
+            update_audit_state(state, chunk, suspicious_list, max_outliers)
+
+    bounds = stream_bounds(file_path, state['sketches'], method, overrides, chunk_size)
+    previous = entry['result'].get('outliers', {})
+    numeric_outliers = {}
+    rescan = {}
+    for col, (lower, upper) in bounds.items():
+        old = old_bounds.get(col)
+        if old is None or lower > old[0] or upper < old[1]:
+            rescan[col] = (lower, upper)
+            continue
+        numeric_outliers[col] = [v for v in previous.get(col, []) if v < lower or v > upper]
+
+    kept_bounds = {col: b for col, b in bounds.items() if col not in rescan}
+    if kept_bounds:
+        # For these columns the appended rows are the only new candidates
+        with open(file_path, "rb") as f:
+            f.seek(old_size)
+            for chunk in pd.read_csv(f, header=None, names=state['columns'], chunksize=chunk_size,
+                                     usecols=list(kept_bounds)):
+                for col, (lower, upper) in kept_bounds.items():
+                    kept = numeric_outliers.setdefault(col, [])
+                    if len(kept) < max_outliers:
+                        values = chunk[col]
+                        kept.extend(values[(values < lower) | (values > upper)].head(max_outliers - len(kept)).tolist())
+    if rescan:
+        numeric_outliers.update(collect_numeric_outliers(file_path, rescan, chunk_size, max_outliers))
+    numeric_outliers = {col: vals for col, vals in numeric_outliers.items() if vals}
+
+    return audit_state_result(state, file_path, numeric_outliers, bounds), state
@@ -0,0 +1,281 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# The agents read API keys at import time; the benchmarks never call a real
+# model, so placeholders are enough.
+for key in ("OPENROUTER_MISTRAL_SMALL_API_KEY", "OPENROUTER_MOONSHOT_KIMI_DEV_API_KEY"):
+    os.environ.setdefault(key, "benchmark")
+os.environ.setdefault("LLM_CACHE_DISABLE", "1")
+# Measure CSV parsing rather than columnar sidecar hits; run with
+# CSV_SIDECAR_CACHE=1 to time warm loads instead
+os.environ.setdefault("CSV_SIDECAR_CACHE", "0")
+
+from bulk_row_synthesizer import synthesize_tables
+from sql_insert_parser import iter_create_tables
+
+BENCH_SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+DATA_FOLDER = "bench_data"
+RESULTS_FOLDER = "bench_results"
+# A benchmark regresses when it is this much slower / bigger than the
+# baseline; runs shorter than MIN_SECONDS are too noisy to judge.
+THRESHOLDS = {'time_ratio': 1.25, 'memory_ratio': 1.25, 'min_seconds': 0.05}
+SQL_CHUNK_ROWS = 5_000
+
+# Same shape as the sample music/sales data in Industry-Sub_domain Data
+MUSIC_DDL = """
+CREATE TABLE Customers (CustomerID INT PRIMARY KEY, Name VARCHAR(100), Email VARCHAR(100),
+    Country VARCHAR(50), SignUpDate DATE);
+CREATE TABLE Albums (AlbumID INT PRIMARY KEY, Title VARCHAR(100), ReleaseDate DATE);
+CREATE TABLE Tracks (TrackID INT PRIMARY KEY, Title VARCHAR(100), Duration INT,
+    AlbumID INT, FOREIGN KEY (AlbumID) REFERENCES Albums(AlbumID));
+CREATE TABLE Orders (OrderID INT PRIMARY KEY, CustomerID INT, OrderDate DATE, TotalAmount DECIMAL(10,2),
+    FOREIGN KEY (CustomerID) REFERENCES Customers(CustomerID));
+CREATE TABLE OrderDetails (OrderDetailID INT PRIMARY KEY, OrderID INT, TrackID INT, Quantity INT,
+    Price DECIMAL(10,2), FOREIGN KEY (OrderID) REFERENCES Orders(OrderID),
+    FOREIGN KEY (TrackID) REFERENCES Tracks(TrackID));
+CREATE TABLE Sales (SaleID INT PRIMARY KEY, AlbumID INT, Quantity INT, SaleDate DATE, Total DECIMAL(10,2),
+    FOREIGN KEY (AlbumID) REFERENCES Albums(AlbumID));
+"""
+
+def music_hints(n_rows):
+    # Row counts relative to the fact tables, plus the kinds of dirt the
+    # audit looks for (NULLs, placeholder countries, extreme durations)
+    return {
+        'Customers': {'rows': max(n_rows // 10, 10),
+                      'Name': {'format': 'Customer {id}', 'null_rate': 0.01},
+                      'Email': {'format': 'customer{id}@example.com'},
+                      'Country': {'choices': ['UK', 'USA', 'Canada', 'Germany', 'France', 'Japan', 'XX', 'Unknown'],
+                                  'weights': [25, 30, 10, 10, 10, 10, 3, 2]},
+                      'SignUpDate': {'start': '2015-01-01', 'end': '2024-12-31', 'null_rate': 0.01}},
+        'Albums': {'rows': max(n_rows // 100, 10),
+                   'Title': {'format': 'Album {id}'},
+                   'ReleaseDate': {'start': '1960-01-01', 'end': '2024-12-31'}},
+        'Tracks': {'rows': max(n_rows // 10, 10),
+                   'Title': {'format': 'Track {id}'},
+                   'Duration': {'min': 0, 'max': 900, 'null_rate': 0.01}},
+        'Orders': {'rows': max(n_rows // 2, 10),
+                   'OrderDate': {'start': '2020-01-01', 'end': '2024-12-31'},
+                   'TotalAmount': {'min': 1, 'max': 500, 'null_rate': 0.01}},
+        'OrderDetails': {'Quantity': {'min': 1, 'max': 10}, 'Price': {'min': 0.5, 'max': 20}},
+        'Sales': {'Quantity': {'min': -100, 'max': 2000, 'null_rate': 0.01},
+                  'SaleDate': {'start': '2020-01-01', 'end': '2024-12-31'},
+                  'Total': {'min': 1, 'max': 50000, 'null_rate': 0.01}},
+    }
+
+def make_dataset(n_rows, seed=0, folder=None):
+    # Seeded music/sales CSVs with n_rows rows in the fact tables; reused
+    # between runs when already present
+    folder = folder or os.path.join(DATA_FOLDER, f"music_{n_rows}_{seed}")
+    if not os.path.exists(os.path.join(folder, "orderdetails_data.csv")):
+        os.makedirs(folder, exist_ok=True)
+        synthesize_tables(MUSIC_DDL, music_hints(n_rows), n_rows, folder, seed=seed)
+    return folder
+
+def mixed_format_dates(n_rows, seed=0):
+    # Mostly ISO dates with a share of the other accepted formats and junk
+    rng = np.random.default_rng(seed)
+    days = np.datetime64('2000-01-01') + rng.integers(0, 9000, n_rows).astype('timedelta64[D]')
+    dates = pd.Series(pd.to_datetime(days))
+    iso = dates.dt.strftime('%Y-%m-%d')
+    styles = rng.choice(4, size=n_rows, p=[0.85, 0.07, 0.05, 0.03])
+    values = iso.where(styles != 1, dates.dt.strftime('%d-%m-%Y'))
+    values = values.where(styles != 2, dates.dt.strftime('%m/%d/%Y'))
+    return values.where(styles != 3, 'not a date')
+
+def insert_sql_chunks(table, n_rows, seed=0):
+    # Streams INSERT statements the way a chat model would emit them,
+    # without ever holding the whole script in memory
+    definition = next(t for t in iter_create_tables(MUSIC_DDL) if t['name'].lower() == table.lower())
+    columns = [col for col, _ in definition['columns']]
+    rng = np.random.default_rng(seed)
+    header = f"INSERT INTO {definition['name']} ({', '.join(columns)}) VALUES\n"
+    for start in range(0, n_rows, SQL_CHUNK_ROWS):
+        stop = min(start + SQL_CHUNK_ROWS, n_rows)
+        ids = np.arange(start + 1, stop + 1)
+        rows = [f"({i}, {i % 97 + 1}, {i % 89 + 1}, {q}, {p:.2f})"
+                for i, q, p in zip(ids, rng.integers(1, 10, len(ids)), rng.uniform(0.5, 20, len(ids)))]
+        yield header + ",\n".join(rows) + ";\n"
+
+class FakeSQLModel:
+    # Local stand-in for the chat model: answers the schema prompt with the
+    # music DDL and every table prompt with generated INSERT rows
+    def __init__(self, rows_per_table, seed=0):
+        self.rows_per_table = rows_per_table
+        self.seed = seed
+
+    def invoke(self, prompt):
+        if "CREATE TABLE statements" in prompt:
+            return MUSIC_DDL
+        table = prompt.split("INSERT INTO ", 1)[1].split(" ", 1)[0]
+        if table.lower() == "orderdetails":
+            return "".join(insert_sql_chunks(table, self.rows_per_table, self.seed))
+        definition = next(t for t in iter_create_tables(MUSIC_DDL) if t['name'] == table)
+        columns = [col for col, _ in definition['columns']]
+        values = ",\n".join("(" + ", ".join(str(i) if n == 0 else f"'{c} {i}'" for n, c in enumerate(columns)) + ")"
+                            for i in range(1, self.rows_per_table + 1))
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES\n{values};\n"
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+def bench_save_insert_statements(n_rows, workdir, seed):
+    from data_generation_agent import save_insert_statements_to_csv
+    out = os.path.join(workdir, "insert_out")
+    os.makedirs(out, exist_ok=True)
+    return lambda: save_insert_statements_to_csv(insert_sql_chunks("OrderDetails", n_rows, seed), out)
+
+def bench_concurrent_generation(n_rows, workdir, seed):
+    from data_generation_agent import generate_sales_sql_concurrently
+    out = os.path.join(workdir, "generated")
+
+    def run():
+        # A fresh folder each time so resume logic does not skip the work
+        shutil.rmtree(out, ignore_errors=True)
+        generate_sales_sql_concurrently("music store sales", out, rows_per_table=n_rows,
+                                        llm=FakeSQLModel(n_rows, seed))
+    return run
+
+def bench_parse_dates(n_rows, workdir, seed):
+    from data_error_recognition_agent import parse_dates_with_multiple_formats
+    series = mixed_format_dates(n_rows, seed)
+    return lambda: parse_dates_with_multiple_formats(series)
+
+def bench_analyze_csv_file(n_rows, workdir, seed):
+    from data_error_recognition_agent import analyze_csv_file
+    path = os.path.join(make_dataset(n_rows, seed), "orderdetails_data.csv")
+    return lambda: analyze_csv_file(path)
+
+def bench_join_views(n_rows, workdir, seed):
+    # Replacement for the old merge_dataframes: load, build the join graph
+    # and materialize the widest view
+    from data_error_recognition_agent import load_and_prepare_csvs
+    from join_graph import build_join_graph, make_view_loader
+    folder = make_dataset(n_rows, seed)
+
+    def run():
+        view = make_view_loader(build_join_graph(load_and_prepare_csvs(folder)))
+        return view('orderdetails_data.csv')
+    return run
+
+def bench_file_summaries(n_rows, workdir, seed):
+    import file_reduction_agent
+    folder = make_dataset(n_rows, seed)
+    file_reduction_agent.CSV_DIR = folder
+    files = file_reduction_agent.list_csv_files(folder)
+    return lambda: file_reduction_agent.get_file_summaries(files)
+
+BENCHMARKS = {
+    'save_insert_statements_to_csv': bench_save_insert_statements,
+    'generate_sales_sql_concurrently': bench_concurrent_generation,
+    'parse_dates_with_multiple_formats': bench_parse_dates,
+    'analyze_csv_file': bench_analyze_csv_file,
+    'join_views': bench_join_views,
+    'get_file_summaries': bench_file_summaries,
+}
+# The fake model answers a whole table in one string, so the end-to-end
+# generation benchmark is capped to keep 10M-row runs within memory
+MAX_ROWS = {'generate_sales_sql_concurrently': 1_000_000}
+
+def measure(run, repeat=1, memory=True):
+    # Best wall time over repeat runs, then one traced run for peak memory.
+    # tracemalloc sees Python and NumPy/pandas array allocations but not the
+    # CSV parser's internal buffers, so compare peaks only across runs.
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            run()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return {'seconds': round(min(times), 4), 'peak_mb': None if peak_mb is None else round(peak_mb, 2)}
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(sizes, names=None, repeat=1, memory=True, seed=0):
+    names = names or list(BENCHMARKS)
+    results = {}
+    for size in sizes:
+        n_rows = BENCH_SIZES[size]
+        workdir = os.path.join(DATA_FOLDER, f"work_{n_rows}")
+        os.makedirs(workdir, exist_ok=True)
+        for name in names:
+            if n_rows > MAX_ROWS.get(name, n_rows):
+                continue
+            run = BENCHMARKS[name](n_rows, workdir, seed)
+            result = measure(run, repeat, memory)
+            result['rows'] = n_rows
+            results[f"{name}@{size}"] = result
+            peak = f", peak {result['peak_mb']} MB" if result['peak_mb'] is not None else ""
+            print(f"{name} @ {size}: {result['seconds']:.3f} s{peak}")
+    return {'commit': current_commit(), 'python': platform.python_version(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'thresholds': THRESHOLDS,
+            'results': results}
+
+def compare_with_baseline(report, baseline):
+    # Returns a list of regression messages (empty when everything is within
+    # the baseline's thresholds)
+    thresholds = baseline.get('thresholds', THRESHOLDS)
+    regressions = []
+    for key, result in report['results'].items():
+        old = baseline['results'].get(key)
+        if not old:
+            continue
+        if (result['seconds'] > thresholds['min_seconds']
+                and result['seconds'] > old['seconds'] * thresholds['time_ratio']):
+            regressions.append(f"{key}: {old['seconds']:.3f} s -> {result['seconds']:.3f} s")
+        if (result.get('peak_mb') and old.get('peak_mb')
+                and result['peak_mb'] > old['peak_mb'] * thresholds['memory_ratio']):
+            regressions.append(f"{key}: peak {old['peak_mb']} MB -> {result['peak_mb']} MB")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time and memory-profile the data agents' hot paths.")
+    parser.add_argument("--sizes", nargs="+", choices=list(BENCH_SIZES), default=['10k'])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default bench_results/<commit>.json)")
+    parser.add_argument("--baseline", help="earlier results file to check for regressions")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.only, args.repeat, not args.no_memory, args.seed)
+    output = args.output or os.path.join(RESULTS_FOLDER, f"{report['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to '{output}'")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_with_baseline(report, json.load(f))
+        if regressions:
+            print("Performance regressions against the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import os
+import re
+import json
+import math
+import numpy as np
+import pandas as pd
+from sql_insert_parser import iter_create_tables
+
+# Value hints the LLM may return per column (all optional):
+#   {"choices": [...], "weights": [...]}   categorical values
+#   {"min": 1, "max": 500}                 numeric range
+#   {"start": "2015-01-01", "end": "2024-12-31"}   date range
+#   {"format": "user{id}@example.com"}     string built from the row id
+#   {"null_rate": 0.05}                    fraction of NULLs
+# plus a table-level {"rows": N} to override the default row count.
+INT_TYPES = ("INT", "INTEGER", "BIGINT", "SMALLINT", "TINYINT", "MEDIUMINT", "SERIAL")
+FLOAT_TYPES = ("DECIMAL", "NUMERIC", "FLOAT", "DOUBLE", "REAL", "MONEY")
+DATE_TYPES = ("DATE", "DATETIME", "TIMESTAMP")
+BOOL_TYPES = ("BOOL", "BOOLEAN", "BIT")
+
+def split_schema_and_hints(llm_output):
+    # The LLM answers with CREATE TABLE statements followed by "HINTS:" and a
+    # JSON object {table: {column: hint}}; missing or broken hints fall back
+    # to type-based defaults.
+    text = llm_output.replace("```json", "").replace("```sql", "").replace("```", "")
+    ddl, _, hints_text = text.partition("HINTS:")
+    hints = {}
+    match = re.search(r"\{.*\}", hints_text, re.DOTALL)
+    if match:
+        try:
+            hints = json.loads(match.group(0))
+        except json.JSONDecodeError as e:
+            print(f"Could not parse value hints, using defaults: {e}")
+    return ddl.strip(), hints
+
+def base_type(col_type):
+    return col_type.split("(")[0].strip().upper()
+
+def type_scale(col_type, default=2):
+    match = re.search(r"\(\s*\d+\s*,\s*(\d+)\s*\)", col_type)
+    return int(match.group(1)) if match else default
+
+def order_tables(tables):
+    # Parents before children so foreign keys always point at written rows
+    by_name = {t['name'].lower(): t for t in tables}
+    ordered, visiting, done = [], set(), set()
+
+    def visit(name):
+        if name in done or name in visiting or name not in by_name:
+            return
+        visiting.add(name)
+        for _, ref_table, _ in by_name[name]['foreign_keys']:
+            visit(ref_table.lower())
+        visiting.discard(name)
+        done.add(name)
+        ordered.append(by_name[name])
+
+    for t in tables:
+        visit(t['name'].lower())
+    return ordered
+
+def plan_row_counts(tables, hints, n_rows):
+    counts = {}
+    for t in tables:
+        table_hints = lookup(hints, t['name']) or {}
+        counts[t['name'].lower()] = int(table_hints.get('rows', n_rows))
+    # Pure link tables (every PK column is a FK) cannot hold more unique rows
+    # than the product of their parents.
+    for t in tables:
+        link_space = composite_link_space(t, counts)
+        if link_space is not None:
+            counts[t['name'].lower()] = min(counts[t['name'].lower()], link_space)
+    return counts
+
+def composite_link_space(table, counts):
+    pk = table['primary_key']
+    fk_cols = {col: ref for col, ref, _ in table['foreign_keys']}
+    if len(pk) < 2 or not all(col in fk_cols and fk_cols[col].lower() in counts for col in pk):
+        return None
+    return math.prod(counts.get(fk_cols[col].lower(), 0) for col in pk)
+
+def lookup(mapping, key):
+    # Case-insensitive dict lookup; LLMs are loose with identifier casing
+    if key in mapping:
+        return mapping[key]
+    lowered = key.lower()
+    for k, v in mapping.items():
+        if k.lower() == lowered:
+            return v
+    return None
+
+def format_ids(template, ids):
+    out = np.array([""], dtype=object)
+    for i, part in enumerate(template.split("{id}")):
+        if i:
+            out = out + ids.astype(str).astype(object)
+        out = out + part
+    return out
+
+def synthesize_column(rng, column, col_type, hint, ids):
+    size = len(ids)
+    kind = base_type(col_type)
+    hint = hint if isinstance(hint, dict) else {}
+
+    if hint.get('choices'):
+        choices = np.array(hint['choices'], dtype=object)
+        weights = hint.get('weights')
+        if weights and len(weights) == len(choices):
+            weights = np.asarray(weights, dtype=float)
+            weights = weights / weights.sum()
+        else:
+            weights = None
+        return rng.choice(choices, size=size, p=weights)
+
+    if hint.get('format'):
+        return format_ids(hint['format'], ids)
+
+    if kind in INT_TYPES:
+        low, high = int(hint.get('min', 1)), int(hint.get('max', 1000))
+        return rng.integers(low, high + 1, size=size)
+
+    if kind in FLOAT_TYPES:
+        low, high = float(hint.get('min', 1.0)), float(hint.get('max', 1000.0))
+        return rng.uniform(low, high, size=size).round(type_scale(col_type))
+
+    if kind in DATE_TYPES:
+        start = np.datetime64(hint.get('start', '2015-01-01'), 'D')
+        end = np.datetime64(hint.get('end', '2024-12-31'), 'D')
+        span = max(int((end - start).astype(int)), 0) + 1
+        days = start + rng.integers(0, span, size=size).astype('timedelta64[D]')
+        return np.datetime_as_string(days, unit='D').astype(object)
+
+    if kind in BOOL_TYPES:
+        return rng.integers(0, 2, size=size)
+
+    # Free text without a hint: "<Column> <id>" keeps values unique and readable
+    return format_ids(f"{column} {{id}}", ids)
+
+def key_values(column, col_type, hint, ids):
+    # Primary keys are derived from the row id alone, so any child table can
+    # rebuild a valid parent key from a random parent row id.
+    if base_type(col_type) in INT_TYPES:
+        return ids
+    template = hint.get('format') if isinstance(hint, dict) else None
+    return format_ids(template or f"{column} {{id}}", ids)
+
+def parent_key_values(parent, hints, ref_col, parent_ids):
+    col_type = dict(parent['columns']).get(ref_col, "INT")
+    hint = lookup(lookup(hints, parent['name']) or {}, ref_col)
+    return key_values(ref_col, col_type, hint, parent_ids)
+
+def synthesize_chunk(rng, table, tables_by_name, hints, counts, start, stop, link_step):
+    ids = np.arange(start, stop, dtype=np.int64) + 1
+    size = len(ids)
+    table_hints = lookup(hints, table['name']) or {}
+    fk_cols = {col: ref for col, ref, _ in table['foreign_keys']}
+    ref_cols = {col: ref_col for col, _, ref_col in table['foreign_keys']}
+    pk = table['primary_key']
+    data = {}
+
+    link_space = composite_link_space(table, counts)
+    if link_space:
+        # Walk the parent key space with a step coprime to its size: every row
+        # gets a distinct key combination without remembering earlier chunks.
+        k = (ids - 1) * link_step % link_space
+        for col in reversed(pk):
+            parent = tables_by_name[fk_cols[col].lower()]
+            parent_rows = counts[parent['name'].lower()]
+            data[col] = parent_key_values(parent, hints, ref_cols[col], k % parent_rows + 1)
+            k = k // parent_rows
+
+    for column, col_type in table['columns']:
+        if column in data:
+            continue
+        hint = lookup(table_hints, column)
+        if len(pk) == 1 and column == pk[0]:
+            values = key_values(column, col_type, hint, ids)
+        elif column in fk_cols and fk_cols[column].lower() in tables_by_name:
+            parent = tables_by_name[fk_cols[column].lower()]
+            parent_rows = max(counts[parent['name'].lower()], 1)
+            parent_ids = rng.integers(1, parent_rows + 1, size=size)
+            values = parent_key_values(parent, hints, ref_cols[column], parent_ids)
+        else:
+            values = synthesize_column(rng, column, col_type, hint, ids)
+
+        null_rate = float(hint.get('null_rate', 0)) if isinstance(hint, dict) else 0.0
+        if null_rate > 0 and column not in pk and column not in table['not_null']:
+            mask = rng.random(size) < null_rate
+            if values.dtype.kind in "iu":
+                # Nullable integers so the CSV keeps 1969 instead of 1969.0
+                values = pd.array(values, dtype="Int64")
+                values[mask] = pd.NA
+            else:
+                values = values.astype(object)
+                values[mask] = None
+        data[column] = values
+
+    return pd.DataFrame({column: data[column] for column, _ in table['columns']})
+
+def coprime_step(space, rng):
+    if space <= 1:
+        return 1
+    # Kept below 2**31 so (row id * step) cannot overflow int64
+    step = int(rng.integers(1, min(space, 2**31))) | 1
+    while math.gcd(step, space) != 1:
+        step += 1
+    return step
+
+def synthesize_tables(ddl, hints, n_rows, csv_folder, chunk_size=100_000, seed=0):
+    # Fill every table from the DDL to n_rows locally and write
+    # <table>_data.csv in chunks; memory is bounded by chunk_size.
+    tables = order_tables(list(iter_create_tables(ddl)))
+    if not tables:
+        print("No CREATE TABLE statements found in the schema.")
+        return {}
+
+    os.makedirs(csv_folder, exist_ok=True)
+    counts = plan_row_counts(tables, hints, n_rows)
+    tables_by_name = {t['name'].lower(): t for t in tables}
+    for index, table in enumerate(tables):
+        key = table['name'].lower()
+        rng = np.random.default_rng([seed, index])
+        link_step = coprime_step(composite_link_space(table, counts) or 1, rng)
+        filename = os.path.join(csv_folder, f"{key}_data.csv")
+        total = counts[key]
+        for start in range(0, max(total, 1), chunk_size):
+            stop = min(start + chunk_size, total)
+            chunk = synthesize_chunk(rng, table, tables_by_name, hints, counts, start, stop, link_step)
+            chunk.to_csv(filename, mode="w" if start == 0 else "a", header=start == 0, index=False)
+        print(f"Saved {total} rows to '{filename}'")
+    return counts
@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+# One entry point for the agents:
+#
+#   python cli.py generate --industry music --subdomain sales --rows 1000
+#   python cli.py generate-errors --clean-folder clean/ --folder noisy/
+#   python cli.py audit --folder data/ --no-agent
+#   python cli.py audit --folder data/ --question "how many rows in orders_data.csv"
+#   python cli.py modify --folder data/ --instructions-file modification_instructions.txt
+#   python cli.py modify --folder data/ --file orders_data.csv --instruction "reduce TotalAmount by 1"
+#   python cli.py reduce --folder data/ --keep 5 --dry-run
+#   python cli.py startup-check
+#
+# Every prompt of the interactive scripts has a flag; whatever is left out
+# is still asked for. Agent modules are imported only by the subcommand
+# that runs them, and they import LangChain only when a model is actually
+# called, so audits and compiled-only edits start without it.
+AGENT_MODULES = {
+    'generate': 'data_generation_agent',
+    'generate-errors': 'data_generation_agent_with_errors',
+    'audit': 'data_error_recognition_agent',
+    'modify': 'data_modification_agent',
+    'reduce': 'file_reduction_agent',
+}
+# Seconds an agent module may take to import (Python start-up excluded),
+# and modules none of them may import eagerly
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "0.8"))
+EAGER_IMPORT_BLOCKLIST = ('langchain', 'langchain_core', 'langchain_openai', 'langchain_community',
+                          'langchain_experimental', 'openai')
+
+def run_generate(args):
+    import data_generation_agent
+    data_generation_agent.main(args.industry, args.subdomain, n_rows=args.rows, concurrent=args.concurrent,
+                               csv_folder=args.folder, seed=args.seed)
+
+def run_generate_errors(args):
+    import data_generation_agent_with_errors
+    data_generation_agent_with_errors.main(args.industry, args.subdomain, clean_folder=args.clean_folder,
+                                           csv_folder=args.folder, seed=args.seed)
+
+def run_audit(args):
+    import data_error_recognition_agent
+    data_error_recognition_agent.main(args.folder, questions=args.question, ask=not args.no_agent,
+                                      workers=args.workers)
+
+def run_modify(args):
+    import data_modification_agent
+    if args.folder:
+        data_modification_agent.CSV_DIR = args.folder
+    if args.instructions_file:
+        statuses = data_modification_agent.process_instruction_file(args.instructions_file, args.concurrency)
+    elif args.instruction:
+        if not args.file:
+            raise SystemExit("--instruction needs --file")
+        statuses = data_modification_agent.process_instructions(
+            [f"{args.file}: {instruction}" for instruction in args.instruction], args.concurrency)
+    else:
+        return data_modification_agent.main()
+    if statuses is None or any(s['status'] in ('failed', 'not saved', 'skipped') for s in statuses):
+        return 1
+
+def run_reduce(args):
+    import file_reduction_agent
+    if args.folder:
+        file_reduction_agent.CSV_DIR = args.folder
+    file_reduction_agent.main(n_keep=args.keep, dry_run=args.dry_run)
+
+def import_cost(module):
+    # Import time of one module in a fresh interpreter, and which blocked
+    # modules it pulled in
+    code = (
+        "import sys, time, json\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "seconds = time.perf_counter() - start\n"
+        f"loaded = sorted(m for m in {EAGER_IMPORT_BLOCKLIST!r} if m in sys.modules)\n"
+        "print(json.dumps({'seconds': seconds, 'loaded': loaded}))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        return {'seconds': None, 'loaded': [], 'error': result.stderr.strip().splitlines()[-1:]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_startup_check(args):
+    budget = args.budget
+    failed = False
+    print(f"Import budget: {budget:.2f}s per agent module")
+    for command, module in AGENT_MODULES.items():
+        cost = import_cost(module)
+        if cost['seconds'] is None:
+            print(f"  {command:<16} {module:<36} import failed: {' '.join(cost['error'])}")
+            failed = True
+            continue
+        problems = []
+        if cost['seconds'] > budget:
+            problems.append("over budget")
+        if cost['loaded']:
+            problems.append(f"eagerly imports {', '.join(cost['loaded'])}")
+        failed = failed or bool(problems)
+        print(f"  {command:<16} {module:<36} {cost['seconds']:>6.2f}s  {'; '.join(problems) or 'ok'}")
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.abspath(__file__), "--help"], capture_output=True)
+    print(f"  'cli.py --help' took {time.perf_counter() - start:.2f}s including interpreter start-up")
+    return 1 if failed else 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Data generation, audit, modification and reduction agents")
+    parser.add_argument("--trace", metavar="FILE", nargs="?", const="agent_trace.jsonl",
+                        help="write timing spans to FILE (same as AGENT_TRACE)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    generate = sub.add_parser("generate", help="generate a realistic SQL dataset as CSVs")
+    generate.add_argument("--industry")
+    generate.add_argument("--subdomain")
+    generate.add_argument("--rows", type=int, help="rows per table to synthesize locally; 0 lets the LLM write them")
+    generate.add_argument("--concurrent", action=argparse.BooleanOptionalAction, default=None,
+                          help="request each table's rows in parallel (LLM-written rows only)")
+    generate.add_argument("--folder", help="output folder for the CSVs")
+    generate.add_argument("--seed", type=int, default=0)
+    generate.set_defaults(run=run_generate)
+
+    errors = sub.add_parser("generate-errors", help="generate a dataset with realistic errors")
+    errors.add_argument("--industry")
+    errors.add_argument("--subdomain")
+    errors.add_argument("--clean-folder", help="corrupt this clean CSV folder locally instead of asking the LLM")
+    errors.add_argument("--folder", help="output folder for the CSVs")
+    errors.add_argument("--seed", type=int, default=0)
+    errors.set_defaults(run=run_generate_errors)
+
+    audit = sub.add_parser("audit", help="audit CSVs for data-quality problems and answer questions")
+    audit.add_argument("--folder")
+    audit.add_argument("--question", action="append", help="answer this question and exit (repeatable)")
+    audit.add_argument("--no-agent", action="store_true", help="print the audit report only")
+    audit.add_argument("--workers", type=int)
+    audit.set_defaults(run=run_audit)
+
+    modify = sub.add_parser("modify", help="edit CSVs with natural-language instructions")
+    modify.add_argument("--folder")
+    modify.add_argument("--instructions-file", help="batch file of 'file.csv: instruction' lines")
+    modify.add_argument("--file", help="CSV to apply --instruction to")
+    modify.add_argument("--instruction", action="append", help="instruction for --file (repeatable)")
+    modify.add_argument("--concurrency", type=int, default=int(os.getenv("MODIFICATION_CONCURRENCY", "4")),
+                        help="files edited at the same time in batch mode")
+    modify.set_defaults(run=run_modify)
+
+    reduce = sub.add_parser("reduce", help="keep only the most important CSVs")
+    reduce.add_argument("--folder")
+    reduce.add_argument("--keep", type=int, help="number of files to keep")
+    reduce.add_argument("--dry-run", action="store_true", help="list the files that would be removed")
+    reduce.set_defaults(run=run_reduce)
+
+    check = sub.add_parser("startup-check", help="check that agent modules import within budget")
+    check.add_argument("--budget", type=float, default=IMPORT_BUDGET_SECONDS)
+    check.set_defaults(run=run_startup_check)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.trace:
+        from instrumentation import enable_tracing
+        enable_tracing(args.trace)
+    return args.run(args) or 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
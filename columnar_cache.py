@@ -0,0 +1,112 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+# Parsed CSVs are kept as uncompressed Feather (Arrow IPC) files in a
+# .columnar_cache folder next to the CSV. Uncompressed Arrow can be memory
+# mapped, so a reload maps the file and wraps its buffers instead of
+# parsing text; only the requested columns and rows are touched.
+#
+# A sidecar records the CSV's size, mtime and content hash. Same size and
+# mtime means valid; a new mtime with the same size is checked against the
+# hash (a copy or touch keeps the sidecar), anything else rebuilds it.
+# Set CSV_SIDECAR_CACHE=0 to turn the cache off.
+CACHE_DIR_NAME = ".columnar_cache"
+METADATA_KEY = b"csv_source"
+HASH_CHUNK_BYTES = 8 * 1024 * 1024
+
+def cache_enabled():
+    return pa is not None and os.getenv("CSV_SIDECAR_CACHE", "1") != "0"
+
+def sidecar_path(csv_path, variant):
+    # variant names the load options the frame was built with, since
+    # categoricals and downcast numbers are stored as they were loaded
+    folder, name = os.path.split(os.path.abspath(csv_path))
+    return os.path.join(folder, CACHE_DIR_NAME, f"{name}.{variant}.feather")
+
+def content_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def csv_signature(csv_path, with_hash=False):
+    stat = os.stat(csv_path)
+    signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        signature['hash'] = content_hash(csv_path)
+    return signature
+
+def sidecar_valid(csv_path, path):
+    # Reads only the schema; the data stays unmapped until load
+    try:
+        with pa.memory_map(path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        stored = json.loads(metadata[METADATA_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowInvalid):
+        return False
+    current = csv_signature(csv_path)
+    if current['size'] != stored.get('size'):
+        return False
+    if current['mtime_ns'] == stored.get('mtime_ns'):
+        return True
+    return content_hash(csv_path) == stored.get('hash')
+
+def load_sidecar(csv_path, variant, columns=None, nrows=None):
+    # The cached frame (projected to columns, first nrows rows), or None
+    # when there is no valid sidecar
+    if not cache_enabled():
+        return None
+    path = sidecar_path(csv_path, variant)
+    if not os.path.exists(path) or not sidecar_valid(csv_path, path):
+        return None
+    try:
+        table = feather.read_table(path, memory_map=True)
+        if columns is not None:
+            # File order, as pd.read_csv(usecols=...) returns them
+            wanted = set(columns)
+            table = table.select([name for name in table.column_names if name in wanted])
+            if table.num_columns != len(wanted):
+                return None
+    except (OSError, pa.ArrowInvalid, KeyError):
+        return None
+    if nrows is not None:
+        table = table.slice(0, nrows)
+    return table.to_pandas(split_blocks=True)
+
+def write_sidecar(df, csv_path, variant):
+    # Best effort: a read-only folder or unsupported column type just means
+    # no cache for this file
+    if not cache_enabled():
+        return False
+    path = sidecar_path(csv_path, variant)
+    temp_path = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        signature = csv_signature(csv_path, with_hash=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[METADATA_KEY] = json.dumps(signature).encode()
+        table = table.replace_schema_metadata(metadata)
+        fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                         dir=os.path.dirname(path))
+        os.close(fd)
+        feather.write_feather(table, temp_path, compression="uncompressed")
+        # mkstemp files are private (0600); readable by whoever can read the CSV
+        shutil.copymode(csv_path, temp_path)
+        os.replace(temp_path, path)
+        return True
+    except (OSError, pa.ArrowException, TypeError, ValueError) as e:
+        print(f"Skipping columnar cache for '{os.path.basename(csv_path)}': {e}")
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
@@ -0,0 +1,101 @@
+import os
+import numpy as np
+import pandas as pd
+from instrumentation import span, file_size
+from columnar_cache import load_sidecar, write_sidecar
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = 'string[pyarrow]'
+except ImportError:
+    STRING_DTYPE = 'string'
+
+SAMPLE_ROWS = 10_000
+# A text column becomes categorical when its distinct values are at most this
+# share of the sampled non-null values (Country, Genre, status codes, ...)
+CATEGORY_RATIO = 0.5
+MAX_CATEGORIES = 10_000
+
+def infer_text_dtypes(sample, categories=True):
+    # Only text columns get a dtype up front; numeric columns are read with
+    # the default parser and downcast afterwards, which is exact even when
+    # the sample did not see the full value range.
+    dtypes = {}
+    for col in sample.columns:
+        series = sample[col]
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            continue
+        values = series.dropna()
+        n_unique = values.nunique()
+        if (categories and len(values) and n_unique <= MAX_CATEGORIES
+                and n_unique <= CATEGORY_RATIO * len(values)):
+            dtypes[col] = 'category'
+        else:
+            dtypes[col] = STRING_DTYPE
+    return dtypes
+
+def downcast_numeric(df):
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            # float32 only when every value survives the round trip, so
+            # 9.99 stays float64 and audit output does not change
+            small = series.astype(np.float32)
+            if ((small.astype(np.float64) == series) | series.isna()).all():
+                df[col] = small
+    return df
+
+def read_csv_compact(file_path, usecols=None, nrows=None, categories=True, downcast=True,
+                     sample_rows=SAMPLE_ROWS, report=False):
+    # pd.read_csv with dtypes inferred once from the first sample_rows rows:
+    # low-cardinality text as categoricals, other text Arrow-backed, numbers
+    # downcast. Agents that edit values in place should pass
+    # categories=False, downcast=False: assigning a new label to a categorical
+    # fails and narrow integers overflow silently on arithmetic.
+    # Full loads are also kept in a columnar sidecar (see columnar_cache),
+    # so later loads of an unchanged file, or of some of its columns or
+    # first rows, map it instead of parsing the text.
+    variant = f"{'cat' if categories else 'text'}-{'down' if downcast else 'full'}"
+    with span('read_csv', kind='read', file=os.path.basename(file_path)) as s:
+        df = load_sidecar(file_path, variant, columns=usecols, nrows=nrows)
+        s['cache'] = 'hit' if df is not None else 'miss'
+        if df is None:
+            sample = pd.read_csv(file_path, usecols=usecols, nrows=sample_rows)
+            dtypes = infer_text_dtypes(sample, categories)
+            if nrows is not None and nrows <= sample_rows or len(sample) < sample_rows:
+                df = sample.head(nrows) if nrows is not None else sample
+                df = df.astype(dtypes)
+            else:
+                df = pd.read_csv(file_path, usecols=usecols, nrows=nrows, dtype=dtypes)
+            if downcast:
+                df = downcast_numeric(df)
+            # Only complete frames are cached; column-split workers and
+            # previews read just what they need
+            if usecols is None and nrows is None:
+                write_sidecar(df, file_path, variant)
+        s['rows'] = len(df)
+        s['bytes'] = file_size(file_path) if nrows is None else None
+
+    if report:
+        # Default footprint estimated from a plain read of the first rows
+        sample = pd.read_csv(file_path, usecols=usecols, nrows=min(sample_rows, max(len(df), 1)))
+        per_row = sample.memory_usage(deep=True, index=False).sum() / max(len(sample), 1)
+        print_memory_report(os.path.basename(file_path), per_row * len(df), frame_memory(df))
+    return df
+
+def frame_memory(df):
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+def format_bytes(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f"{n:.1f} {unit}" if unit != 'B' else f"{int(n)} B"
+        n /= 1024
+
+def print_memory_report(name, before, after):
+    saved = (1 - after / before) * 100 if before else 0.0
+    print(f"Memory for '{name}': ~{format_bytes(before)} -> {format_bytes(after)} ({saved:.0f}% less)")
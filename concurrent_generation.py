@@ -0,0 +1,118 @@
+import os
+import json
+import asyncio
+from sql_insert_parser import iter_create_tables, save_insert_stream_to_csv
+from instrumentation import span
+
+PROGRESS_FILE_NAME = "generation_progress.json"
+
+SCHEMA_PROMPT = """You are an expert SQL database designer.
+Design the database for the request below.
+Return ONLY CREATE TABLE statements with PRIMARY KEY and FOREIGN KEY constraints.
+No INSERT statements, no markdown, no explanations.
+
+Request: {question}
+"""
+
+TABLE_PROMPT = """You are an expert SQL data generator.
+Here is the full database schema:
+
+{ddl}
+
+Write exactly one INSERT INTO {table} ({columns}) VALUES ...; statement with {rows} realistic rows
+relevant to this request: {question}
+Use key values 1 to {rows} for the primary key and only values between 1 and {rows} for foreign keys.
+Return ONLY the SQL, no markdown, no explanations.
+"""
+
+def response_text(response):
+    # Chat models return a message; plain LLMs and fakes may return a string
+    return getattr(response, "content", response)
+
+def load_progress(csv_folder, question):
+    path = os.path.join(csv_folder, PROGRESS_FILE_NAME)
+    if not os.path.exists(path):
+        return {'question': question, 'ddl': None, 'tables': {}, 'failed': {}}
+    with open(path, "r", encoding="utf-8") as f:
+        progress = json.load(f)
+    if progress.get('question') != question:
+        # A different request: start over instead of mixing two schemas
+        return {'question': question, 'ddl': None, 'tables': {}, 'failed': {}}
+    progress.setdefault('failed', {})
+    return progress
+
+def save_progress(csv_folder, progress):
+    path = os.path.join(csv_folder, PROGRESS_FILE_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(progress, f, indent=2)
+    os.replace(tmp_path, path)
+
+async def ask(llm, prompt, attempt):
+    # A retry must not be served the cached answer that just failed
+    if attempt == 1:
+        return await llm.ainvoke(prompt)
+    from llm_cache import ainvoke_fresh
+    return await ainvoke_fresh(llm, prompt)
+
+async def generate_table(llm, semaphore, question, ddl, table, rows, csv_folder, retries):
+    columns = ", ".join(col for col, _ in table['columns'])
+    prompt = TABLE_PROMPT.format(ddl=ddl, table=table['name'], columns=columns, rows=rows, question=question)
+    last_error = None
+    for attempt in range(1, retries + 2):
+        try:
+            async with semaphore:
+                with span('generate_table', kind='llm_task', table=table['name'], attempt=attempt):
+                    sql = response_text(await ask(llm, prompt, attempt))
+            counts = save_insert_stream_to_csv(sql, csv_folder, tables=[table['name']])
+            if counts:
+                return table['name'], sql, counts[table['name'].lower()], None
+            last_error = "no INSERT rows in response"
+        except Exception as e:
+            last_error = str(e)
+        print(f"Table '{table['name']}' attempt {attempt} failed: {last_error}")
+        if attempt <= retries:
+            await asyncio.sleep(min(2 ** (attempt - 1), 30))
+    return table['name'], None, 0, last_error
+
+async def generate_tables_concurrently(llm, question, csv_folder, rows_per_table=15,
+                                       max_concurrency=4, retries=2):
+    # Fetch the schema once, then ask for every table's INSERTs in parallel.
+    # Each finished table is written and recorded in generation_progress.json
+    # immediately, so a rerun of the same question only redoes what failed.
+    os.makedirs(csv_folder, exist_ok=True)
+    progress = load_progress(csv_folder, question)
+
+    if not progress['ddl']:
+        progress['ddl'] = response_text(await llm.ainvoke(SCHEMA_PROMPT.format(question=question)))
+        save_progress(csv_folder, progress)
+    ddl = progress['ddl']
+
+    tables = list(iter_create_tables(ddl))
+    if not tables:
+        print("No CREATE TABLE statements found in the schema response.")
+        return ddl, progress
+
+    pending = [t for t in tables if t['name'] not in progress['tables']]
+    if len(pending) < len(tables):
+        print(f"Resuming: {len(tables) - len(pending)} of {len(tables)} tables already generated.")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = [
+        asyncio.create_task(generate_table(llm, semaphore, question, ddl, t, rows_per_table, csv_folder, retries))
+        for t in pending
+    ]
+    for finished in asyncio.as_completed(tasks):
+        name, sql, n_rows, error = await finished
+        if sql is None:
+            progress['failed'][name] = error
+        else:
+            progress['tables'][name] = {'rows': n_rows, 'sql': sql}
+            progress['failed'].pop(name, None)
+        save_progress(csv_folder, progress)
+
+    if progress['failed']:
+        print(f"Tables that still failed after {retries} retries: {', '.join(progress['failed'])}")
+
+    inserts = [progress['tables'][t['name']]['sql'] for t in tables if t['name'] in progress['tables']]
+    return "\n\n".join([ddl] + inserts), progress
@@ -1,48 +1,43 @@
 import os
-import atexit
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
-from langchain_community.chat_models import ChatOpenAI
-from langchain_experimental.agents import create_csv_agent
+from date_inference import looks_like_dates, parse_date_column, winning_format
+from streaming_audit import analyze_csv_file_streaming
+from audit_cache import load_audit_cache, save_audit_cache, file_fingerprint, classify_change, audit_appended_rows
+from join_graph import build_join_graph, make_view_loader, describe_join_graph
+from compact_loader import read_csv_compact
+from integrity_check import check_integrity, print_integrity_report
+from typo_detection import load_sentinels, find_typos
+from outlier_engine import detect_outliers, outlier_values
+from instrumentation import span
+from quick_answers import answer_from_analysis, data_fingerprint, answer_key, load_answer_cache, save_answer_cache
 
 # Directory containing CSV files
 CSV_FOLDER = r"D:\LangChain\Internship_Pune_TCS\Industry Level Data Handling\Industry-Sub_domain Data"
+# Merged file written by older versions; never audited as a table
 MERGED_FILE_NAME = "__merged_all_data.csv"
-temp_merged_path = os.path.join(CSV_FOLDER, MERGED_FILE_NAME)
-
-# Register cleanup to delete merged file on exit
-def cleanup():
-    if os.path.exists(temp_merged_path):
-        try:
-            os.remove(temp_merged_path)
-            print(f"Deleted file: {temp_merged_path}")
-        except Exception as e:
-            print(f"Could not delete {temp_merged_path}: {e}")
-
-atexit.register(cleanup)
+# Sentinel vocabulary; extend it through AUDIT_SENTINELS_FILE
+SUSPICIOUS_VALUES = load_sentinels()
+# Numeric outlier method ('iqr', 'mad' or 'percentile') and per-column
+# overrides, e.g. {'Price': 'mad', 'Quantity': {'method': 'iqr', 'threshold': 3}}
+OUTLIER_METHOD = 'iqr'
+OUTLIER_OVERRIDES = {}
+# Files larger than this are audited chunk by chunk instead of loaded whole
+STREAMING_THRESHOLD_BYTES = 256 * 1024 * 1024
+# Folders smaller than this are audited in-process; worker start-up would cost more
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+# Files larger than this are split by column across the worker pool
+COLUMN_SPLIT_THRESHOLD_BYTES = 128 * 1024 * 1024
 
 def parse_dates_with_multiple_formats(series):
-    import dateutil.parser
-    parsed_dates = []
-    for val in series:
-        parsed = None
-        for fmt in ['%Y-%m-%d', '%d-%m-%Y', '%m/%d/%Y', '%Y/%m/%d']:
-            try:
-                parsed = pd.to_datetime(val, format=fmt, errors='raise')
-                break
-            except Exception:
-                continue
-        if parsed is None:
-            try:
-                parsed = dateutil.parser.parse(val)
-            except Exception:
-                parsed = pd.NaT
-        parsed_dates.append(parsed)
-    return pd.Series(parsed_dates)
+    # One vectorized pass per candidate format, dateutil only for leftovers
+    parsed, _ = parse_date_column(series)
+    return parsed
 
-def analyze_csv_file(file_path):
-    df = pd.read_csv(file_path)
+def analyze_csv_file(file_path, usecols=None):
+    df = read_csv_compact(file_path, usecols=usecols)
     analysis = {}
     analysis['file_name'] = os.path.basename(file_path)
     analysis['num_rows'] = df.shape[0]
@@ -53,22 +48,24 @@ def analyze_csv_file(file_path):
     missing_data = df.isnull().sum()
     analysis['missing_data'] = missing_data[missing_data > 0].to_dict()
 
-    # Numeric outliers using IQR
-    outliers = {}
-    for col in df.select_dtypes(include=[float, int, np.number]).columns:
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        outlier_values = df[(df[col] < lower_bound) | (df[col] > upper_bound)][col].tolist()
-        if outlier_values:
-            outliers[col] = outlier_values
+    # Numeric outliers: one vectorized sweep over all numeric columns
+    with span('detect_outliers', file=analysis['file_name'], rows=len(df)):
+        detected = detect_outliers(df, OUTLIER_METHOD, overrides=OUTLIER_OVERRIDES)
+    outliers = outlier_values(df, detected)
+    analysis['outlier_rows'] = {col: {'method': info['method'], 'rows': info['rows'], 'scores': info['scores']}
+                                for col, info in detected.items()}
 
     # Date outliers (dates far in past or future)
-    for col in df.select_dtypes(include=['object']).columns:
+    date_formats = {}
+    for col in df.select_dtypes(include=['object', 'string', 'category']).columns:
+        # Names, emails etc. are rejected from a small sample before parsing
+        if not looks_like_dates(df[col]):
+            continue
         try:
-            dates = parse_dates_with_multiple_formats(df[col])
+            with span('parse_date_column', file=analysis['file_name'], column=col, rows=len(df)):
+                dates, report = parse_date_column(df[col])
+            if report:
+                date_formats[col] = winning_format(report)
             if dates.notnull().any():
                 outlier_dates = dates[(dates < pd.Timestamp('1900-01-01')) | (dates > pd.Timestamp('2100-01-01'))]
                 if not outlier_dates.empty:
@@ -77,43 +74,187 @@ def analyze_csv_file(file_path):
             pass
 
     analysis['outliers'] = outliers
+    analysis['date_formats'] = date_formats
 
     # Suspicious categorical values
     suspicious_values = {}
-    suspicious_list = ['Unknown', 'unknown', 'XX', 'NULL', 'null', None]
-    for col in df.select_dtypes(include=['object']).columns:
-        suspicious_vals = df[col][df[col].isin(suspicious_list)].dropna().unique().tolist()
+    for col in df.select_dtypes(include=['object', 'string', 'category']).columns:
+        suspicious_vals = df[col][df[col].isin(SUSPICIOUS_VALUES)].dropna().unique().tolist()
         if suspicious_vals:
             suspicious_values[col] = suspicious_vals
     analysis['suspicious_values'] = suspicious_values
 
+    # Rare near-duplicates of frequent values ("Taylr Swft" next to "Taylor Swift")
+    text_columns = [c for c in df.select_dtypes(include=['object', 'string', 'category']).columns
+                    if c not in date_formats]
+    with span('find_typos', file=analysis['file_name'], columns=len(text_columns)):
+        analysis['typos'] = find_typos(df, text_columns)
+
     return analysis
 
-def analyze_all_csv_files(csv_folder):
-    results = []
-    for filename in os.listdir(csv_folder):
-        if filename.lower().endswith('.csv') and filename != MERGED_FILE_NAME:
+def analyze_one_file(file_path, chunk_size=None, collect_outliers=True, usecols=None, keep_state=False):
+    # chunk_size forces the streaming audit; otherwise only files above
+    # STREAMING_THRESHOLD_BYTES are streamed.
+    if chunk_size or os.path.getsize(file_path) > STREAMING_THRESHOLD_BYTES:
+        return analyze_csv_file_streaming(
+            file_path, SUSPICIOUS_VALUES, chunk_size=chunk_size or 200_000,
+            collect_outliers=collect_outliers, usecols=usecols, keep_state=keep_state,
+            method=OUTLIER_METHOD, overrides=OUTLIER_OVERRIDES,
+        )
+    with span('analyze_csv_file', file=os.path.basename(file_path)):
+        return analyze_csv_file(file_path, usecols=usecols)
+
+def audit_settings(collect_outliers):
+    # Options a cached audit result depends on; an entry made with any other
+    # value is stale
+    return {'collect_outliers': collect_outliers, 'sentinels': SUSPICIOUS_VALUES,
+            'outlier_method': OUTLIER_METHOD, 'outlier_overrides': OUTLIER_OVERRIDES}
+
+def analyze_all_csv_files(csv_folder, chunk_size=None, collect_outliers=True, workers=1, use_cache=False):
+    # use_cache serves unchanged files from .audit_cache.json. Appended rows
+    # are folded into the saved running state only for files that were
+    # audited in streaming mode (over STREAMING_THRESHOLD_BYTES, or all of
+    # them when chunk_size is given); any other changed file, appended or
+    # not, is audited again from scratch.
+    file_names = [f for f in os.listdir(csv_folder)
+                  if f.lower().endswith('.csv') and f != MERGED_FILE_NAME]
+    cache = load_audit_cache(csv_folder) if use_cache else {}
+    settings = audit_settings(collect_outliers)
+    done = {}
+    fingerprints = {}
+    to_audit = []
+
+    for filename in file_names:
+        file_path = os.path.join(csv_folder, filename)
+        entry = cache.get(filename)
+        # Entries made with other options, another sentinel list or another
+        # outlier method are stale
+        if not use_cache or not entry or any(entry.get(k) != v for k, v in settings.items()):
+            to_audit.append(filename)
+            continue
+        try:
+            change = classify_change(entry['fingerprint'], file_path)
+            if change == 'unchanged':
+                done[filename] = entry['result']
+                continue
+            if change == 'appended' and entry.get('state'):
+                fingerprint = file_fingerprint(file_path)
+                result, state = audit_appended_rows(file_path, entry, SUSPICIOUS_VALUES, chunk_size or 200_000,
+                                                    method=OUTLIER_METHOD, overrides=OUTLIER_OVERRIDES)
+                done[filename] = result
+                cache[filename] = {'fingerprint': fingerprint, **settings, 'result': result, 'state': state}
+                print(f"Audit cache: folded appended rows of '{filename}' into its saved state.")
+                continue
+        except Exception as e:
+            print(f"Audit cache: re-auditing '{filename}' ({e})")
+        to_audit.append(filename)
+
+    if use_cache:
+        for filename in to_audit:
+            try:
+                fingerprints[filename] = file_fingerprint(os.path.join(csv_folder, filename))
+            except OSError:
+                pass
+
+    total_bytes = sum(os.path.getsize(os.path.join(csv_folder, f)) for f in to_audit)
+    if workers > 1 and total_bytes >= PARALLEL_MIN_BYTES:
+        fresh = analyze_files_parallel(csv_folder, to_audit, workers, chunk_size, collect_outliers, use_cache)
+    else:
+        fresh = []
+        for filename in to_audit:
             file_path = os.path.join(csv_folder, filename)
             try:
-                analysis = analyze_csv_file(file_path)
-                results.append(analysis)
+                analysis = analyze_one_file(file_path, chunk_size, collect_outliers, keep_state=use_cache)
+                fresh.append(analysis)
             except Exception as e:
-                results.append({'file_name': filename, 'error': str(e)})
-    return results
+                fresh.append({'file_name': filename, 'error': str(e)})
+
+    for filename, result in zip(to_audit, fresh):
+        state = result.pop('_state', None)
+        done[filename] = result
+        if use_cache and 'error' not in result and filename in fingerprints:
+            cache[filename] = {'fingerprint': fingerprints[filename], **settings, 'result': result, 'state': state}
 
-def print_incorrect_data_summary(analysis_results):
+    if use_cache:
+        cache = {f: entry for f, entry in cache.items() if f in done}
+        try:
+            save_audit_cache(csv_folder, cache)
+        except OSError as e:
+            print(f"Could not save audit cache: {e}")
+
+    return [done[f] for f in file_names]
+
+def analyze_files_parallel(csv_folder, file_names, workers, chunk_size=None, collect_outliers=True, keep_state=False):
+    # Spread files over a process pool; very large files are split into
+    # column groups so one big table does not leave the other workers idle.
+    # Results come back in listing order and in the usual per-file format.
+    headers = {}
+    tasks = []
+    for filename in file_names:
+        file_path = os.path.join(csv_folder, filename)
+        if os.path.getsize(file_path) > COLUMN_SPLIT_THRESHOLD_BYTES:
+            try:
+                header = list(pd.read_csv(file_path, nrows=0).columns)
+            except Exception:
+                header = []
+            if len(header) > 1:
+                headers[filename] = header
+                for i in range(min(workers, len(header))):
+                    tasks.append((filename, header[i::workers]))
+                continue
+        tasks.append((filename, None))
+
+    parts = {filename: [] for filename in file_names}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (filename, pool.submit(analyze_one_file, os.path.join(csv_folder, filename),
+                                   chunk_size, collect_outliers, usecols, keep_state))
+            for filename, usecols in tasks
+        ]
+        for filename, future in futures:
+            try:
+                parts[filename].append(future.result())
+            except Exception as e:
+                parts[filename].append({'file_name': filename, 'error': str(e)})
+
+    return [merge_column_results(parts[f], headers.get(f)) for f in file_names]
+
+def merge_column_results(parts, header=None):
+    # Combine analyses of disjoint column groups of one file
+    errors = [p for p in parts if 'error' in p]
+    if errors:
+        return errors[0]
+    if len(parts) == 1:
+        return parts[0]
+    merged = dict(parts[0])
+    # Running state of a column subset cannot be extended later; drop it
+    merged.pop('_state', None)
+    for part in parts[1:]:
+        part = {k: v for k, v in part.items() if k != '_state'}
+        for key, value in part.items():
+            if isinstance(value, dict):
+                merged[key] = {**merged.get(key, {}), **value}
+    seen = {c for p in parts for c in p['columns']}
+    merged['columns'] = [c for c in header if c in seen]
+    merged['num_columns'] = len(merged['columns'])
+    return merged
+
+def print_incorrect_data_summary(analysis_results, out=None):
     for result in analysis_results:
-        print(f"\nFile: {result.get('file_name')}")
+        print(f"\nFile: {result.get('file_name')}", file=out)
         if 'error' in result:
-            print(f"  Error reading file: {result['error']}")
+            print(f"  Error reading file: {result['error']}", file=out)
             continue
-        print(f"  Number of rows: {result.get('num_rows')}")
-        print(f"  Number of columns: {result.get('num_columns')}")
-        print(f"  Columns: {result.get('columns')}")
-        print(f"  Missing data counts: {result.get('missing_data')}")
-        print(f"  Outliers detected: {result.get('outliers')}")
-        print(f"  Suspicious categorical values: {result.get('suspicious_values')}")
-        print("-" * 60)
+        print(f"  Number of rows: {result.get('num_rows')}", file=out)
+        print(f"  Number of columns: {result.get('num_columns')}", file=out)
+        print(f"  Columns: {result.get('columns')}", file=out)
+        print(f"  Missing data counts: {result.get('missing_data')}", file=out)
+        print(f"  Outliers detected: {result.get('outliers')}", file=out)
+        print(f"  Date formats detected: {result.get('date_formats')}", file=out)
+        print(f"  Suspicious categorical values: {result.get('suspicious_values')}", file=out)
+        if result.get('typos'):
+            print(f"  Likely typos (variant -> frequent value): {result.get('typos')}", file=out)
+        print("-" * 60, file=out)
 
 def load_and_prepare_csvs(csv_folder):
     csv_files = [f for f in os.listdir(csv_folder)
@@ -122,7 +263,7 @@ def load_and_prepare_csvs(csv_folder):
     for fname in csv_files:
         path = os.path.join(csv_folder, fname)
         try:
-            df = pd.read_csv(path)
+            df = read_csv_compact(path, report=True)
             # Prefix columns with file name (except for the index)
             prefix = os.path.splitext(fname)[0]
             df = df.add_prefix(f"{prefix}__")
@@ -131,62 +272,118 @@ def load_and_prepare_csvs(csv_folder):
             print(f"Error loading {fname}: {e}")
     return dataframes
 
-def merge_dataframes(dataframes):
-    # Concatenate all DataFrames side by side (outer join on index)
-    if not dataframes:
-        return None
-    dfs = list(dataframes.values())
-    merged = pd.concat(dfs, axis=1)
-    return merged
-
-def main():
-    load_dotenv()
-    os.environ["OPENAI_API_KEY"] = os.getenv("OPENROUTER_MISTRAL_SMALL_API_KEY")
-    os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+def agent_prefix(dataframes, graph):
+    # Tells the agent which dfN is which file and how the tables link up
+    tables = "\n".join(f"- df{i + 1}: {name}" for i, name in enumerate(dataframes))
+    return (
+        "You are working with {num_dfs} pandas dataframes in Python, one per CSV file:\n"
+        + tables
+        + "\nColumn names are prefixed with their file name, e.g. 'orders_data__CustomerID'.\n"
+        "Key relationships between the tables:\n"
+        + describe_join_graph(graph)
+        + "\nTo look at a table together with the tables it references, call view('<file name>'), "
+        "e.g. view('orders_data.csv'); it returns one row per row of that table. "
+        "You should use the tools below to answer the question posed of you:"
+    )
 
+def main(csv_folder=None, questions=None, ask=True, workers=None):
+    # questions: answer these and return instead of prompting; ask=False
+    # stops after the audit report, without loading LangChain at all
+    csv_folder = csv_folder or CSV_FOLDER
     # Analyze all CSV files (for summary/incorrect data reporting)
-    analysis_results = analyze_all_csv_files(CSV_FOLDER)
+    with span('analyze_all_csv_files', folder=csv_folder):
+        analysis_results = analyze_all_csv_files(csv_folder, workers=workers or os.cpu_count() or 1, use_cache=True)
 
     # Print incorrect data summary at program start
     print("\nSummary of missing/outlier/suspicious data in all CSV files:")
     print_incorrect_data_summary(analysis_results)
 
-    # Load and merge all CSVs for agent
-    dataframes = load_and_prepare_csvs(CSV_FOLDER)
-    merged_df = merge_dataframes(dataframes)
-    if merged_df is None or merged_df.empty:
+    # Cross-file stage: duplicate primary keys and orphan foreign keys
+    try:
+        with span('check_integrity'):
+            integrity = check_integrity(csv_folder, [r['file_name'] for r in analysis_results if 'error' not in r])
+        print_integrity_report(integrity)
+    except Exception as e:
+        print(f"Could not run the cross-file key checks: {e}")
+
+    if not ask:
+        return analysis_results
+
+    # Load all CSVs for the agent; tables stay separate and are only joined
+    # on demand through view(), following the inferred key relationships
+    dataframes = load_and_prepare_csvs(csv_folder)
+    if not dataframes:
         print("No CSV files found or data could not be loaded.")
         return
+    graph = build_join_graph(dataframes)
 
-    # Save merged dataframe to a temp file for the agent
-    merged_df.to_csv(temp_merged_path, index=False)
+    # The agent (and LangChain with it) is only set up for the first question
+    # the audit results and the answer cache cannot answer
+    agent = []
+    def csv_agent():
+        if not agent:
+            from langchain_community.chat_models import ChatOpenAI
+            from langchain_experimental.agents import create_pandas_dataframe_agent
+            load_dotenv()
+            os.environ["OPENAI_API_KEY"] = os.getenv("OPENROUTER_MISTRAL_SMALL_API_KEY")
+            os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
 
-    # Use a powerful free model if desired:
-    # model_id = "openrouter/openrouter/quasar-alpha"
-    model_id = "mistralai/mistral-small-3.1-24b-instruct:free"
+            # Use a powerful free model if desired:
+            # model_id = "openrouter/openrouter/quasar-alpha"
+            model_id = "mistralai/mistral-small-3.1-24b-instruct:free"
 
-    # Create a single CSV agent over the merged data
-    csv_agent = create_csv_agent(
-        llm=ChatOpenAI(temperature=0, model=model_id),
-        path=temp_merged_path,
-        verbose=True,
-        allow_dangerous_code=True
-    )
+            # Create a single agent over all tables
+            agent.append(create_pandas_dataframe_agent(
+                llm=ChatOpenAI(temperature=0, model=model_id),
+                df=list(dataframes.values()),
+                prefix=agent_prefix(dataframes, graph),
+                verbose=True,
+                allow_dangerous_code=True
+            ))
+            agent[0].tools[0].locals['view'] = make_view_loader(graph)
+        return agent[0]
 
     print("\nAll CSVs loaded. You can now ask any question about any or all files!")
     print("Column names are prefixed with their file name, e.g., 'artists_data__Name'.")
-    print("Type 'exit' to quit.")
+    print("Key relationships found between the files:")
+    print(describe_join_graph(graph))
+    if questions is None:
+        print("Type 'exit' to quit.")
+
+    # Profile questions are answered from the audit results; anything else
+    # is looked up in the answer cache (keyed on the question and the current
+    # CSV files) before it goes to the agent
+    fingerprint = data_fingerprint(csv_folder)
+    answers = load_answer_cache(csv_folder)
+    pending = iter(questions) if questions is not None else None
 
     while True:
-        user_q = input("\nAsk a question about the CSV data (or type 'exit' to quit): ").strip()
+        if pending is None:
+            user_q = input("\nAsk a question about the CSV data (or type 'exit' to quit): ").strip()
+        else:
+            user_q = next(pending, "exit").strip()
+            if user_q.lower() != "exit":
+                print(f"\nQuestion: {user_q}")
         if user_q.lower() == "exit":
             print("Exiting...")
             break
+        quick = answer_from_analysis(user_q, analysis_results)
+        if quick is not None:
+            print("\nAnswer (from the audit):\n", quick)
+            continue
+        key = answer_key(user_q, fingerprint)
+        if key in answers:
+            print("\nAgent answer (cached):\n", answers[key])
+            continue
         try:
-            result = csv_agent.invoke({"input": user_q})
+            with span('agent_question', kind='agent'):
+                result = csv_agent().invoke({"input": user_q})
             print("\nAgent answer:\n", result["output"])
+            answers[key] = result["output"]
+            save_answer_cache(csv_folder, answers)
         except Exception as e:
             print("Error:", e)
+    return analysis_results
 
 if __name__ == '__main__':
     main()
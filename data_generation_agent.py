@@ -1,21 +1,26 @@
 import os
-import csv
-import re
+import asyncio
 from dotenv import load_dotenv
-from langchain_community.chat_models import ChatOpenAI
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain_core.prompts import PromptTemplate
+from sql_insert_parser import save_insert_stream_to_csv
+from instrumentation import span
+from concurrent_generation import generate_tables_concurrently
 
 # Set your desired output folder here
 CSV_FOLDER = r"D:\LangChain\Internship_Pune_TCS\Industry Level Data Handling\Industry-Sub_domain Data"  # <--- Change this to your desired folder path
 
-def generate_sales_sql(question: str, csv_folder: str) -> str:
+def generate_sales_sql(question: str, csv_folder: str, stream: bool = False) -> str:
     if not question.strip():
         raise ValueError("Question cannot be empty.")
 
+    from langchain_community.chat_models import ChatOpenAI
+    from langchain.agents import create_react_agent, AgentExecutor
+    from langchain_core.prompts import PromptTemplate
+    from llm_cache import install_llm_cache
+
     load_dotenv()
     os.environ["OPENAI_API_KEY"]  = os.getenv("OPENROUTER_MISTRAL_SMALL_API_KEY")
     os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+    install_llm_cache()
 
     template = """
     You are an expert SQL database designer and data generator.
@@ -53,11 +58,29 @@ def generate_sales_sql(question: str, csv_folder: str) -> str:
         temperature=0,
     )
 
+    if stream:
+        # Skip the ReAct loop and parse the answer while it is still arriving;
+        # the parser starts at the first CREATE TABLE or INSERT INTO, so
+        # the Thought/Final Answer preamble never reaches the tokenizer.
+        pieces = []
+
+        def streamed_chunks():
+            text = prompt.format(input=question, tools="", tool_names="", agent_scratchpad="")
+            for chunk in llm.stream(text):
+                pieces.append(chunk.content)
+                yield chunk.content
+
+        save_insert_statements_to_csv(streamed_chunks(), csv_folder)
+        output = "".join(pieces)
+        output = output.split("Final Answer:", 1)[-1].replace("``````", "").strip()
+        return output
+
     agent = create_react_agent(llm=llm, prompt=prompt, tools=[])
     executor = AgentExecutor(agent=agent, tools=[], verbose=True, handle_parsing_errors=True, 
                              max_iterations=5)
     
-    result = executor.invoke({"input": question})
+    with span('generate_sql', kind='agent'):
+        result = executor.invoke({"input": question})
     output = result["output"]
 
     output = output.replace("``````", "").strip()
@@ -65,62 +88,144 @@ def generate_sales_sql(question: str, csv_folder: str) -> str:
 
     return output
 
-def save_insert_statements_to_csv(sql_text: str, csv_folder: str):
-    insert_pattern = re.compile(
-        r"INSERT INTO\s+(\w+)\s*\(([^)]+)\)\s*VALUES\s*((?:\([^;]+?\))(?:\s*,\s*\([^;]+?\))*)\s*;",
-        re.IGNORECASE | re.DOTALL
-    )
+def generate_bulk_sales_data(question: str, csv_folder: str, n_rows: int, seed: int = 0) -> str:
+    # The LLM only designs the schema and describes plausible values; every
+    # row is then synthesized locally, so table size no longer costs tokens.
+    if not question.strip():
+        raise ValueError("Question cannot be empty.")
 
-    # Ensure the folder exists
-    os.makedirs(csv_folder, exist_ok=True)
+    from langchain_community.chat_models import ChatOpenAI
+    from langchain_core.prompts import PromptTemplate
+    from llm_cache import install_llm_cache
+    from bulk_row_synthesizer import split_schema_and_hints, synthesize_tables
 
-    matches = insert_pattern.finditer(sql_text)
-    found_any = False
+    load_dotenv()
+    os.environ["OPENAI_API_KEY"]  = os.getenv("OPENROUTER_MISTRAL_SMALL_API_KEY")
+    os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+    install_llm_cache()
 
-    for match in matches:
-        found_any = True
-        table_name = match.group(1)
-        columns = [col.strip() for col in match.group(2).split(",")]
-        values_block = match.group(3).replace('\n', ' ')
+    template = """
+    You are an expert SQL database designer.
 
-        value_rows = re.findall(r"\(([^)]+)\)", values_block)
-        rows = []
-        for value_str in value_rows:
-            values = [v.strip().strip("'").strip('"') for v in re.split(r",(?=(?:[^']*'[^']*')*[^']*$)", value_str)]
-            rows.append(values)
+    Based on the user's input, generate:
+    1. At least 15 well-structured CREATE TABLE statements with PRIMARY KEY and FOREIGN KEY constraints.
+    2. NO INSERT statements.
+    3. After the SQL, a line containing only HINTS: followed by one JSON object that describes
+       realistic values for the user's industry and sub-domain, in the form
+       {{"TableName": {{"ColumnName": <hint>, "rows": <optional row count for small lookup tables>}}}}
+       where <hint> is one of:
+       {{"choices": ["value", ...], "weights": [number, ...]}}
+       {{"min": number, "max": number}}
+       {{"start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}}
+       {{"format": "text with {{id}} placeholder"}}
+       Any hint may also carry "null_rate" between 0 and 1. Skip key columns.
 
-        filename = os.path.join(csv_folder, f"{table_name.lower()}_data.csv")
-        with open(filename, "w", newline='', encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(columns)
-            writer.writerows(rows)
-        print(f"Saved {len(rows)} rows to '{filename}'")
+    Strict formatting rules:
+    - DO NOT use markdown formatting (no triple backticks).
+    - DO NOT include explanations or prefaces like “Here is”.
 
-    if not found_any:
-        print("⚠️ No INSERT INTO statements found in the SQL output.")
+    Question: {input}
+    """
 
-if __name__ == "__main__":
+    prompt = PromptTemplate.from_template(template)
+
+    llm = ChatOpenAI(
+        model="mistralai/mistral-small-3.1-24b-instruct:free",
+        temperature=0,
+    )
+
+    output = llm.invoke(prompt.format(input=question)).content
+    ddl, hints = split_schema_and_hints(output)
+    synthesize_tables(ddl, hints, n_rows, csv_folder, seed=seed)
+
+    return output
+
+def generate_sales_sql_concurrently(question: str, csv_folder: str, rows_per_table: int = 15,
+                                    max_concurrency: int = 4, retries: int = 2, llm=None) -> str:
+    # Schema first, then one INSERT request per table in parallel; wall-clock
+    # time follows the slowest table instead of one huge response. Pass llm
+    # to use any chat model with ainvoke (e.g. a local fake in tests).
+    if not question.strip():
+        raise ValueError("Question cannot be empty.")
+
+    if llm is None:
+        from langchain_community.chat_models import ChatOpenAI
+        from llm_cache import install_llm_cache
+        load_dotenv()
+        os.environ["OPENAI_API_KEY"]  = os.getenv("OPENROUTER_MISTRAL_SMALL_API_KEY")
+        os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+        install_llm_cache()
+        llm = ChatOpenAI(
+            model="mistralai/mistral-small-3.1-24b-instruct:free",
+            temperature=0,
+        )
+
+    output, _ = asyncio.run(generate_tables_concurrently(
+        llm, question, csv_folder, rows_per_table=rows_per_table,
+        max_concurrency=max_concurrency, retries=retries,
+    ))
+    return output
+
+def save_insert_statements_to_csv(sql_text, csv_folder: str):
+    # sql_text may be the full SQL string or any iterable of text chunks
+    # (e.g. read_sql_chunks(path) or streamed LLM output); it is parsed in a
+    # single pass and rows are written to the per-table CSVs as they arrive.
+    counts = save_insert_stream_to_csv(sql_text, csv_folder)
+    if not counts:
+        print("⚠️ No INSERT INTO statements found in the SQL output.")
+    return counts
+
+def main(industry=None, subdomain=None, n_rows=None, concurrent=None, csv_folder=None, seed=0):
+    # Any argument given skips its prompt; with an industry and sub-domain
+    # one dataset is generated and the loop is skipped. n_rows=0 means the
+    # LLM writes the rows.
+    csv_folder = csv_folder or CSV_FOLDER
+    once = bool(industry and subdomain)
     print("\n Welcome to the Industry-Specific SQL Data Generator\n")
     while True:
-        industry = input("Enter industry (e.g., film, music, toys): ").strip()
+        if not industry:
+            industry = input("Enter industry (e.g., film, music, toys): ").strip()
         if not industry:
             print("Industry cannot be empty.")
             continue
 
-        subdomain = input("Enter sub-domain (e.g., revenue, retail, shop_locations): ").strip()
+        if not subdomain:
+            subdomain = input("Enter sub-domain (e.g., revenue, retail, shop_locations): ").strip()
         if not subdomain:
             print("Sub-domain cannot be empty.")
             continue
 
-        user_question = f"Generate a realistic SQL database for the '{industry}' industry focusing on the '{subdomain}' sub-domain. Include at least 15 tables and 15 rows per table."
-
-        print("\n Generating SQL data...\n")
-        sql_result = generate_sales_sql(user_question, CSV_FOLDER)
+        if n_rows is None:
+            answer = input("Rows per table to synthesize locally (press Enter to let the LLM write the rows): ").strip()
+            if answer and not answer.isdigit():
+                print("Rows per table must be a whole number.")
+                continue
+            n_rows = int(answer) if answer else 0
+
+        if n_rows:
+            user_question = f"Design a realistic SQL database schema for the '{industry}' industry focusing on the '{subdomain}' sub-domain. Include at least 15 tables."
+            print(f"\n Generating schema and synthesizing {n_rows} rows per table...\n")
+            sql_result = generate_bulk_sales_data(user_question, csv_folder, n_rows, seed=seed)
+        else:
+            user_question = f"Generate a realistic SQL database for the '{industry}' industry focusing on the '{subdomain}' sub-domain. Include at least 15 tables and 15 rows per table."
+            if concurrent is None:
+                concurrent = input("Request each table's rows concurrently? (y/n): ").strip().lower() == "y"
+            print("\n Generating SQL data...\n")
+            if concurrent:
+                sql_result = generate_sales_sql_concurrently(user_question, csv_folder)
+            else:
+                sql_result = generate_sales_sql(user_question, csv_folder)
         print("\n SQL Generation Complete. Output:")
         print(sql_result)
         print("-" * 60)
+        if once:
+            break
 
         again = input("\n Do you want to generate another one? (y/n): ").strip().lower()
         if again != "y":
             print("Exiting...")
             break
+        industry = subdomain = n_rows = concurrent = None
+
+if __name__ == "__main__":
+    main()
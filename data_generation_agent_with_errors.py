@@ -1,20 +1,23 @@
 import os
-import csv
-import re
 from dotenv import load_dotenv
-from langchain_community.chat_models import ChatOpenAI
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain_core.prompts import PromptTemplate
+from sql_insert_parser import save_insert_stream_to_csv
+from instrumentation import span
 
 CSV_FOLDER = r"D:\LangChain\Internship_Pune_TCS\Industry Level Data Handling\Industry-Sub_domain Data"  # <--- Change this to your desired folder path
 
-def generate_sales_sql(question: str, csv_folder: str) -> str:
+def generate_sales_sql(question: str, csv_folder: str, stream: bool = False) -> str:
     if not question.strip():
         raise ValueError("Question cannot be empty.")
 
+    from langchain_community.chat_models import ChatOpenAI
+    from langchain.agents import create_react_agent, AgentExecutor
+    from langchain_core.prompts import PromptTemplate
+    from llm_cache import install_llm_cache
+
     load_dotenv()
     os.environ["OPENAI_API_KEY"]  = os.getenv("OPENROUTER_MISTRAL_SMALL_API_KEY")
     os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+    install_llm_cache()
 
     template = """
     You are an expert SQL database designer and data generator.
@@ -62,11 +65,30 @@ def generate_sales_sql(question: str, csv_folder: str) -> str:
         temperature=0,
     )
 
+    if stream:
+        # Skip the ReAct loop and parse the answer while it is still arriving;
+        # the parser starts at the first CREATE TABLE or INSERT INTO, so
+        # the Thought/Final Answer preamble never reaches the tokenizer.
+        pieces = []
+
+        def streamed_chunks():
+            text = prompt.format(input=question, tools="", tool_names="", agent_scratchpad="")
+            for chunk in llm.stream(text):
+                pieces.append(chunk.content)
+                yield chunk.content
+
+        save_insert_statements_to_csv(streamed_chunks(), csv_folder)
+        output = "".join(pieces)
+        output = output.split("Final Answer:", 1)[-1].replace("``````", "").strip()
+        save_sql_to_file(output, csv_folder)
+        return output
+
     agent = create_react_agent(llm=llm, prompt=prompt, tools=[])
     executor = AgentExecutor(agent=agent, tools=[], verbose=True, handle_parsing_errors=True, 
                              max_iterations=5)
     
-    result = executor.invoke({"input": question})
+    with span('generate_sql', kind='agent'):
+        result = executor.invoke({"input": question})
     output = result["output"]
 
     output = output.replace("``````", "").strip()
@@ -75,38 +97,14 @@ def generate_sales_sql(question: str, csv_folder: str) -> str:
 
     return output
 
-def save_insert_statements_to_csv(sql_text: str, csv_folder: str):
-    insert_pattern = re.compile(
-        r"INSERT INTO\s+(\w+)\s*\(([^)]+)\)\s*VALUES\s*((?:\([^;]+?\))(?:\s*,\s*\([^;]+?\))*)\s*;",
-        re.IGNORECASE | re.DOTALL
-    )
-
-    os.makedirs(csv_folder, exist_ok=True)
-
-    matches = insert_pattern.finditer(sql_text)
-    found_any = False
-
-    for match in matches:
-        found_any = True
-        table_name = match.group(1)
-        columns = [col.strip() for col in match.group(2).split(",")]
-        values_block = match.group(3).replace('\n', ' ')
-
-        value_rows = re.findall(r"\(([^)]+)\)", values_block)
-        rows = []
-        for value_str in value_rows:
-            values = [v.strip().strip("'").strip('"') for v in re.split(r",(?=(?:[^']*'[^']*')*[^']*$)", value_str)]
-            rows.append(values)
-
-        filename = os.path.join(csv_folder, f"{table_name.lower()}_data.csv")
-        with open(filename, "w", newline='', encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(columns)
-            writer.writerows(rows)
-        print(f"Saved {len(rows)} rows to '{filename}'")
-
-    if not found_any:
+def save_insert_statements_to_csv(sql_text, csv_folder: str):
+    # sql_text may be the full SQL string or any iterable of text chunks
+    # (e.g. read_sql_chunks(path) or streamed LLM output); it is parsed in a
+    # single pass and rows are written to the per-table CSVs as they arrive.
+    counts = save_insert_stream_to_csv(sql_text, csv_folder)
+    if not counts:
         print("No INSERT INTO statements found in the SQL output.")
+    return counts
 
 def save_sql_to_file(sql_text: str, csv_folder: str):
     file_path = os.path.join(csv_folder, "create_insert_statements.sql")
@@ -114,15 +112,37 @@ def save_sql_to_file(sql_text: str, csv_folder: str):
         f.write(sql_text)
     print(f"All CREATE and INSERT INTO statements saved to '{file_path}'")
 
-if __name__ == "__main__":
+def inject_errors_into_clean_data(clean_folder: str, csv_folder: str, seed: int = 0):
+    # Local alternative to prompting for errors: corrupt an existing clean CSV
+    # set (e.g. from data_generation_agent.py) at controlled per-column rates.
+    # Ground-truth masks are written to <csv_folder>/_ground_truth.
+    if not os.path.isdir(clean_folder):
+        raise ValueError(f"Clean data folder not found: {clean_folder}")
+    if os.path.abspath(clean_folder) == os.path.abspath(csv_folder):
+        raise ValueError("Output folder must differ from the clean data folder.")
+    from error_injection import corrupt_csv_folder
+    return corrupt_csv_folder(clean_folder, csv_folder, seed=seed)
+
+def main(industry=None, subdomain=None, clean_folder=None, csv_folder=None, seed=0):
+    # Any argument given skips its prompt; with an industry and sub-domain
+    # (or a clean folder) one dataset is produced and the loop is skipped
+    csv_folder = csv_folder or CSV_FOLDER
     print("\n Welcome to the Industry-Specific SQL Data Generator\n")
+    if clean_folder is None and not (industry and subdomain):
+        clean_folder = input("Path of a clean CSV folder to corrupt locally (press Enter to generate with the LLM): ").strip()
+    if clean_folder:
+        inject_errors_into_clean_data(clean_folder, csv_folder, seed=seed)
+        return
+    once = bool(industry and subdomain)
     while True:
-        industry = input("Enter industry (e.g., film, music, toys): ").strip()
+        if not industry:
+            industry = input("Enter industry (e.g., film, music, toys): ").strip()
         if not industry:
             print("Industry cannot be empty.")
             continue
 
-        subdomain = input("Enter sub-domain (e.g., revenue, retail, shop_locations): ").strip()
+        if not subdomain:
+            subdomain = input("Enter sub-domain (e.g., revenue, retail, shop_locations): ").strip()
         if not subdomain:
             print("Sub-domain cannot be empty.")
             continue
@@ -130,12 +150,18 @@ if __name__ == "__main__":
         user_question = f"Generate a realistic SQL database for the '{industry}' industry focusing on the '{subdomain}' sub-domain. Include at least 10 tables and 10 rows per table."
 
         print("\n Generating SQL data...\n")
-        sql_result = generate_sales_sql(user_question, CSV_FOLDER)
+        sql_result = generate_sales_sql(user_question, csv_folder)
         print("\n SQL Generation Complete. Output:")
         print(sql_result)
         print("-" * 60)
+        if once:
+            break
 
         again = input("\n Do you want to generate another one? (y/n): ").strip().lower()
         if again != "y":
             print("Exiting...")
             break
+        industry = subdomain = None
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,178 @@
 import os
+import time
+import asyncio
+import threading
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_experimental.agents import create_csv_agent
+from compact_loader import read_csv_compact
+from instrumentation import span
+from instruction_compiler import compile_instruction_lines, apply_op
+from write_buffer import open_buffer, working_frame, record_edit, undo, redo, commit, is_dirty
 
-# Load environment variables (for API key)
-load_dotenv()
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENROUTER_MISTRAL_SMALL_API_KEY")
-os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+
+# Files edited at the same time in batch mode; lines for one file always
+# run in their original order
+BATCH_CONCURRENCY = int(os.getenv("MODIFICATION_CONCURRENCY", "4"))
+
+# The pandas agents' Python tool redirects the process-wide sys.stdout while
+# it runs code, so two agents running at once capture each other's output
+# (or leave stdout on a closed buffer). Every agent call in the process,
+# batch lines and service jobs alike, holds this lock; compiled edits do not.
+AGENT_TOOL_LOCK = threading.Lock()
 
 CSV_DIR = r"D:\LangChain\Internship_Pune_TCS\Industry Level Data Handling\Industry-Sub_domain Data"
 
+def make_llm():
+    # LangChain is imported on first use, so batches made only of compiled
+    # instructions never load it
+    from langchain_openai import ChatOpenAI
+    # Load environment variables (for API key)
+    load_dotenv()
+    os.environ["OPENAI_API_KEY"] = os.getenv("OPENROUTER_MISTRAL_SMALL_API_KEY")
+    os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+    return ChatOpenAI(model="mistralai/mistral-small-3.1-24b-instruct:free", temperature=0)
+
 def list_csv_files(directory):
     return [f for f in os.listdir(directory)
             if os.path.isfile(os.path.join(directory, f)) and f.lower().endswith('.csv')]
 
-def process_instruction_file(instruction_file):
+def load_for_editing(file_path):
+    # Arrow-backed strings only: the agent edits values in place, so no
+    # categoricals (new labels would be rejected) and no narrow integers
+    # (arithmetic on them overflows silently)
+    return read_csv_compact(file_path, categories=False, downcast=False, report=True)
+
+def agent_frame(agent_executor):
+    # The DataFrame the agent's Python tool worked on, or None
+    tool = agent_executor.tools[0]
+    if hasattr(tool, "df"):
+        return tool.df
+    if hasattr(tool, "locals") and "df" in tool.locals:
+        return tool.locals["df"]
+    if hasattr(tool, "_locals") and "df" in tool._locals:
+        return tool._locals["df"]
+    return None
+
+def start_agent_edit(agent_executor, buffer):
+    # The agent works on a copy of the buffered frame
+    tool = agent_executor.tools[0]
+    if hasattr(tool, "locals"):
+        tool.locals["df"] = working_frame(buffer)
+
+def finish_agent_edit(agent_executor, buffer, instruction):
+    # Journal what the agent left in its df as one edit
+    df = agent_frame(agent_executor)
+    if df is None:
+        print("No DataFrame found to save.")
+        return None
+    return record_edit(buffer, df, instruction)
+
+def apply_compiled_edit(buffer, op, instruction, filename):
+    # Returns (journal entry or None, message)
+    with span('compiled_op', kind='transform', file=filename, op=op['op']):
+        df, message = apply_op(working_frame(buffer), op)
+    return record_edit(buffer, df, instruction), message
+
+def invoke_agent_edit(agent_executor, buffer, instruction, filename):
+    # Runs the agent on a fresh working frame; returns its response
+    with AGENT_TOOL_LOCK:
+        start_agent_edit(agent_executor, buffer)
+        with span('agent_instruction', kind='agent', file=filename):
+            return agent_executor.invoke({"input": instruction})
+
+def run_agent_edit(agent_executor, buffer, instruction, filename):
+    response = invoke_agent_edit(agent_executor, buffer, instruction, filename)
+    print("Agent:", response.get("output"))
+    return finish_agent_edit(agent_executor, buffer, instruction)
+
+def commit_buffer(buffer, filename):
+    try:
+        if commit(buffer):
+            print(f"Changes saved to '{filename}'.")
+        return True
+    except Exception as e:
+        print(f"Warning: Could not save changes to '{filename}': {e}")
+        return False
+
+async def run_file_plan(filename, steps, get_llm, semaphore, verbose):
+    # One load, every instruction for the file in order, one save. Runs of
+    # compiled ops are applied directly; only unrecognised instructions go
+    # to the agent, which works on the same buffered frame, one agent line
+    # at a time across all files. Returns a status dict per line.
+    statuses = [{'line': idx, 'file': filename, 'via': 'compiled' if op else 'agent',
+                 'status': 'pending', 'detail': ''} for idx, _, op in steps]
+    async with semaphore:
+        start = time.perf_counter()
+        file_path = os.path.join(CSV_DIR, filename)
+        try:
+            buffer = open_buffer(file_path, await asyncio.to_thread(load_for_editing, file_path))
+        except Exception as e:
+            for status in statuses:
+                status.update(status='failed', detail=f"could not load file: {e}")
+            return statuses, time.perf_counter() - start
+        agent_executor = None
+
+        for (idx, instruction, op), status in zip(steps, statuses):
+            print(f"[{filename}] Instruction {idx}: {instruction}")
+            try:
+                if op is not None:
+                    entry, status['detail'] = apply_compiled_edit(buffer, op, instruction, filename)
+                else:
+                    if agent_executor is None:
+                        from langchain_experimental.agents import create_pandas_dataframe_agent
+                        agent_executor = create_pandas_dataframe_agent(
+                            get_llm(), working_frame(buffer), verbose=verbose, allow_dangerous_code=True
+                        )
+                    # Agent lines from different files take turns (see
+                    # AGENT_TOOL_LOCK); compiled ops keep running meanwhile
+                    response = await asyncio.to_thread(invoke_agent_edit, agent_executor, buffer,
+                                                       instruction, filename)
+                    status['detail'] = str(response.get("output"))
+                    entry = finish_agent_edit(agent_executor, buffer, instruction)
+                status['status'] = 'applied' if entry is not None else 'unchanged'
+            except Exception as e:
+                status.update(status='failed', detail=str(e))
+            print(f"[{filename}] Line {idx} {status['status']}: {status['detail']}")
+
+        if is_dirty(buffer) and not await asyncio.to_thread(commit_buffer, buffer, filename):
+            for status in statuses:
+                if status['status'] == 'applied':
+                    status['status'] = 'not saved'
+        return statuses, time.perf_counter() - start
+
+async def run_batch(plan, max_concurrency):
+    # Each file's queue is one task; up to max_concurrency files are open
+    # at once, so the batch takes about as long as its busiest file
+    semaphore = asyncio.Semaphore(max_concurrency)
+    verbose = max_concurrency == 1
+    # The model is only set up if some instruction needs it
+    llm = []
+    def get_llm():
+        if not llm:
+            llm.append(make_llm())
+        return llm[0]
+
+    results = await asyncio.gather(*(run_file_plan(filename, steps, get_llm, semaphore, verbose)
+                                     for filename, steps in plan.items()))
+    statuses = [status for file_statuses, _ in results for status in file_statuses]
+    timings = {filename: seconds for filename, (_, seconds) in zip(plan, results)}
+    return statuses, timings
+
+def print_batch_report(statuses, timings, seconds):
+    print("\nBatch report:")
+    print(f"  {'line':>5}  {'file':<30} {'via':<9} {'status':<10} detail")
+    for status in sorted(statuses, key=lambda s: s['line']):
+        detail = " ".join(status['detail'].split())
+        detail = detail if len(detail) <= 70 else detail[:67] + "..."
+        print(f"  {status['line']:>5}  {status['file'][:30]:<30} {status['via']:<9} {status['status']:<10} {detail}")
+    totals = {}
+    for status in statuses:
+        totals[status['status']] = totals.get(status['status'], 0) + 1
+    print("  " + ", ".join(f"{count} {name}" for name, count in sorted(totals.items())))
+    if timings:
+        busiest = max(timings, key=timings.get)
+        print(f"  Finished in {seconds:.1f}s; busiest file '{busiest}' took {timings[busiest]:.1f}s")
+
+def process_instruction_file(instruction_file, max_concurrency=BATCH_CONCURRENCY):
     try:
         with open(instruction_file, 'r', encoding='utf-8') as f:
             lines = [line.strip() for line in f if line.strip()]
@@ -25,55 +183,26 @@ def process_instruction_file(instruction_file):
     if not lines:
         print("Instruction file is empty.")
         return
+    return process_instructions(lines, max_concurrency)
 
-    files = set(list_csv_files(CSV_DIR))
-    llm = ChatOpenAI(model="mistralai/mistral-small-3.1-24b-instruct:free", temperature=0)
-    agents = {}
-
-    for idx, line in enumerate(lines, 1):
-        if ':' not in line:
-            print(f"Line {idx} skipped (missing colon): {line}")
-            continue
-        filename, instruction = line.split(':', 1)
-        filename = filename.strip()
-        instruction = instruction.strip()
-        if filename not in files:
-            print(f"Line {idx} skipped (CSV file '{filename}' not found): {line}")
-            continue
-
-        file_path = os.path.join(CSV_DIR, filename)
-        if filename not in agents:
-            agents[filename] = create_csv_agent(
-                llm, file_path, verbose=True, allow_dangerous_code=True
-            )
-        agent_executor = agents[filename]
-
-        print(f"\nInstruction {idx} for '{filename}': {instruction}")
-        response = agent_executor.invoke({"input": instruction})
-        print("Agent:", response.get("output"))
+def process_instructions(lines, max_concurrency=BATCH_CONCURRENCY):
+    # lines are "filename: instruction", as in an instruction file
+    plan, problems = compile_instruction_lines(lines, set(list_csv_files(CSV_DIR)))
+    steps = [step for file_steps in plan.values() for step in file_steps]
+    compiled = sum(op is not None for _, _, op in steps)
+    print(f"{compiled} of {len(steps)} instructions compiled to direct edits, "
+          f"{len(steps) - compiled} sent to the agent, across {len(plan)} files.")
 
-        tool = agent_executor.tools[0]
-        try:
-            if hasattr(tool, "df"):
-                df = tool.df
-                df.to_csv(file_path, index=False)
-                print(f"Changes saved to '{filename}'.")
-            elif hasattr(tool, "locals") and "df" in tool.locals:
-                df = tool.locals["df"]
-                df.to_csv(file_path, index=False)
-                print(f"Changes saved to '{filename}'.")
-            elif hasattr(tool, "_locals") and "df" in tool._locals:
-                df = tool._locals["df"]
-                df.to_csv(file_path, index=False)
-                print(f"Changes saved to '{filename}'.")
-            else:
-                print("No DataFrame found to save.")
-        except Exception as e:
-            print(f"Warning: Could not save changes to '{filename}': {e}")
-        print("-" * 50)
+    start = time.perf_counter()
+    statuses, timings = asyncio.run(run_batch(plan, max(1, max_concurrency)))
+    statuses += [{'line': idx, 'file': line.split(':', 1)[0].strip() if ':' in line else '-',
+                  'via': '-', 'status': 'skipped', 'detail': reason} for idx, line, reason in problems]
+    print_batch_report(statuses, timings, time.perf_counter() - start)
+    return statuses
 
 def interactive_mode():
-    llm = ChatOpenAI(model="mistralai/mistral-small-3.1-24b-instruct:free", temperature=0)
+    from langchain_experimental.agents import create_pandas_dataframe_agent
+    llm = make_llm()
     while True:
         files = list_csv_files(CSV_DIR)
         if not files:
@@ -94,40 +223,36 @@ def interactive_mode():
             continue
 
         file_path = os.path.join(CSV_DIR, selected)
-        agent_executor = create_csv_agent(
-            llm, file_path, verbose=True, allow_dangerous_code=True
+        # Edits are buffered and written when leaving the file or on 'save'
+        buffer = open_buffer(file_path, load_for_editing(file_path))
+        agent_executor = create_pandas_dataframe_agent(
+            llm, working_frame(buffer), verbose=True, allow_dangerous_code=True
         )
 
         while True:
-            user_input = input(f"\nEnter instruction for '{selected}' (or type 'change' to pick another file, 'exit' to quit, or 'mode' to switch mode):\n")
-            if user_input.lower() == "exit":
-                return
-            if user_input.lower() == "change":
-                break
-            if user_input.lower() == "mode":
+            user_input = input(f"\nEnter instruction for '{selected}' (or type 'save' to write changes, 'undo'/'redo' to step through edits, 'change' to pick another file, 'exit' to quit, or 'mode' to switch mode):\n")
+            command = user_input.strip().lower()
+            if command in ("exit", "change", "mode"):
+                commit_buffer(buffer, selected)
+                if command == "change":
+                    break
                 return
-
-            response = agent_executor.invoke({"input": user_input})
-            print("Agent:", response.get("output"))
-
-            tool = agent_executor.tools[0]
-            try:
-                if hasattr(tool, "df"):
-                    df = tool.df
-                    df.to_csv(file_path, index=False)
-                    print(f"Changes saved to '{selected}'.")
-                elif hasattr(tool, "locals") and "df" in tool.locals:
-                    df = tool.locals["df"]
-                    df.to_csv(file_path, index=False)
-                    print(f"Changes saved to '{selected}'.")
-                elif hasattr(tool, "_locals") and "df" in tool._locals:
-                    df = tool._locals["df"]
-                    df.to_csv(file_path, index=False)
-                    print(f"Changes saved to '{selected}'.")
+            if command == "save":
+                if not is_dirty(buffer):
+                    print("No unsaved changes.")
+                commit_buffer(buffer, selected)
+                continue
+            if command in ("undo", "redo"):
+                entry = undo(buffer) if command == "undo" else redo(buffer)
+                if entry is None:
+                    print(f"Nothing to {command}.")
                 else:
-                    print("No DataFrame found to save.")
-            except Exception as e:
-                print(f"Warning: Could not save changes to '{selected}': {e}")
+                    print(f"{command.capitalize()}: {entry['label']} ({entry['summary']})")
+                continue
+
+            entry = run_agent_edit(agent_executor, buffer, user_input, selected)
+            if entry is not None:
+                print(f"Buffered: {entry['summary']} (type 'save' to write now)")
 
 def main():
     while True:
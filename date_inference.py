@@ -0,0 +1,80 @@
+import re
+import pandas as pd
+
+# Formats the audit has always accepted, in their original priority order
+DATE_FORMATS = ['%Y-%m-%d', '%d-%m-%Y', '%m/%d/%Y', '%Y/%m/%d']
+
+# Cheap shape test: digits separated by - / or . somewhere in the value.
+# Names, emails and free text fail this on the sample and are skipped whole.
+DATE_SHAPE = re.compile(r"\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}")
+# Microsecond resolution keeps sentinel dates like 9999-12-31, which are
+# exactly the outliers the audit is looking for, instead of overflowing
+DATE_DTYPE = 'datetime64[us]'
+MONTH_NAMES = re.compile(r"\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b", re.IGNORECASE)
+
+def looks_like_dates(series, sample_size=200, min_share=0.5):
+    sample = series.dropna()
+    if sample.empty:
+        return False
+    sample = sample.sample(min(sample_size, len(sample)), random_state=0).astype(str)
+    shaped = sample.str.contains(DATE_SHAPE) | sample.str.contains(MONTH_NAMES)
+    return shaped.mean() >= min_share
+
+def rank_date_formats(sample, formats=DATE_FORMATS):
+    # Count how many sample values each format parses; formats with no hits
+    # are only tried later on the leftovers.
+    hits = {}
+    for fmt in formats:
+        hits[fmt] = int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+    ranked = [fmt for fmt in sorted(formats, key=lambda f: -hits[f]) if hits[fmt]]
+    unranked = [fmt for fmt in formats if not hits[fmt]]
+    return ranked, unranked
+
+def parse_with_fallback(value):
+    import dateutil.parser
+    try:
+        return pd.Timestamp(dateutil.parser.parse(value).replace(tzinfo=None))
+    except Exception:
+        return pd.NaT
+
+def parse_date_column(series, sample_size=500, formats=DATE_FORMATS):
+    # Return (parsed, report). Each format is applied to all still-unparsed
+    # values in one vectorized call; only what no format understands goes
+    # through dateutil, once per distinct value. report counts the values
+    # each format won, plus 'dateutil' and 'unparsed'.
+    values = series.astype(object).where(series.notna(), None)
+    text = values.dropna().astype(str)
+    parsed = pd.Series(pd.NaT, index=series.index, dtype=DATE_DTYPE)
+    report = {}
+    if text.empty:
+        return parsed, report
+
+    sample = text.sample(min(sample_size, len(text)), random_state=0)
+    ranked, unranked = rank_date_formats(sample, formats)
+
+    remaining = text
+    for fmt in ranked + unranked:
+        if remaining.empty:
+            break
+        attempt = pd.to_datetime(remaining, format=fmt, errors='coerce')
+        won = attempt.notna()
+        if won.any():
+            parsed.loc[attempt.index[won]] = attempt[won].astype(DATE_DTYPE)
+            report[fmt] = int(won.sum())
+            remaining = remaining[~won]
+
+    if not remaining.empty:
+        lookup = {v: parse_with_fallback(v) for v in remaining.unique()}
+        fallback = pd.Series(remaining.map(lookup).tolist(), index=remaining.index, dtype=DATE_DTYPE)
+        won = fallback.notna()
+        if won.any():
+            parsed.loc[fallback.index[won]] = fallback[won].astype(DATE_DTYPE)
+            report['dateutil'] = int(won.sum())
+        if (~won).any():
+            report['unparsed'] = int((~won).sum())
+
+    return parsed, report
+
+def winning_format(report):
+    formats = {k: v for k, v in report.items() if k != 'unparsed'}
+    return max(formats, key=formats.get) if formats else None
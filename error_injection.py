@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+
+# Fraction of cells that receive each kind of error, by column kind.
+# Every cell gets at most one error; the rates of a column must sum to <= 1.
+DEFAULT_ERROR_RATES = {
+    'numeric': {'spike': 0.01, 'negative': 0.01, 'sentinel': 0.005, 'null': 0.02},
+    'string': {'typo': 0.02, 'sentinel': 0.01, 'null': 0.02},
+    'date': {'swap_day_month': 0.02, 'sentinel': 0.005, 'null': 0.02},
+}
+DEFAULT_DUPLICATE_RATE = 0.01
+STRING_SENTINELS = ['XX', 'Unknown', 'unknown', 'N/A']
+NUMERIC_SENTINELS = [0, 9999, -1]
+DATE_SENTINELS = ['1900-01-01', '2099-12-31']
+ISO_DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}"
+# ID as its own token: OrderID, CustomerId, order_id, id; not Paid or Valid
+KEY_COLUMN_PATTERN = re.compile(r"(?:^|_|[a-z0-9])(?:ID|Id)$|(?:^|_)id$")
+GROUND_TRUTH_DIR = "_ground_truth"
+DUPLICATE_COLUMN = "_duplicate"
+
+def column_kind(series):
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return 'numeric'
+    sample = series.dropna().astype(str).head(1000)
+    if len(sample) and sample.str.match(ISO_DATE_PATTERN).mean() >= 0.8:
+        return 'date'
+    return 'string'
+
+def is_key_column(name):
+    return KEY_COLUMN_PATTERN.search(str(name)) is not None
+
+def numeric_working_copy(series):
+    # Integer columns become nullable Int64 so NaN and sentinels do not
+    # turn 4 into 4.0; everything else is worked on as float
+    if pd.api.types.is_integer_dtype(series):
+        return series.astype('Int64')
+    return series.astype(float)
+
+def pick_errors(rng, size, rates):
+    # One uniform draw per cell, mapped onto consecutive rate intervals, so
+    # error kinds never overlap and each hits its exact expected fraction.
+    draws = rng.random(size)
+    picks = {}
+    low = 0.0
+    for kind, rate in rates.items():
+        if rate <= 0:
+            continue
+        high = low + rate
+        picks[kind] = (draws >= low) & (draws < high)
+        low = high
+    if low > 1.0:
+        raise ValueError(f"Error rates sum to {low:.3f}, must be <= 1: {rates}")
+    return picks
+
+def make_typos(rng, values):
+    # Drop, double or swap one character per value; only the few selected
+    # cells are touched, so a plain comprehension over them is cheap.
+    values = values.astype(str).to_numpy()
+    lengths = np.fromiter((len(v) for v in values), dtype=np.int64, count=len(values))
+    positions = (rng.random(len(values)) * np.maximum(lengths - 1, 1)).astype(np.int64)
+    ops = rng.integers(0, 3, size=len(values))
+    out = []
+    for v, pos, op in zip(values, positions, ops):
+        if len(v) < 2:
+            out.append(v + v if v else "?")
+        elif op == 0:
+            out.append(v[:pos] + v[pos + 1:])
+        elif op == 1:
+            out.append(v[:pos] + v[pos] + v[pos:])
+        else:
+            out.append(v[:pos] + v[pos + 1] + v[pos] + v[pos + 2:])
+    return out
+
+def corrupt_column(rng, series, rates):
+    series = series.copy()
+    kind = column_kind(series)
+    picks = pick_errors(rng, len(series), rates)
+    present = series.notna().to_numpy()
+    mask = np.zeros(len(series), dtype=bool)
+    counts = {}
+
+    for error, where in picks.items():
+        # Errors other than NULL only make sense on cells that hold a value
+        where = where & present if error != 'null' else where
+        if not where.any():
+            continue
+        idx = np.flatnonzero(where)
+
+        if error == 'null':
+            series = series.astype(object) if kind != 'numeric' else numeric_working_copy(series)
+            series.iloc[idx] = None if kind != 'numeric' else np.nan
+        elif error == 'spike' and kind == 'numeric':
+            series = numeric_working_copy(series)
+            spiked = series.iloc[idx].to_numpy(dtype=float) * rng.uniform(10, 100, size=len(idx))
+            series.iloc[idx] = np.round(spiked) if series.dtype == 'Int64' else spiked
+        elif error == 'negative' and kind == 'numeric':
+            series = numeric_working_copy(series)
+            series.iloc[idx] = -np.abs(series.iloc[idx].to_numpy(dtype=float)) - 1
+        elif error == 'sentinel':
+            pool = {'numeric': NUMERIC_SENTINELS, 'date': DATE_SENTINELS}.get(kind, STRING_SENTINELS)
+            series = numeric_working_copy(series) if kind == 'numeric' else series.astype(object)
+            series.iloc[idx] = pd.array(rng.choice(np.array(pool, dtype=object), size=len(idx)), dtype=series.dtype)
+        elif error == 'typo' and kind == 'string':
+            series = series.astype(object)
+            series.iloc[idx] = make_typos(rng, series.iloc[idx])
+        elif error == 'swap_day_month' and kind == 'date':
+            values = series.iloc[idx].astype(str)
+            iso = values.str.match(ISO_DATE_PATTERN).to_numpy()
+            idx = idx[iso]
+            values = values[iso]
+            series = series.astype(object)
+            series.iloc[idx] = (values.str[:5] + values.str[8:10] + "-" + values.str[5:7] + values.str[10:]).to_numpy()
+        else:
+            continue
+        mask[idx] = True
+        counts[error] = len(idx)
+
+    return series, mask, counts
+
+def inject_errors(df, rates=None, column_rates=None, duplicate_rate=DEFAULT_DUPLICATE_RATE, seed=0,
+                  include_keys=False):
+    # Return (corrupted_df, mask, counts). mask is a boolean DataFrame aligned
+    # with corrupted_df: True marks every injected cell, and the extra
+    # '_duplicate' column marks appended duplicate rows. Key columns
+    # (is_key_column) are left intact so joins still line up, unless
+    # include_keys is set or column_rates names them.
+    rates = rates or DEFAULT_ERROR_RATES
+    column_rates = column_rates or {}
+    rng = np.random.default_rng(seed)
+    corrupted = {}
+    mask = {}
+    counts = {}
+
+    for col in df.columns:
+        if col not in column_rates and not include_keys and is_key_column(col):
+            corrupted[col], mask[col] = df[col], np.zeros(len(df), dtype=bool)
+            continue
+        col_rates = column_rates.get(col, rates[column_kind(df[col])])
+        corrupted[col], mask[col], col_counts = corrupt_column(rng, df[col], col_rates)
+        if col_counts:
+            counts[col] = col_counts
+
+    corrupted = pd.DataFrame(corrupted, index=df.index)
+    mask = pd.DataFrame(mask, index=df.index)
+    mask[DUPLICATE_COLUMN] = False
+
+    n_dupes = int(round(len(df) * duplicate_rate))
+    if n_dupes:
+        source = rng.integers(0, len(df), size=n_dupes)
+        dupes = corrupted.iloc[source]
+        dupe_mask = mask.iloc[source].copy()
+        dupe_mask[DUPLICATE_COLUMN] = True
+        # Scatter the copies through the table instead of appending a block
+        order = rng.permutation(len(df) + n_dupes)
+        corrupted = pd.concat([corrupted, dupes], ignore_index=True).iloc[order].reset_index(drop=True)
+        mask = pd.concat([mask, dupe_mask], ignore_index=True).iloc[order].reset_index(drop=True)
+        counts[DUPLICATE_COLUMN] = {'duplicate': n_dupes}
+
+    return corrupted, mask, counts
+
+def corrupt_csv_folder(clean_folder, output_folder, rates=None, column_rates=None,
+                       duplicate_rate=DEFAULT_DUPLICATE_RATE, seed=0, include_keys=False):
+    # Corrupt every CSV in clean_folder into output_folder and store the
+    # ground-truth masks plus a summary under output_folder/_ground_truth.
+    # column_rates may be keyed by 'column' or 'file.csv:column'.
+    truth_folder = os.path.join(output_folder, GROUND_TRUTH_DIR)
+    os.makedirs(truth_folder, exist_ok=True)
+    column_rates = column_rates or {}
+    summary = {}
+
+    for index, filename in enumerate(sorted(os.listdir(clean_folder))):
+        if not filename.lower().endswith('.csv'):
+            continue
+        df = pd.read_csv(os.path.join(clean_folder, filename))
+        file_rates = {col.split(':', 1)[-1]: r for col, r in column_rates.items()
+                      if ':' not in col or col.split(':', 1)[0] == filename}
+        corrupted, mask, counts = inject_errors(df, rates, file_rates, duplicate_rate, seed + index,
+                                                  include_keys)
+
+        corrupted.to_csv(os.path.join(output_folder, filename), index=False)
+        mask.to_csv(os.path.join(truth_folder, filename), index=False)
+        summary[filename] = {'rows': len(corrupted), 'errors': counts}
+        injected = sum(n for c in counts.values() for n in c.values())
+        print(f"Injected {injected} errors into '{filename}' ({len(corrupted)} rows)")
+
+    with open(os.path.join(truth_folder, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def compare_with_audit(analysis, mask):
+    # Per-column comparison of one analyze_csv_file() result against the
+    # ground-truth mask: how many cells were corrupted vs. how many the audit
+    # reported as missing, outlying, suspicious or likely typos.
+    report = {}
+    for col in mask.columns:
+        if col == DUPLICATE_COLUMN:
+            continue
+        flagged = (analysis.get('missing_data', {}).get(col, 0)
+                   + len(analysis.get('outliers', {}).get(col, []))
+                   + len(analysis.get('suspicious_values', {}).get(col, []))
+                   + len(analysis.get('typos', {}).get(col, {})))
+        injected = int(mask[col].sum())
+        if injected or flagged:
+            report[col] = {'injected': injected, 'flagged': flagged,
+                           'recall_upper_bound': min(flagged / injected, 1.0) if injected else None}
+    return report
@@ -1,32 +1,172 @@
 import os
-import pandas as pd
 import re
 import ast
-from langchain_openai import ChatOpenAI
+import csv
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-
-load_dotenv()
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENROUTER_MOONSHOT_KIMI_DEV_API_KEY")
-os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+from instrumentation import span
 
 # Directory containing CSV files
 CSV_DIR = r"D:\LangChain\Internship_Pune_TCS\Industry Level Data Handling\Industry-Sub_domain Data"
 
+# Headers are read by a pool of threads; only the first SNIFF_BYTES of each
+# file are ever read
+SUMMARY_WORKERS = 16
+SNIFF_BYTES = 64 * 1024
+DIALECT_SAMPLE_BYTES = 4096
+# Ranking prompts are kept under this many tokens (estimated at
+# CHARS_PER_TOKEN characters each); larger folders are ranked in batches
+# whose shortlists go through further rounds until one prompt fits
+PROMPT_TOKEN_BUDGET = int(os.getenv("REDUCTION_TOKEN_BUDGET", "6000"))
+CHARS_PER_TOKEN = 4
+MAX_SUMMARY_CHARS = 1500
+RANKING_CONCURRENCY = 4
+RANKING_ATTEMPTS = 2
+
 def list_csv_files(directory):
     return [f for f in os.listdir(directory)
             if os.path.isfile(os.path.join(directory, f)) and f.lower().endswith('.csv')]
 
+def sniff_file(path):
+    # Header and first data row with the csv module, in whatever dialect the
+    # first block of the file looks like
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        head = f.read(SNIFF_BYTES)
+    try:
+        dialect = csv.Sniffer().sniff(head[:DIALECT_SAMPLE_BYTES], delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    # Drop a line cut off by the read limit
+    lines = head.splitlines(keepends=True)
+    if len(head) == SNIFF_BYTES and len(lines) > 2:
+        lines = lines[:-1]
+    rows = csv.reader(lines, dialect)
+    header = next(rows, [])
+    first = next(rows, None)
+    return header, first
+
+def summarize_file(file):
+    path = os.path.join(CSV_DIR, file)
+    try:
+        header, first = sniff_file(path)
+        sample = dict(zip(header, first)) if first is not None else {}
+        summary = f"File: {file}\nColumns: {', '.join(header)}\nSample:\n{sample}"
+    except Exception as e:
+        summary = f"File: {file}\nCould not read file: {e}"
+    return summary[:MAX_SUMMARY_CHARS]
+
 def get_file_summaries(files):
-    summaries = []
+    # One summary per file, in the order given
+    with ThreadPoolExecutor(max_workers=max(1, min(SUMMARY_WORKERS, len(files)))) as pool:
+        return list(pool.map(summarize_file, files))
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def ranking_prompt(summaries, n_keep):
+    summaries_text = "\n\n".join(summaries)
+    return (
+        f"You are a data analyst. Here are summaries of CSV files:\n\n"
+        f"{summaries_text}\n\n"
+        f"From the above, select the {n_keep} most important files to keep (based on file names and file data)."
+        f"!IMPORTANT: The important files are the ones that contain sales, order and customer information or details about the product or industry-sub_domain."
+        f"Make sure all the important files are kept in the directory"
+        f"Return only the file names as a Python list, with no explanation or formatting, and do not include markdown or code blocks."
+        f"For example: ['file1.csv', 'file2.csv']"
+    )
+
+def batch_files(files, summaries, n_keep, budget=PROMPT_TOKEN_BUDGET):
+    # Greedy packing of files (in order) into batches whose prompt stays
+    # within budget; every batch holds at least one file
+    room = budget - estimate_tokens(ranking_prompt([], n_keep))
+    batches, current, used = [], [], 0
     for file in files:
-        path = os.path.join(CSV_DIR, file)
-        try:
-            df = pd.read_csv(path, nrows=3)  # Read first 3 rows for a sample
-            summary = f"File: {file}\nColumns: {', '.join(df.columns)}\nSample:\n{df.head(1).to_dict(orient='records')[0]}"
-        except Exception as e:
-            summary = f"File: {file}\nCould not read file: {e}"
-        summaries.append(summary)
-    return summaries
+        cost = estimate_tokens(summaries[file]) + 1
+        if current and used + cost > room:
+            batches.append(current)
+            current, used = [], 0
+        current.append(file)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def brief_summaries(summaries):
+    # Shorter forms of the summaries for merge rounds: without the sample
+    # row, then the file name alone
+    columns_only = {f: text.split("\nSample:", 1)[0] for f, text in summaries.items()}
+    names_only = {f: f"File: {f}" for f in summaries}
+    return [summaries, columns_only, names_only]
+
+def match_picks(picked, files):
+    # Models echo names with other casing or with a folder in front, so
+    # picks are matched on the lower-cased base name
+    by_name = {f.lower(): f for f in files}
+    matched = (by_name.get(os.path.basename(p.strip()).lower()) for p in picked if isinstance(p, str))
+    return [f for f in dict.fromkeys(matched) if f is not None]
+
+async def rank_batch(llm, semaphore, files, summaries, n_keep):
+    # The model's picks from one batch (at most n_keep, restricted to files
+    # in that batch), or None when its answer cannot be used: no list, or a
+    # list naming none of the batch's files. Such an answer is asked again
+    # past the LLM cache, which would otherwise return the same answer on
+    # every attempt and every rerun.
+    prompt = ranking_prompt([summaries[f] for f in files], n_keep)
+    for attempt in range(1, RANKING_ATTEMPTS + 1):
+        async with semaphore:
+            with span('rank_batch', kind='llm_task', rows=len(files), attempt=attempt):
+                if attempt == 1:
+                    response = await llm.ainvoke(prompt)
+                else:
+                    from llm_cache import ainvoke_fresh
+                    response = await ainvoke_fresh(llm, prompt)
+        response_text = str(getattr(response, "content", response))
+        picked = extract_list_from_response(response_text)
+        if isinstance(picked, list):
+            matched = match_picks(picked, files)
+            if matched:
+                return matched[:n_keep]
+            problem = "names none of its files"
+        else:
+            problem = "could not be parsed"
+        print(f"The ranking of a batch of {len(files)} files ({files[0]} ... {files[-1]}) {problem}, "
+              f"attempt {attempt}.")
+    return None
+
+async def rank_files(llm, files, summaries, n_keep, budget=PROMPT_TOKEN_BUDGET,
+                     max_concurrency=RANKING_CONCURRENCY):
+    # Map-reduce ranking: each round ranks context-sized batches in
+    # parallel and keeps the shortlists, until every candidate fits in one
+    # final prompt. When n_keep is at least the batch size no batch drops
+    # anything, so the candidates are compared again on shorter summaries
+    # that fit more files per prompt. Returns None when any batch's answer
+    # cannot be used, so nothing is removed on a partial ranking.
+    semaphore = asyncio.Semaphore(max_concurrency)
+    levels = brief_summaries(summaries)
+    level = 0
+    candidates = list(files)
+    round_number = 1
+    while True:
+        texts = levels[level]
+        batches = batch_files(candidates, texts, n_keep, budget)
+        if len(batches) == 1:
+            return await rank_batch(llm, semaphore, batches[0], texts, n_keep)
+        print(f"Ranking round {round_number}: {len(candidates)} files in {len(batches)} batches")
+        shortlists = await asyncio.gather(*(rank_batch(llm, semaphore, batch, texts, n_keep)
+                                            for batch in batches))
+        round_number += 1
+        if any(shortlist is None for shortlist in shortlists):
+            return None
+        shortlisted = [f for shortlist in shortlists for f in shortlist]
+        if len(shortlisted) < len(candidates):
+            candidates = shortlisted
+            continue
+        if level + 1 == len(levels):
+            print(f"Cannot compare {len(candidates)} files in one prompt to keep {n_keep}; "
+                  f"raise REDUCTION_TOKEN_BUDGET or keep fewer files.")
+            return None
+        level += 1
 
 def extract_list_from_response(response):
     # Find the first [...] block in the response
@@ -38,7 +178,8 @@ def extract_list_from_response(response):
             return None
     return None
 
-def main():
+def main(n_keep=None, dry_run=False):
+    # n_keep: skip the prompt; dry_run: report what would be removed
     files = list_csv_files(CSV_DIR)
     if not files:
         print("No CSV files found.")
@@ -48,37 +189,35 @@ def main():
     for f in files:
         print(" -", f)
 
-    n_keep = int(input("How many important files do you want to keep? "))
+    if n_keep is None:
+        n_keep = int(input("How many important files do you want to keep? "))
 
-    summaries = get_file_summaries(files)
-    summaries_text = "\n\n".join(summaries)
+    with span('get_file_summaries', rows=len(files)):
+        summaries = dict(zip(files, get_file_summaries(files)))
 
-    # Construct the prompt for the LLM
-    prompt = (
-        f"You are a data analyst. Here are summaries of CSV files:\n\n"
-        f"{summaries_text}\n\n"
-        f"From the above, select the {n_keep} most important files to keep (based on file names and file data)."
-        f"!IMPORTANT: The important files are the ones that contain sales, order and customer information or details about the product or industry-sub_domain."
-        f"Make sure all the important files are kept in the directory"
-        f"Return only the file names as a Python list, with no explanation or formatting, and do not include markdown or code blocks."
-        f"For example: ['file1.csv', 'file2.csv']"
-    )
+    # LangChain is only loaded once there is something to ask
+    from langchain_openai import ChatOpenAI
+    from llm_cache import install_llm_cache
+    load_dotenv()
+    os.environ["OPENAI_API_KEY"] = os.getenv("OPENROUTER_MOONSHOT_KIMI_DEV_API_KEY")
+    os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+    install_llm_cache()
 
     # Use LangChain OpenAI agent (replace model name as needed)
     llm = ChatOpenAI(model="moonshotai/kimi-dev-72b:free", temperature=0)
-    response = llm.invoke(prompt)
-    response_text = str(response)
-    
-    print("\nLLM response:", response_text)
+    keep_files = asyncio.run(rank_files(llm, files, summaries, n_keep))
 
-    keep_files = extract_list_from_response(response_text)
+    print("\nLLM selection:", keep_files)
     if not keep_files or not isinstance(keep_files, list):
-        print("Could not parse LLM response. Please check the output.")
+        print("Could not parse LLM response. Please check the output. No files were removed.")
         return
 
     # Remove files not in the keep list
     remove_files = [f for f in files if f not in keep_files]
     for f in remove_files:
+        if dry_run:
+            print(f"Would remove: {f}")
+            continue
         os.remove(os.path.join(CSV_DIR, f))
         print(f"Removed: {f}")
 
@@ -0,0 +1,217 @@
+import re
+import pandas as pd
+
+# Edit instructions that map straight onto one pandas operation. Anything
+# these patterns do not recognise, or whose value is ambiguous, goes to the
+# LLM agent instead.
+# Column names may be quoted ('Total Amount', "Total Amount") or a bare word.
+NAME = r"""(?:'(?P<{0}_sq>[^']+)'|"(?P<{0}_dq>[^"]+)"|(?P<{0}_bare>[\w.]+))"""
+NUMBER = r"(?P<number>[-+]?\d+(?:\.\d+)?)(?P<percent>\s*%)?"
+VALUE = r"""(?:'(?P<value_sq>[^']*)'|"(?P<value_dq>[^"]*)"|(?P<value_bare>\S+))"""
+COLUMN_WORDS = r"(?:(?:all |the )?(?:values? (?:in|of) )?(?:the )?(?:column )?)"
+COMPARISONS = {
+    '=': 'eq', '==': 'eq', 'is': 'eq', 'equals': 'eq', 'is equal to': 'eq',
+    '!=': 'ne', '<>': 'ne', 'is not': 'ne', 'is not equal to': 'ne',
+    '<': 'lt', 'is less than': 'lt', 'is below': 'lt',
+    '<=': 'le', 'is at most': 'le',
+    '>': 'gt', 'is greater than': 'gt', 'is more than': 'gt', 'is above': 'gt',
+    '>=': 'ge', 'is at least': 'ge',
+}
+# Bare values that mean "no value" rather than the text itself
+NULL_WORDS = {'null', 'none', 'nan', 'na', 'n/a'}
+ORDERING = {'lt', 'le', 'gt', 'ge'}
+CAST_TYPES = {
+    'int': 'Int64', 'integer': 'Int64', 'float': 'float64', 'decimal': 'float64', 'number': 'float64',
+    'numeric': 'float64', 'string': 'string', 'text': 'string', 'str': 'string',
+    'date': 'datetime', 'datetime': 'datetime', 'bool': 'boolean', 'boolean': 'boolean',
+}
+
+def pattern(template):
+    return re.compile("^" + template.format(
+        col=NAME.format("col"), new=NAME.format("new"), num=NUMBER, value=VALUE, cw=COLUMN_WORDS,
+        cmp="(?P<cmp>" + "|".join(sorted(map(re.escape, COMPARISONS), key=len, reverse=True)) + ")",
+        type="(?P<type>" + "|".join(CAST_TYPES) + ")",
+    ) + r"\s*\.?$", re.IGNORECASE)
+
+# (op, operator, compiled pattern) in priority order
+INSTRUCTION_PATTERNS = [
+    ('rename', None, pattern(r"rename {cw}{col} (?:to|as) {new}")),
+    ('arith', '-', pattern(r"(?:reduce|decrease|lower|subtract from|deduct from) {cw}{col} by {num}")),
+    ('arith', '+', pattern(r"(?:increase|raise|increment|add to) {cw}{col} by {num}")),
+    ('arith', '+', pattern(r"add {num} to {cw}{col}")),
+    ('arith', '-', pattern(r"(?:subtract|deduct) {num} from {cw}{col}")),
+    ('arith', '*', pattern(r"(?:multiply|scale) {cw}{col} by {num}")),
+    ('arith', '/', pattern(r"divide {cw}{col} by {num}")),
+    ('fill_nulls', None, pattern(r"(?:fill|replace) (?:all )?(?:the )?(?:null|nulls|missing|empty|nan|blank)"
+                                 r"(?: values| cells| entries)? in {cw}{col} with {value}")),
+    ('fill_nulls', None, pattern(r"(?:fill|replace) (?:all )?(?:the )?(?:null|nulls|missing|empty|nan|blank)"
+                                 r"(?: values| cells| entries)? with {value}")),
+    ('drop_nulls', None, pattern(r"(?:drop|delete|remove) (?:all )?rows (?:where|with) {cw}{col} "
+                                 r"(?:is )?(?:null|missing|empty|blank)")),
+    ('drop_non_nulls', None, pattern(r"(?:drop|delete|remove) (?:all )?rows (?:where|with) {cw}{col} "
+                                     r"(?:is not|isn't|is non|not|non)[- ]?(?:null|missing|empty|blank)")),
+    ('drop_rows', None, pattern(r"(?:drop|delete|remove) (?:all )?rows (?:where|with) {cw}{col} {cmp} {value}")),
+    ('drop_column', None, pattern(r"(?:drop|delete|remove) (?:the )?column {col}")),
+    ('cast', None, pattern(r"(?:cast|convert|change (?:the )?type of) {cw}{col} (?:to|into|as) {type}")),
+]
+
+def group_value(match, name):
+    for suffix in ("sq", "dq", "bare"):
+        value = match.groupdict().get(f"{name}_{suffix}")
+        if value is not None:
+            return value
+    return None
+
+def is_null_literal(match):
+    # Unquoted NULL/None/NaN; 'NULL' in quotes is the text
+    bare = match.groupdict().get('value_bare')
+    return bare is not None and bare.lower() in NULL_WORDS
+
+def literal(match):
+    # Quoted values stay text; bare ones become numbers when they look like it
+    if match.groupdict().get('value_sq') is not None or match.groupdict().get('value_dq') is not None:
+        return group_value(match, 'value')
+    text = group_value(match, 'value')
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+def compile_instruction(text):
+    # Returns an op dict for a recognised instruction, or None
+    text = text.strip()
+    for op, operator, regex in INSTRUCTION_PATTERNS:
+        match = regex.match(text)
+        if not match:
+            continue
+        compiled = {'op': op}
+        column = group_value(match, 'col')
+        if column is not None:
+            compiled['column'] = column
+        if op == 'rename':
+            compiled['new'] = group_value(match, 'new')
+        elif op == 'arith':
+            number = float(match.group('number'))
+            if match.group('percent'):
+                # "increase X by 10%" scales instead of adding
+                compiled['operator'] = '*'
+                compiled['value'] = 1 + number / 100 if operator == '+' else 1 - number / 100
+            else:
+                compiled['operator'] = operator
+                compiled['value'] = number
+        elif op == 'fill_nulls':
+            if is_null_literal(match):
+                return None
+            compiled['value'] = literal(match)
+        elif op == 'drop_rows':
+            comparison = COMPARISONS[match.group('cmp').lower()]
+            if is_null_literal(match):
+                # "= NULL" / "!= NULL" mean missing / present, never the text
+                if comparison not in ('eq', 'ne'):
+                    return None
+                compiled['op'] = 'drop_nulls' if comparison == 'eq' else 'drop_non_nulls'
+                return compiled
+            value = literal(match)
+            if comparison in ORDERING and not isinstance(value, (int, float)):
+                # Ordering text (dates, codes) is left to the agent rather
+                # than guessed at as a string comparison
+                return None
+            compiled['value'] = value
+            compiled['comparison'] = comparison
+        elif op == 'cast':
+            compiled['dtype'] = CAST_TYPES[match.group('type').lower()]
+        return compiled
+    return None
+
+def compile_instruction_lines(lines, files):
+    # Returns (plan, problems). plan maps each file, in order of first
+    # mention, to its [(line_number, instruction, op_or_None)]; op None
+    # marks a line for the LLM agent. problems lists skipped lines as
+    # (line_number, line, reason).
+    plan = {}
+    problems = []
+    for idx, line in enumerate(lines, 1):
+        if ':' not in line:
+            problems.append((idx, line, "missing colon"))
+            continue
+        filename, instruction = line.split(':', 1)
+        filename = filename.strip()
+        instruction = instruction.strip()
+        if filename not in files:
+            problems.append((idx, line, f"CSV file '{filename}' not found"))
+            continue
+        plan.setdefault(filename, []).append((idx, instruction, compile_instruction(instruction)))
+    return plan, problems
+
+def require_column(df, column):
+    if column not in df.columns:
+        # Be lenient about case, as people type column names from memory
+        matches = [c for c in df.columns if c.lower() == column.lower()]
+        if len(matches) != 1:
+            raise ValueError(f"column '{column}' not found (columns: {', '.join(map(str, df.columns))})")
+        return matches[0]
+    return column
+
+def numeric_column(series):
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    converted = pd.to_numeric(series, errors='coerce')
+    if (converted.isna() & series.notna()).any():
+        raise ValueError(f"column '{series.name}' is not numeric")
+    return converted
+
+def apply_op(df, op):
+    # Apply one compiled op as a single vectorized pandas operation and
+    # return (df, message)
+    kind = op['op']
+    if kind == 'fill_nulls' and 'column' not in op:
+        filled = int(df.isna().sum().sum())
+        return df.fillna(op['value']), f"filled {filled} empty cells with {op['value']!r}"
+
+    column = require_column(df, op['column'])
+    if kind == 'rename':
+        return df.rename(columns={column: op['new']}), f"renamed '{column}' to '{op['new']}'"
+    if kind == 'arith':
+        values = numeric_column(df[column])
+        value = op['value']
+        if pd.api.types.is_integer_dtype(values) and float(value).is_integer() and op['operator'] != '/':
+            # Whole-number edits keep integer columns integer
+            value = int(value)
+        df[column] = {'+': values + value, '-': values - value,
+                      '*': values * value, '/': values / value}[op['operator']]
+        return df, f"applied {op['operator']} {value:g} to {df[column].notna().sum()} values in '{column}'"
+    if kind == 'fill_nulls':
+        filled = int(df[column].isna().sum())
+        df[column] = df[column].fillna(op['value'])
+        return df, f"filled {filled} empty cells in '{column}' with {op['value']!r}"
+    if kind == 'drop_nulls':
+        keep = df[column].notna()
+        return df[keep], f"dropped {int((~keep).sum())} rows with empty '{column}'"
+    if kind == 'drop_non_nulls':
+        keep = df[column].isna()
+        return df[keep], f"dropped {int((~keep).sum())} rows with a value in '{column}'"
+    if kind == 'drop_rows':
+        series = df[column]
+        value = op['value']
+        if isinstance(value, (int, float)) and not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, errors='coerce')
+        elif isinstance(value, str) and pd.api.types.is_numeric_dtype(series):
+            series = series.astype(str)
+        # Comparisons only ever match cells that hold a value; empty cells
+        # are dropped through drop_nulls/drop_non_nulls alone
+        drop = getattr(series, op['comparison'])(value).fillna(False).astype(bool) & df[column].notna()
+        return df[~drop], f"dropped {int(drop.sum())} rows"
+    if kind == 'drop_column':
+        return df.drop(columns=[column]), f"dropped column '{column}'"
+    if kind == 'cast':
+        if op['dtype'] == 'datetime':
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+        elif op['dtype'] in ('Int64', 'float64'):
+            df[column] = numeric_column(df[column]).astype(op['dtype'])
+        else:
+            df[column] = df[column].astype(op['dtype'])
+        return df, f"cast '{column}' to {op['dtype']}"
+    raise ValueError(f"unknown op '{kind}'")
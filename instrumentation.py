@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+import contextvars
+from contextlib import contextmanager, nullcontext
+
+# Tracing is off unless AGENT_TRACE is set: "1" writes agent_trace.jsonl in
+# the working directory, any other value is used as the trace file path.
+# When off, span() hands back a shared no-op context and nothing is timed.
+DEFAULT_TRACE_FILE = "agent_trace.jsonl"
+
+_state = {'enabled': False, 'file': None, 'summary': {}, 'lock': threading.Lock()}
+_current_span = contextvars.ContextVar("current_span", default=None)
+_llm_handler = contextvars.ContextVar("trace_llm_handler", default=None)
+
+def max_rss_mb():
+    # Peak resident memory of this process so far, None where unavailable
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+    except ImportError:
+        try:
+            import psutil
+            info = psutil.Process().memory_info()
+            return round(getattr(info, "peak_wset", info.rss) / 2 ** 20, 1)
+        except ImportError:
+            return None
+
+def enable_tracing(path=None):
+    if _state['enabled']:
+        return
+    path = path or DEFAULT_TRACE_FILE
+    _state['file'] = open(path, "a", encoding="utf-8")
+    _state['enabled'] = True
+    # Every LangChain model call in this context reports through the handler.
+    # LangChain is only imported here, so untraced runs never pay for it.
+    from langchain_core.tracers.context import register_configure_hook
+    register_configure_hook(_llm_handler, inheritable=True)
+    _llm_handler.set(trace_callback_handler())
+    atexit.register(print_trace_summary)
+    print(f"Tracing to '{path}'")
+
+def tracing_enabled():
+    return _state['enabled']
+
+def record(entry):
+    line = json.dumps(entry, default=str)
+    with _state['lock']:
+        _state['file'].write(line + "\n")
+        _state['file'].flush()
+        key = (entry['kind'], entry['name'])
+        totals = _state['summary'].setdefault(key, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                                                    'errors': 0, 'rows': 0, 'bytes': 0,
+                                                    'prompt_tokens': 0, 'completion_tokens': 0})
+        totals['count'] += 1
+        totals['seconds'] += entry['seconds']
+        totals['max_seconds'] = max(totals['max_seconds'], entry['seconds'])
+        totals['errors'] += entry['status'] == 'error'
+        for field in ('rows', 'bytes', 'prompt_tokens', 'completion_tokens'):
+            if isinstance(entry.get(field), (int, float)):
+                totals[field] += entry[field]
+
+@contextmanager
+def _traced_span(name, kind, attrs):
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    start = time.perf_counter()
+    status, error = 'ok', None
+    try:
+        yield attrs
+    except BaseException as e:
+        status, error = 'error', repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        entry = {'name': name, 'kind': kind, 'parent': parent, 'pid': os.getpid(),
+                 'start': round(time.time(), 3), 'seconds': round(time.perf_counter() - start, 6),
+                 'status': status, 'max_rss_mb': max_rss_mb()}
+        if error:
+            entry['error'] = error
+        entry.update(attrs)
+        record(entry)
+
+def span(name, kind='stage', **attrs):
+    # with span('analyze_csv_file', file=path) as s: ...; s['rows'] = n
+    # Attributes set on s end up in the trace line (rows, bytes, tokens...).
+    if not _state['enabled']:
+        return nullcontext({})
+    return _traced_span(name, kind, attrs)
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+def trace_callback_handler():
+    # Built on first use so that importing this module does not load LangChain
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TraceCallbackHandler(BaseCallbackHandler):
+        # Latency and token usage of every LLM call; cached answers show up as
+        # calls with no token usage
+        def __init__(self):
+            self.starts = {}
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self.starts[run_id] = (time.perf_counter(), _current_span.get(), sum(len(p) for p in prompts))
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            chars = sum(len(str(m.content)) for batch in messages for m in batch)
+            self.starts[run_id] = (time.perf_counter(), _current_span.get(), chars)
+
+        def _finish(self, run_id, status, usage=None, error=None):
+            start, parent, chars = self.starts.pop(run_id, (time.perf_counter(), None, None))
+            entry = {'name': 'llm_call', 'kind': 'llm', 'parent': parent, 'pid': os.getpid(),
+                     'start': round(time.time(), 3), 'seconds': round(time.perf_counter() - start, 6),
+                     'status': status, 'prompt_chars': chars, 'max_rss_mb': max_rss_mb()}
+            entry.update(usage or {})
+            if error:
+                entry['error'] = error
+            record(entry)
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            usage = (response.llm_output or {}).get('token_usage') or {}
+            if not usage:
+                # Chat models also attach usage to each message
+                for generations in response.generations:
+                    for generation in generations:
+                        meta = getattr(getattr(generation, 'message', None), 'usage_metadata', None) or {}
+                        usage = {'prompt_tokens': meta.get('input_tokens'),
+                                 'completion_tokens': meta.get('output_tokens')} if meta else usage
+            self._finish(run_id, 'ok', {'prompt_tokens': usage.get('prompt_tokens'),
+                                        'completion_tokens': usage.get('completion_tokens')})
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._finish(run_id, 'error', error=repr(error))
+
+    return TraceCallbackHandler()
+
+def print_trace_summary():
+    summary = _state['summary']
+    if not summary:
+        return
+    print("\nTrace summary:")
+    print(f"  {'kind':<7} {'name':<34} {'calls':>6} {'total s':>9} {'max s':>8} {'rows':>10} "
+          f"{'MB':>8} {'tokens in/out':>15} {'errors':>6}")
+    for (kind, name), t in sorted(summary.items(), key=lambda item: -item[1]['seconds']):
+        tokens = f"{t['prompt_tokens']}/{t['completion_tokens']}" if kind == 'llm' else ""
+        print(f"  {kind:<7} {name[:34]:<34} {t['count']:>6} {t['seconds']:>9.3f} {t['max_seconds']:>8.3f} "
+              f"{t['rows']:>10} {t['bytes'] / 2 ** 20:>8.1f} {tokens:>15} {t['errors']:>6}")
+    peak = max_rss_mb()
+    if peak is not None:
+        print(f"  Peak memory: {peak} MB")
+
+if os.getenv("AGENT_TRACE"):
+    enable_tracing(None if os.getenv("AGENT_TRACE") == "1" else os.getenv("AGENT_TRACE"))
@@ -0,0 +1,142 @@
+import os
+import pandas as pd
+from sql_insert_parser import iter_create_tables, read_sql_chunks
+from compact_loader import read_csv_compact
+from join_graph import build_join_graph, table_stem, KEY_SUFFIX
+
+SQL_FILE_NAME = "create_insert_statements.sql"
+MAX_EXAMPLES = 5
+
+def load_ddl(csv_folder):
+    # {table stem: CREATE TABLE definition} from the generator's SQL file
+    sql_path = os.path.join(csv_folder, SQL_FILE_NAME)
+    if not os.path.exists(sql_path):
+        return {}
+    return {table_stem(t['name']): t for t in iter_create_tables(read_sql_chunks(sql_path))}
+
+def match_column(header, name):
+    # DDL and CSV can differ in case; None if the CSV no longer has the column
+    for col in header:
+        if col.lower() == name.lower():
+            return col
+    return None
+
+def load_key_columns(csv_folder, file_names, ddl):
+    # Only key-like columns (…ID plus anything the DDL names as a key) are
+    # read, so the check stays cheap on wide files.
+    frames = {}
+    for fname in file_names:
+        path = os.path.join(csv_folder, fname)
+        header = pd.read_csv(path, nrows=0).columns.tolist()
+        table = ddl.get(table_stem(fname), {})
+        wanted = {c for c in header if c.lower().endswith(KEY_SUFFIX)}
+        wanted.update(match_column(header, c) for c in table.get('primary_key', []))
+        wanted.update(match_column(header, fk[0]) for fk in table.get('foreign_keys', []))
+        wanted.discard(None)
+        if wanted:
+            frames[fname] = read_csv_compact(path, usecols=[c for c in header if c in wanted])
+    return frames
+
+def discover_keys(frames, ddl):
+    # Returns (primary_keys, foreign_keys):
+    # primary_keys: {file: [columns]}
+    # foreign_keys: [(child_file, child_column, parent_file, parent_column)]
+    # DDL declarations come first; column-name inference (join_graph) fills
+    # in tables the DDL does not cover or whose CSV was edited since.
+    by_stem = {table_stem(f): f for f in frames}
+    primary_keys = {}
+    foreign_keys = []
+    for fname, df in frames.items():
+        table = ddl.get(table_stem(fname))
+        if not table:
+            continue
+        pk = [match_column(df.columns, c) for c in table['primary_key']]
+        if pk and None not in pk:
+            primary_keys[fname] = pk
+        for col, ref_table, ref_col in table['foreign_keys']:
+            parent = by_stem.get(table_stem(ref_table))
+            child_col = match_column(df.columns, col)
+            parent_col = match_column(frames[parent].columns, ref_col) if parent else None
+            if child_col and parent_col:
+                foreign_keys.append((fname, child_col, parent, parent_col))
+
+    for edge in build_join_graph(frames)['edges']:
+        pair = (edge['child'], edge['child_column'], edge['parent'], edge['parent_column'])
+        if pair not in foreign_keys:
+            foreign_keys.append(pair)
+        primary_keys.setdefault(edge['parent'], [edge['parent_column']])
+    for fname, df in frames.items():
+        # A leading <table>ID column is that table's key even if nothing references it
+        first = df.columns[0]
+        stem = table_stem(fname)
+        if fname not in primary_keys and first.lower() in (stem + KEY_SUFFIX, stem.rstrip('s') + KEY_SUFFIX):
+            primary_keys[fname] = [first]
+    return primary_keys, foreign_keys
+
+def key_values(series):
+    # Compare keys as numbers where possible so 3 and 3.0 match
+    numeric = pd.to_numeric(series, errors='coerce')
+    if numeric.notna().sum() == series.notna().sum():
+        return numeric
+    return series.astype(str).where(series.notna())
+
+def key_text(series):
+    # Whole numbers are written without a trailing .0 so 3.0 matches '3'
+    if pd.api.types.is_numeric_dtype(series) and (series % 1 == 0).all():
+        series = series.astype('Int64')
+    return series.astype(str)
+
+def find_duplicate_keys(df, columns):
+    keys = df[columns].dropna()
+    dupes = keys[keys.duplicated(keep=False)]
+    examples = dupes.drop_duplicates().head(MAX_EXAMPLES)
+    return len(dupes), [tuple(r) if len(columns) > 1 else r[0] for r in examples.itertuples(index=False)]
+
+def find_orphans(child, parent):
+    # One hash-table membership pass (Series.isin) over the whole column
+    child = key_values(child).dropna()
+    parent = key_values(parent).dropna()
+    numeric = pd.api.types.is_numeric_dtype
+    if child.dtype != parent.dtype and not (numeric(child) and numeric(parent)):
+        # Numbers on one side, text (str, object or category) on the other:
+        # compare as text, or 3 would never match '3'
+        child, parent = key_text(child), key_text(parent)
+    orphans = child[~child.isin(parent.unique())]
+    return len(orphans), orphans.drop_duplicates().head(MAX_EXAMPLES).tolist()
+
+def check_integrity(csv_folder, file_names=None):
+    # Cross-file audit stage: duplicate primary keys and foreign-key values
+    # with no matching parent row.
+    if file_names is None:
+        file_names = sorted(f for f in os.listdir(csv_folder) if f.lower().endswith('.csv'))
+    ddl = load_ddl(csv_folder)
+    frames = load_key_columns(csv_folder, file_names, ddl)
+    primary_keys, foreign_keys = discover_keys(frames, ddl)
+
+    report = {'primary_keys': primary_keys, 'foreign_keys': foreign_keys,
+              'duplicate_keys': [], 'orphans': []}
+    for fname, columns in primary_keys.items():
+        count, examples = find_duplicate_keys(frames[fname], columns)
+        if count:
+            report['duplicate_keys'].append({'file': fname, 'columns': columns,
+                                             'rows': count, 'examples': examples})
+    for child, child_col, parent, parent_col in foreign_keys:
+        count, examples = find_orphans(frames[child][child_col], frames[parent][parent_col])
+        if count:
+            report['orphans'].append({'file': child, 'column': child_col, 'parent': parent,
+                                      'parent_column': parent_col, 'rows': count, 'examples': examples})
+    return report
+
+def print_integrity_report(report, out=None):
+    print("\nCross-file key checks:", file=out)
+    for child, child_col, parent, parent_col in report['foreign_keys']:
+        print(f"  {child}.{child_col} -> {parent}.{parent_col}", file=out)
+    if not report['duplicate_keys'] and not report['orphans']:
+        print("  No duplicate keys or orphan references found.", file=out)
+    for dup in report['duplicate_keys']:
+        print(f"  Duplicate key in {dup['file']} ({', '.join(dup['columns'])}): "
+              f"{dup['rows']} rows, e.g. {dup['examples']}", file=out)
+    for orphan in report['orphans']:
+        print(f"  Orphan {orphan['file']}.{orphan['column']}: {orphan['rows']} rows with no match in "
+              f"{orphan['parent']}.{orphan['parent_column']}, e.g. {orphan['examples']}", file=out)
+    print("-" * 60, file=out)
@@ -0,0 +1,105 @@
+import os
+
+# Columns are prefixed with their file stem, e.g. 'orders_data__CustomerID'
+PREFIX_SEPARATOR = "__"
+KEY_SUFFIX = "id"
+
+def table_stem(table_name):
+    # 'customers_data.csv' -> 'customers'
+    stem = os.path.splitext(table_name)[0].lower()
+    return stem[:-len("_data")] if stem.endswith("_data") else stem
+
+def base_column(table_name, column):
+    prefix = os.path.splitext(table_name)[0] + PREFIX_SEPARATOR
+    return column[len(prefix):] if column.startswith(prefix) else column
+
+def key_owner(candidates, key):
+    # The table a key "belongs to": customers owns CustomerID (even with
+    # duplicate IDs, which views de-duplicate), otherwise the table where the
+    # key is the leading, unique column.
+    key = key.lower()
+    for table, column, df in candidates:
+        stem = table_stem(table)
+        if key in (stem + KEY_SUFFIX, stem.rstrip("s") + KEY_SUFFIX):
+            return table, column
+    for table, column, df in candidates:
+        if df.columns[0] == column and df[column].is_unique:
+            return table, column
+    return None
+
+def build_join_graph(dataframes):
+    # dataframes: {file_name: prefixed DataFrame} as from load_and_prepare_csvs.
+    # Returns {'tables': dataframes, 'edges': [...]} where every edge is a
+    # many-to-one link from a child key column to the owning table's key.
+    by_key = {}
+    for table, df in dataframes.items():
+        for column in df.columns:
+            key = base_column(table, column)
+            if key.lower().endswith(KEY_SUFFIX) and df[column].notna().any():
+                by_key.setdefault(key.lower(), []).append((table, column, df))
+
+    edges = []
+    for key, candidates in by_key.items():
+        if len(candidates) < 2:
+            continue
+        owner = key_owner(candidates, key)
+        if owner is None:
+            continue
+        for table, column, _ in candidates:
+            if table != owner[0]:
+                edges.append({'child': table, 'child_column': column,
+                              'parent': owner[0], 'parent_column': owner[1]})
+    return {'tables': dataframes, 'edges': edges}
+
+def parents_of(graph, table):
+    return [e for e in graph['edges'] if e['child'] == table]
+
+def join_parent(left, parent, edge):
+    # Left join on a de-duplicated parent key keeps exactly one output row
+    # per child row, so a view never grows beyond its root table.
+    parent = parent.drop_duplicates(subset=[edge['parent_column']])
+    try:
+        return left.merge(parent, how='left', left_on=edge['child_column'],
+                          right_on=edge['parent_column'], validate='m:1')
+    except ValueError:
+        # Key stored as text on one side and as numbers on the other
+        left = left.assign(_key=left[edge['child_column']].astype(str))
+        parent = parent.assign(_key=parent[edge['parent_column']].astype(str))
+        return left.merge(parent, how='left', on='_key', validate='m:1').drop(columns='_key')
+
+def make_view_loader(graph, max_depth=3):
+    # Returns view(table_name): the table joined with everything it references
+    # (up to max_depth hops). Views are built on first use and kept, so the
+    # agent only ever pays for the joins it actually asks about.
+    built = {}
+
+    def build(table, depth, visiting):
+        result = graph['tables'][table]
+        if depth >= max_depth:
+            return result
+        for edge in parents_of(graph, table):
+            if edge['parent'] in visiting:
+                continue
+            parent = build(edge['parent'], depth + 1, visiting | {edge['parent']})
+            result = join_parent(result, parent, edge)
+        return result
+
+    def view(table_name):
+        table = resolve_table(graph, table_name)
+        if table not in built:
+            built[table] = build(table, 0, {table})
+        return built[table]
+
+    return view
+
+def resolve_table(graph, table_name):
+    # Accept 'orders_data.csv', 'orders_data' or 'orders'
+    wanted = table_stem(table_name)
+    for table in graph['tables']:
+        if table_stem(table) == wanted:
+            return table
+    raise KeyError(f"Unknown table '{table_name}'. Known tables: {', '.join(graph['tables'])}")
+
+def describe_join_graph(graph):
+    lines = [f"- {e['child_column']} -> {e['parent_column']}" for e in graph['edges']]
+    return "\n".join(lines) if lines else "- (no key relationships found)"
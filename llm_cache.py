@@ -0,0 +1,158 @@
+import os
+import time
+import atexit
+import sqlite3
+import hashlib
+import warnings
+import threading
+import contextlib
+import contextvars
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache.sqlite")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Set inside fresh_responses(); per asyncio task / thread, so one retry does
+# not turn off the cache for calls running next to it
+_skip_lookup = contextvars.ContextVar("llm_cache_skip_lookup", default=False)
+
+class DiskLLMCache(BaseCache):
+    # Persistent LLM response cache shared by every ChatOpenAI instance once
+    # installed with install_llm_cache(). Entries are content-addressed by a
+    # SHA-256 of the LLM config string (model, temperature, ...) and the fully
+    # rendered prompt, and evicted least-recently-used past max_bytes.
+    # With bypass=True lookups always miss but fresh answers are still stored;
+    # fresh_responses() does the same for the calls made inside it.
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, bypass=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt, llm_string):
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        if self.bypass or _skip_lookup.get():
+            self.misses += 1
+            return None
+        key = self.make_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        self.hits += 1
+        with warnings.catch_warnings():
+            # loads() is marked beta upstream; the payload is our own dumps()
+            warnings.simplefilter("ignore")
+            return loads(row[0])
+
+    def update(self, prompt, llm_string, return_val):
+        key = self.make_key(prompt, llm_string)
+        value = dumps(return_val)
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self.evictions += len(stale)
+
+    async def alookup(self, prompt, llm_string):
+        # Local SQLite is fast enough that a thread hop would cost more
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(self, prompt, llm_string, return_val):
+        self.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': entries, 'bytes': size, 'bypass': self.bypass}
+
+_installed_cache = None
+
+@contextlib.contextmanager
+def fresh_responses():
+    # For retrying an answer the caller rejected: at temperature 0 the same
+    # prompt would otherwise get the same cached answer on every attempt and
+    # every rerun. The new answer replaces the cached one.
+    token = _skip_lookup.set(True)
+    try:
+        yield
+    finally:
+        _skip_lookup.reset(token)
+
+async def ainvoke_fresh(llm, prompt):
+    with fresh_responses():
+        return await llm.ainvoke(prompt)
+
+def install_llm_cache(path=None, max_bytes=None, bypass=None):
+    # Install the shared cache underneath every LangChain model in this
+    # process. Configurable via LLM_CACHE_PATH, LLM_CACHE_MAX_MB and
+    # LLM_CACHE_BYPASS=1; LLM_CACHE_DISABLE=1 turns caching off entirely.
+    global _installed_cache
+    if os.getenv("LLM_CACHE_DISABLE") == "1":
+        return None
+    if _installed_cache is not None:
+        return _installed_cache
+
+    path = path or os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+    if max_bytes is None:
+        max_mb = os.getenv("LLM_CACHE_MAX_MB")
+        max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+    if bypass is None:
+        bypass = os.getenv("LLM_CACHE_BYPASS") == "1"
+
+    _installed_cache = DiskLLMCache(path, max_bytes=max_bytes, bypass=bypass)
+    set_llm_cache(_installed_cache)
+    atexit.register(print_cache_stats)
+    return _installed_cache
+
+def print_cache_stats():
+    if _installed_cache is None:
+        return
+    s = _installed_cache.stats()
+    if s['hits'] or s['misses']:
+        print(f"LLM cache: {s['hits']} hits, {s['misses']} misses, {s['evictions']} evictions, "
+              f"{s['entries']} entries ({s['bytes'] / 1024:.1f} KiB){' [bypass]' if s['bypass'] else ''}")
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+# Default threshold per method:
+#   iqr        - multiplier k in [Q1 - k*IQR, Q3 + k*IQR]
+#   mad        - cut-off for the robust z-score 0.6745 * (x - median) / MAD
+#   percentile - tail share capped on each side (0.01 = outside P1..P99)
+OUTLIER_METHODS = {'iqr': 1.5, 'mad': 3.5, 'percentile': 0.01}
+DEFAULT_METHOD = 'iqr'
+MAD_SCALE = 0.6745
+
+def numeric_matrix(df):
+    # All numeric (non-bool) columns as one float64 2D array with one row per
+    # column, so every per-column reduction runs over contiguous memory.
+    # Missing values are NaN.
+    columns = [c for c in df.select_dtypes(include=[np.number]).columns
+               if not pd.api.types.is_bool_dtype(df[c])]
+    matrix = np.empty((len(columns), len(df)))
+    for i, col in enumerate(columns):
+        matrix[i] = df[col].to_numpy(dtype=float, na_value=np.nan)
+    return columns, matrix
+
+def sorted_quantiles(ordered, counts, qs):
+    # Linear-interpolated quantiles (as pandas/numpy compute them) from rows
+    # that were sorted once with NaNs pushed to the end
+    rows = np.arange(len(ordered))
+    last = np.maximum(counts - 1, 0)
+    result = []
+    for q in qs:
+        pos = q * last
+        low = np.floor(pos).astype(np.int64)
+        high = np.minimum(low + 1, last)
+        value = ordered[rows, low] + (pos - low) * (ordered[rows, high] - ordered[rows, low])
+        result.append(np.where(counts > 0, value, np.nan))
+    return result
+
+def batch_bounds(block, method, threshold):
+    # (lower, upper, spread) arrays for every column (row) of block, from a
+    # single sort of the whole block
+    counts = np.count_nonzero(~np.isnan(block), axis=1)
+    ordered = np.sort(block, axis=1)
+    if method == 'iqr':
+        q1, q3 = sorted_quantiles(ordered, counts, [0.25, 0.75])
+        spread = q3 - q1
+        return q1 - threshold * spread, q3 + threshold * spread, spread
+    if method == 'mad':
+        median, = sorted_quantiles(ordered, counts, [0.5])
+        deviation = np.sort(np.abs(block - median[:, None]), axis=1)
+        mad, = sorted_quantiles(deviation, counts, [0.5])
+        half_width = threshold * mad / MAD_SCALE
+        return median - half_width, median + half_width, mad / MAD_SCALE
+    if method == 'percentile':
+        low, high = sorted_quantiles(ordered, counts, [threshold, 1 - threshold])
+        return low, high, (high - low) / 2
+    raise ValueError(f"Unknown outlier method '{method}'. Choose from {', '.join(OUTLIER_METHODS)}")
+
+def column_settings(columns, method=DEFAULT_METHOD, threshold=None, overrides=None):
+    # overrides: {column: 'mad'} or {column: {'method': 'mad', 'threshold': 3}}
+    overrides = overrides or {}
+    settings = []
+    for col in columns:
+        override = overrides.get(col, {})
+        if isinstance(override, str):
+            override = {'method': override}
+        col_method = override.get('method', method)
+        col_threshold = override.get('threshold',
+                                     threshold if col_method == method and threshold is not None
+                                     else OUTLIER_METHODS[col_method])
+        settings.append((col_method, col_threshold))
+    return settings
+
+def detect_outliers(df, method=DEFAULT_METHOD, threshold=None, overrides=None):
+    # Returns {column: {'method', 'threshold', 'lower', 'upper', 'rows', 'scores'}}
+    # for columns with at least one outlier. rows are positional row numbers;
+    # scores say how far outside the bounds each value lies, in units of the
+    # method's spread (IQR, scaled MAD or half the percentile range).
+    columns, matrix = numeric_matrix(df)
+    if not columns or not len(df):
+        return {}
+    settings = column_settings(columns, method, threshold, overrides)
+
+    n = len(columns)
+    lower, upper, spread = np.empty(n), np.empty(n), np.empty(n)
+    # Columns sharing a method and threshold are reduced together, so the
+    # usual single-method audit is one pass over the whole matrix
+    for setting in set(settings):
+        idx = [i for i, s in enumerate(settings) if s == setting]
+        lower[idx], upper[idx], spread[idx] = batch_bounds(matrix[idx], *setting)
+
+    with np.errstate(invalid='ignore'):
+        below = matrix < lower[:, None]
+        above = matrix > upper[:, None]
+    # nonzero walks the matrix row by row: grouped by column, in row order
+    cols, rows = np.nonzero(below | above)
+    values = matrix[cols, rows]
+    distance = np.where(below[cols, rows], lower[cols] - values, values - upper[cols])
+    scores = distance / np.where(spread[cols] > 0, spread[cols], 1.0)
+
+    result = {}
+    starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]]) if len(cols) else []
+    for start, end in zip(starts, list(starts[1:]) + [len(cols)]):
+        i = cols[start]
+        col_method, col_threshold = settings[i]
+        result[columns[i]] = {
+            'method': col_method, 'threshold': col_threshold,
+            'lower': float(lower[i]), 'upper': float(upper[i]),
+            'rows': rows[start:end].tolist(), 'scores': np.round(scores[start:end], 4).tolist(),
+        }
+    return result
+
+def outlier_values(df, detected):
+    # Back to the audit's {column: [values]} shape, with the original dtypes
+    return {col: df[col].iloc[info['rows']].tolist() for col, info in detected.items()}
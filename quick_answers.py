@@ -0,0 +1,149 @@
+import os
+import re
+import json
+import hashlib
+from join_graph import table_stem
+
+ANSWER_CACHE_FILE_NAME = ".answer_cache.json"
+MAX_CACHED_ANSWERS = 500
+MAX_VALUES_SHOWN = 10
+
+# Question phrases the audit results can answer on their own. The first
+# match wins, so the generic row-count phrase comes last.
+PROFILE_PATTERNS = [
+    ('num_columns', re.compile(r"\b(?:how many|number of|count of)\s+columns\b")),
+    ('columns', re.compile(r"\b(?:what|which|list|show)(?:\s+(?:are|me|all))*(?:\s+the)?\s+columns\b")),
+    ('missing_data', re.compile(r"\b(?:missing|null|nulls|empty|nan|blank)(?:\s+(?:values|data|counts?|cells|entries))?\b")),
+    ('outliers', re.compile(r"\boutliers?\b")),
+    ('suspicious_values', re.compile(r"\b(?:suspicious|placeholder)(?:\s+(?:values|data|entries))?\b")),
+    ('date_formats', re.compile(r"\bdate\s+formats?\b")),
+    ('num_rows', re.compile(r"\b(?:total\s+(?:number\s+of\s+)?(?:rows|records|entries)"
+                            r"|(?:how many|number of|count of|row count)\s*(?:rows|records|entries)?)\b")),
+]
+# "which customers have...", "how many rows have...": the question is about
+# rows of a table that match a condition, which the per-column audit
+# results cannot answer
+SUBJECT_PATTERN = re.compile(r"\b(?:which|how many|what)\s+([\w.]+)\s+"
+                             r"(?:have|has|had|with|contain|contains|containing|where|that|whose)\b")
+ROW_NOUNS = {'row', 'rows', 'record', 'records', 'entry', 'entries'}
+# Words that carry no meaning once the profile phrase is recognised. Any
+# other word left over (a filter, a value, a calculation) sends the question
+# to the LLM agent instead.
+FILLER_WORDS = {
+    'a', 'all', 'any', 'are', 'there', 'is', 'in', 'of', 'the', 'for', 'each', 'every', 'per',
+    'table', 'tables', 'file', 'files', 'data', 'csv', 'dataset', 'column', 'columns', 'do',
+    'does', 'have', 'has', 'contain', 'contains', 'what', 'which', 'show', 'me', 'list', 'give',
+    'tell', 'how', 'many', 'much', 'found', 'detected', 'values', 'value', 'and', 'by', 'with',
+    'rows', 'records', 'count', 'counts', 'number', 'please', 'were', 'was', 'i', 'can', 'you', 'see',
+}
+
+def normalize_question(question):
+    return re.sub(r"\s+", " ", question.strip().lower()).rstrip(" ?.!")
+
+def question_targets(words, analysis_results):
+    # Split the leftover words into mentioned tables, mentioned columns and
+    # anything unrecognised
+    tables, columns, unknown = set(), set(), []
+    for word in words:
+        matched = False
+        for result in analysis_results:
+            name = result['file_name']
+            stem = table_stem(name)
+            if word in (name.lower(), os.path.splitext(name)[0].lower(), stem, stem.rstrip('s')):
+                tables.add(name)
+                matched = True
+            for col in result.get('columns', []):
+                prefixed = f"{os.path.splitext(name)[0]}__{col}".lower()
+                if word in (col.lower(), prefixed):
+                    columns.add(col)
+                    matched = True
+        if not matched and word not in FILLER_WORDS:
+            unknown.append(word)
+    return tables, columns, unknown
+
+def format_column_values(values, columns):
+    lines = []
+    for col, found in values.items():
+        if columns and col not in columns:
+            continue
+        if isinstance(found, list):
+            shown = ", ".join(str(v) for v in found[:MAX_VALUES_SHOWN])
+            more = f" (+{len(found) - MAX_VALUES_SHOWN} more)" if len(found) > MAX_VALUES_SHOWN else ""
+            lines.append(f"{col}: {shown}{more}")
+        else:
+            lines.append(f"{col}: {found}")
+    return "; ".join(lines) if lines else "none"
+
+def answer_from_analysis(question, analysis_results):
+    # Returns an answer string for profile questions (row/column counts,
+    # missing values, outliers, suspicious values, date formats) or None when
+    # the question needs the agent.
+    text = normalize_question(question)
+    results = [r for r in analysis_results if 'error' not in r]
+    for subject in SUBJECT_PATTERN.findall(text):
+        if subject in ROW_NOUNS or question_targets([subject], results)[0]:
+            return None
+
+    kind = None
+    for name, pattern in PROFILE_PATTERNS:
+        if pattern.search(text):
+            kind = name
+            text = pattern.sub(" ", text)
+            break
+    if kind is None:
+        return None
+
+    tables, columns, unknown = question_targets(re.findall(r"[\w.]+", text), results)
+    if unknown:
+        return None
+    if kind in ('num_rows', 'num_columns', 'columns') and columns:
+        return None
+
+    lines = []
+    for result in results:
+        if tables and result['file_name'] not in tables:
+            continue
+        if columns and not columns & set(result.get('columns', [])):
+            continue
+        value = result.get(kind)
+        if kind in ('num_rows', 'num_columns'):
+            unit = 'rows' if kind == 'num_rows' else 'columns'
+            lines.append(f"{result['file_name']}: {value} {unit}")
+        elif kind == 'columns':
+            lines.append(f"{result['file_name']}: {', '.join(value or [])}")
+        else:
+            lines.append(f"{result['file_name']}: {format_column_values(value or {}, columns)}")
+    return "\n".join(lines) if lines else None
+
+def data_fingerprint(csv_folder):
+    # Size and mtime of every CSV; any edit gives the cached answers a new key
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(csv_folder)):
+        if name.lower().endswith('.csv'):
+            stat = os.stat(os.path.join(csv_folder, name))
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+def answer_key(question, fingerprint):
+    return hashlib.sha256(f"{fingerprint}\n{normalize_question(question)}".encode()).hexdigest()
+
+def load_answer_cache(csv_folder):
+    path = os.path.join(csv_folder, ANSWER_CACHE_FILE_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Ignoring unreadable answer cache '{path}': {e}")
+        return {}
+
+def save_answer_cache(csv_folder, answers):
+    # Keep only the newest MAX_CACHED_ANSWERS (dicts keep insertion order)
+    while len(answers) > MAX_CACHED_ANSWERS:
+        answers.pop(next(iter(answers)))
+    path = os.path.join(csv_folder, ANSWER_CACHE_FILE_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(answers, f)
+    os.replace(tmp_path, path)
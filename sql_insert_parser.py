@@ -0,0 +1,359 @@
+import os
+import csv
+import re
+from instrumentation import span, file_size
+
+# One token per match: comments, quoted literals, punctuation or a bare word.
+# The closing quote is optional so that a literal cut off at a chunk boundary
+# still matches and can be carried over into the next chunk.
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<fence>```[^\n]*)
+  | (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'(?:[^'\\]|\\.|'')*'?)
+  | (?P<ident>"(?:[^"\\]|\\.|"")*"?|`[^`]*`?|\[[^\]]*\]?)
+  | (?P<punct>[(),;])
+  | (?P<word>[^\s(),;'"`]+)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Whitespace, comments and stray markdown fences from the LLM carry no data
+SKIPPED_TOKENS = ("ws", "fence", "comment")
+
+# Start of the first real statement. LLM output opens with prose ("Thought:
+# I'll write...", "Here's the SQL") whose apostrophes would otherwise be read
+# as the start of a string literal running over the whole script, so
+# tokenizing starts here. The name-then-parenthesis shape keeps prose such as
+# "insert into each table" from matching.
+STATEMENT_START = re.compile(
+    r"""\b(?:CREATE\s+(?:(?:TEMP|TEMPORARY)\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?|INSERT\s+INTO\s+)"""
+    r"""[\w."`\[\]]+\s*\(""",
+    re.IGNORECASE,
+)
+# Longest stretch of text a statement start can span across chunks
+STATEMENT_START_LOOKBACK = 256
+
+ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "0": "\0", "\\": "\\", "'": "'", '"': '"'}
+ESCAPE_PATTERN = re.compile(r"\\(.)|''", re.DOTALL)
+
+def read_sql_chunks(file_path, chunk_size=1 << 20):
+    # Yield a large .sql file piece by piece so it never has to fit in memory
+    with open(file_path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+def skip_preamble(chunks):
+    # Drop everything before the first CREATE TABLE or INSERT INTO
+    # statement, then pass the rest of the chunks through unchanged
+    head = ""
+    chunks = iter(chunks)
+    for chunk in chunks:
+        searched = max(0, len(head) - STATEMENT_START_LOOKBACK)
+        head += chunk
+        match = STATEMENT_START.search(head, searched)
+        if match:
+            yield head[match.start():]
+            yield from chunks
+            return
+
+def iter_sql_tokens(chunks):
+    # Tokenize an iterable of text chunks (a whole string, a file read in
+    # pieces, or LLM output as it streams in) in a single forward pass.
+    if isinstance(chunks, str):
+        chunks = [chunks]
+    chunks = skip_preamble(chunks)
+    carry = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buf = carry + chunk
+        pos = 0
+        end = len(buf)
+        while pos < end:
+            match = TOKEN_PATTERN.match(buf, pos)
+            # A token touching the end of the buffer may continue in the next
+            # chunk (e.g. "12" + "34", or an escaped quote split in half).
+            if match.end() + 1 >= end:
+                break
+            kind = match.lastgroup
+            if kind not in SKIPPED_TOKENS:
+                yield kind, match.group()
+            pos = match.end()
+        carry = buf[pos:]
+    pos = 0
+    while pos < len(carry):
+        match = TOKEN_PATTERN.match(carry, pos)
+        kind = match.lastgroup
+        if kind not in SKIPPED_TOKENS:
+            yield kind, match.group()
+        pos = match.end()
+
+def unquote_identifier(token):
+    if token[:1] in ('"', '`', '[') and len(token) >= 2:
+        return token[1:-1]
+    return token
+
+def unquote_literal(token):
+    body = token[1:-1] if len(token) >= 2 and token.endswith("'") else token[1:]
+    if "\\" not in body and "''" not in body:
+        return body
+    return ESCAPE_PATTERN.sub(lambda m: "'" if m.group(1) is None else ESCAPES.get(m.group(1), m.group(1)), body)
+
+def iter_insert_rows(chunks):
+    # Yield (table_name, columns, values) for every row of every
+    # INSERT INTO ... (cols) VALUES (...), (...); statement in the stream.
+    # Unquoted NULL becomes None; nested parentheses inside a value
+    # (e.g. function calls) are kept verbatim as part of that value.
+    state = "seek"
+    table_name = None
+    columns = []
+    values = []
+    parts = []
+    depth = 0
+
+    for kind, text in iter_sql_tokens(chunks):
+        upper = text.upper() if kind == "word" else None
+
+        if state == "seek":
+            if upper == "INSERT":
+                state = "into"
+            continue
+
+        if state == "into":
+            if upper == "INTO":
+                continue
+            if kind in ("word", "ident"):
+                table_name = unquote_identifier(text.split(".")[-1])
+                columns = []
+                state = "columns_open"
+            else:
+                state = "seek"
+            continue
+
+        if state == "columns_open":
+            if text == "(":
+                state = "columns"
+            else:
+                # INSERT without a column list: nothing to name the CSV header
+                print(f"Skipped INSERT INTO {table_name}: no column list.")
+                state = "seek"
+            continue
+
+        if state == "columns":
+            if text == ")":
+                state = "values_kw"
+            elif kind in ("word", "ident"):
+                columns.append(unquote_identifier(text))
+            continue
+
+        if state == "values_kw":
+            state = "row_open" if upper in ("VALUES", "VALUE") else "seek"
+            continue
+
+        if state == "row_open":
+            if text == "(":
+                state = "row"
+                values = []
+                parts = []
+                depth = 1
+            elif text == ";" or kind == "word":
+                state = "seek"
+            continue
+
+        if state == "row":
+            if depth == 1 and text in (",", ")"):
+                values.append(finish_value(parts))
+                parts = []
+                if text == ")":
+                    yield table_name, columns, values
+                    state = "row_sep"
+                continue
+            if text == "(":
+                depth += 1
+            elif text == ")":
+                depth -= 1
+            parts.append((kind, text))
+            continue
+
+        if state == "row_sep":
+            if text == ",":
+                state = "row_open"
+            else:
+                state = "seek"
+                if upper == "INSERT":
+                    state = "into"
+
+def finish_value(parts):
+    if not parts:
+        return ""
+    if len(parts) == 1:
+        kind, text = parts[0]
+        if kind == "string":
+            return unquote_literal(text)
+        if kind == "ident":
+            return unquote_identifier(text)
+        if text.upper() == "NULL":
+            return None
+        return text
+    # Expressions such as - 5 or DATE('2020-01-01') are written back as SQL
+    out = []
+    for kind, text in parts:
+        if out and text not in (",", ")", "(") and out[-1] not in ("(", "-", "+"):
+            out.append(" ")
+        out.append(text)
+    return "".join(out)
+
+def save_insert_stream_to_csv(chunks, csv_folder, tables=None):
+    # Stream rows straight into <table>_data.csv. Each table's file is opened
+    # on its first row and kept open, so several INSERT statements for the
+    # same table append to one file instead of overwriting each other.
+    # If tables is given, rows for any other table are ignored.
+    os.makedirs(csv_folder, exist_ok=True)
+    wanted = {t.lower() for t in tables} if tables is not None else None
+    handles = {}
+    counts = {}
+    with span('save_insert_stream_to_csv', kind='write', folder=csv_folder) as s:
+        try:
+            write_insert_rows(chunks, csv_folder, wanted, handles, counts)
+        finally:
+            for f, _, _ in handles.values():
+                f.close()
+        s['rows'] = sum(counts.values())
+        s['tables'] = len(counts)
+        s['bytes'] = sum(file_size(filename) or 0 for _, _, filename in handles.values())
+
+    for key, (_, _, filename) in handles.items():
+        print(f"Saved {counts[key]} rows to '{filename}'")
+    return counts
+
+def write_insert_rows(chunks, csv_folder, wanted, handles, counts):
+    for table_name, columns, values in iter_insert_rows(chunks):
+        key = table_name.lower()
+        if wanted is not None and key not in wanted:
+            continue
+        if key not in handles:
+            filename = os.path.join(csv_folder, f"{key}_data.csv")
+            f = open(filename, "w", newline='', encoding="utf-8")
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            handles[key] = (f, writer, filename)
+            counts[key] = 0
+        handles[key][1].writerow(["" if v is None else v for v in values])
+        counts[key] += 1
+
+def iter_create_tables(chunks):
+    # Yield one dict per CREATE TABLE statement in the stream:
+    # {'name', 'columns': [(column, type)], 'primary_key': [...],
+    #  'foreign_keys': [(column, ref_table, ref_column)], 'not_null': [...]}
+    state = "seek"
+    table_name = None
+    items = []
+    item = []
+    depth = 0
+
+    for kind, text in iter_sql_tokens(chunks):
+        upper = text.upper() if kind == "word" else None
+
+        if state == "seek":
+            if upper == "CREATE":
+                state = "table_kw"
+            continue
+
+        if state == "table_kw":
+            if upper == "TABLE":
+                state = "name"
+            elif upper not in ("TEMP", "TEMPORARY", "OR", "REPLACE"):
+                state = "seek"
+            continue
+
+        if state == "name":
+            if upper in ("IF", "NOT", "EXISTS"):
+                continue
+            if kind in ("word", "ident"):
+                table_name = unquote_identifier(text.split(".")[-1])
+                state = "open"
+            else:
+                state = "seek"
+            continue
+
+        if state == "open":
+            if text == "(":
+                state = "body"
+                items = []
+                item = []
+                depth = 1
+            else:
+                state = "seek"
+            continue
+
+        if state == "body":
+            if depth == 1 and text in (",", ")"):
+                if item:
+                    items.append(item)
+                item = []
+                if text == ")":
+                    yield build_table_definition(table_name, items)
+                    state = "seek"
+                continue
+            if text == "(":
+                depth += 1
+            elif text == ")":
+                depth -= 1
+            item.append((kind, text))
+
+def build_table_definition(table_name, items):
+    table = {'name': table_name, 'columns': [], 'primary_key': [],
+             'foreign_keys': [], 'not_null': []}
+    for item in items:
+        words = [text.upper() if kind == "word" else text for kind, text in item]
+        if words[0] == "CONSTRAINT":
+            item, words = item[2:], words[2:]
+            if not item:
+                continue
+        if words[0] == "PRIMARY" and "(" in words:
+            table['primary_key'] = parenthesized_names(item, words.index("("))
+            continue
+        if words[0] == "FOREIGN" and "REFERENCES" in words:
+            ref = words.index("REFERENCES")
+            local_cols = parenthesized_names(item, words.index("("))
+            ref_table = unquote_identifier(item[ref + 1][1].split(".")[-1])
+            ref_cols = parenthesized_names(item, ref + 2) if ref + 2 < len(item) else local_cols
+            table['foreign_keys'].extend((col, ref_table, ref_col) for col, ref_col in zip(local_cols, ref_cols))
+            continue
+        if words[0] in ("UNIQUE", "KEY", "INDEX", "CHECK"):
+            continue
+
+        # Column definition: name, type (with optional size), then constraints
+        column = unquote_identifier(item[0][1])
+        col_type = item[1][1] if len(item) > 1 else ""
+        pos = 2
+        if pos < len(item) and item[pos][1] == "(":
+            close = words.index(")", pos)
+            col_type += "(" + ",".join(text for _, text in item[pos + 1:close] if text != ",") + ")"
+            pos = close + 1
+        table['columns'].append((column, col_type.upper()))
+        rest = words[pos:]
+        if "PRIMARY" in rest:
+            table['primary_key'] = [column]
+        if "NOT" in rest and rest[rest.index("NOT") + 1:rest.index("NOT") + 2] == ["NULL"]:
+            table['not_null'].append(column)
+        if "REFERENCES" in rest:
+            ref = pos + rest.index("REFERENCES")
+            ref_table = unquote_identifier(item[ref + 1][1].split(".")[-1])
+            ref_cols = parenthesized_names(item, ref + 2) if ref + 2 < len(item) else [column]
+            table['foreign_keys'].append((column, ref_table, ref_cols[0]))
+    return table
+
+def parenthesized_names(item, open_pos):
+    names = []
+    for kind, text in item[open_pos + 1:]:
+        if text == ")":
+            break
+        if kind in ("word", "ident"):
+            names.append(unquote_identifier(text))
+    return names
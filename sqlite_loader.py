@@ -0,0 +1,185 @@
+import os
+import csv
+import sqlite3
+from sql_insert_parser import iter_create_tables, read_sql_chunks
+
+CSV_FOLDER = r"D:\LangChain\Internship_Pune_TCS\Industry Level Data Handling\Industry-Sub_domain Data"
+DB_FILE_NAME = "industry_data.sqlite"
+SQL_FILE_NAME = "create_insert_statements.sql"
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def sqlite_type(col_type):
+    # Map generator DDL types onto SQLite affinities
+    base = col_type.split("(")[0].upper()
+    if "INT" in base or base in ("SERIAL", "BOOL", "BOOLEAN", "BIT"):
+        return "INTEGER"
+    if base in ("DECIMAL", "NUMERIC", "FLOAT", "DOUBLE", "REAL", "MONEY"):
+        return "REAL"
+    return "TEXT"
+
+def infer_csv_table(csv_path, sample_rows=1000):
+    # No DDL for this file: guess each column's affinity from a sample
+    with open(csv_path, "r", newline='', encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        kinds = ["INTEGER"] * len(header)
+        for i, row in enumerate(reader):
+            if i >= sample_rows:
+                break
+            for j, value in enumerate(row[:len(header)]):
+                if value == "" or kinds[j] == "TEXT":
+                    continue
+                try:
+                    int(value)
+                except ValueError:
+                    try:
+                        float(value)
+                        kinds[j] = "REAL"
+                    except ValueError:
+                        kinds[j] = "TEXT"
+    return {'columns': list(zip(header, kinds)), 'primary_key': [], 'foreign_keys': []}
+
+def create_table(conn, table_name, table):
+    # Constraints are left out on purpose: keys become indexes only after
+    # the bulk load (see create_indexes), which is much faster than
+    # maintaining a B-tree on every insert.
+    columns = ", ".join(f"{quote(col)} {sqlite_type(col_type)}" for col, col_type in table['columns'])
+    conn.execute(f"DROP TABLE IF EXISTS {quote(table_name)}")
+    conn.execute(f"CREATE TABLE {quote(table_name)} ({columns})")
+
+def create_indexes(conn, table_name, table):
+    if table['primary_key']:
+        cols = ", ".join(quote(c) for c in table['primary_key'])
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {quote(f'pk_{table_name}')} "
+                     f"ON {quote(table_name)} ({cols})")
+    for col, _, _ in table['foreign_keys']:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {quote(f'fk_{table_name}_{col}')} "
+                     f"ON {quote(table_name)} ({quote(col)})")
+
+def bulk_insert_csv(conn, table_name, csv_path, batch_size=50_000):
+    with open(csv_path, "r", newline='', encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return 0
+        width = len(header)
+        placeholders = ", ".join("?" * width)
+        columns = ", ".join(quote(c) for c in header)
+        statement = f"INSERT INTO {quote(table_name)} ({columns}) VALUES ({placeholders})"
+        total = 0
+        batch = []
+        for row in reader:
+            # Empty CSV cells are NULLs; short rows are padded
+            batch.append([v if v != "" else None for v in row[:width]] + [None] * (width - len(row)))
+            if len(batch) >= batch_size:
+                conn.executemany(statement, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            conn.executemany(statement, batch)
+            total += len(batch)
+    return total
+
+def load_folder_into_sqlite(csv_folder, db_path=None, batch_size=50_000):
+    # Create every table (from create_insert_statements.sql when present,
+    # otherwise from the CSV header), bulk-load all CSVs inside a single
+    # transaction, then build primary/foreign key indexes.
+    db_path = db_path or os.path.join(csv_folder, DB_FILE_NAME)
+    sql_path = os.path.join(csv_folder, SQL_FILE_NAME)
+    ddl = {}
+    if os.path.exists(sql_path):
+        ddl = {t['name'].lower(): t for t in iter_create_tables(read_sql_chunks(sql_path))}
+
+    csv_files = sorted(f for f in os.listdir(csv_folder) if f.lower().endswith('.csv'))
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    # The database can be rebuilt from the CSVs, so trade durability for
+    # speed; the journal stays (in memory) so a failed load still rolls back
+    conn.execute("PRAGMA journal_mode=MEMORY")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-200000")
+    loaded = {}
+    try:
+        conn.execute("BEGIN")
+        tables = {}
+        for fname in csv_files:
+            path = os.path.join(csv_folder, fname)
+            stem = os.path.splitext(fname)[0]
+            table_name = stem[:-len("_data")] if stem.lower().endswith("_data") else stem
+            table = ddl.get(table_name.lower())
+            with open(path, "r", newline='', encoding="utf-8") as f:
+                header = next(csv.reader(f), [])
+            if table is None or [c.lower() for c, _ in table['columns']] != [h.lower() for h in header]:
+                # The CSV was edited since the DDL was written (e.g. renamed
+                # columns); trust the file and keep only still-valid keys.
+                inferred = infer_csv_table(path)
+                if table is not None:
+                    names = {h.lower() for h in header}
+                    if all(c.lower() in names for c in table['primary_key']):
+                        inferred['primary_key'] = table['primary_key']
+                    inferred['foreign_keys'] = [fk for fk in table['foreign_keys'] if fk[0].lower() in names]
+                table = inferred
+            create_table(conn, table_name, table)
+            loaded[table_name] = bulk_insert_csv(conn, table_name, path, batch_size)
+            tables[table_name] = table
+        for table_name, table in tables.items():
+            try:
+                create_indexes(conn, table_name, table)
+            except sqlite3.IntegrityError as e:
+                print(f"Could not create key index on '{table_name}': {e}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    for table_name, n in loaded.items():
+        print(f"Loaded {n} rows into '{table_name}'")
+    print(f"Database written to '{db_path}'")
+    return loaded
+
+def export_sqlite_to_csv(db_path, csv_folder, tables=None, batch_size=50_000):
+    # Write tables back out as <table>_data.csv, streaming rows in batches
+    os.makedirs(csv_folder, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    exported = {}
+    try:
+        if tables is None:
+            tables = [r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        for table_name in tables:
+            cursor = conn.execute(f"SELECT * FROM {quote(table_name)}")
+            filename = os.path.join(csv_folder, f"{table_name.lower()}_data.csv")
+            total = 0
+            with open(filename, "w", newline='', encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow([d[0] for d in cursor.description])
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    writer.writerows(rows)
+                    total += len(rows)
+            exported[table_name] = total
+            print(f"Exported {total} rows to '{filename}'")
+    finally:
+        conn.close()
+    return exported
+
+def open_database(db_path):
+    # Read-side helper for the audit and modification agents
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA query_only=ON")
+    return conn
+
+if __name__ == "__main__":
+    choice = input("Enter 1 to load the CSV folder into SQLite, 2 to export SQLite back to CSV: ").strip()
+    db_file = os.path.join(CSV_FOLDER, DB_FILE_NAME)
+    if choice == "1":
+        load_folder_into_sqlite(CSV_FOLDER, db_file)
+    elif choice == "2":
+        export_sqlite_to_csv(db_file, CSV_FOLDER)
+    else:
+        print("Invalid input. Please enter 1 or 2.")
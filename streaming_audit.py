@@ -0,0 +1,220 @@
+import os
+import math
+import numpy as np
+import pandas as pd
+from date_inference import looks_like_dates, parse_date_column, winning_format
+from instrumentation import span, file_size
+from outlier_engine import DEFAULT_METHOD, OUTLIER_METHODS, MAD_SCALE, column_settings
+
+DEFAULT_CHUNK_SIZE = 200_000
+MAX_OUTLIERS_PER_COLUMN = 1000
+MIN_DATE = pd.Timestamp('1900-01-01')
+MAX_DATE = pd.Timestamp('2100-01-01')
+
+# Quantile sketch (DDSketch-style): values fall into logarithmic buckets whose
+# width guarantees every quantile within relative_accuracy of the true value.
+# Sketches are plain dicts of bucket counts, so they merge by addition and
+# serialize to JSON as-is.
+def new_sketch(relative_accuracy=0.01):
+    gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+    return {'gamma': gamma, 'count': 0, 'zero': 0, 'pos': {}, 'neg': {},
+            'min': None, 'max': None}
+
+def sketch_add(sketch, values):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return sketch
+    log_gamma = math.log(sketch['gamma'])
+    for key, part in (('pos', values[values > 0]), ('neg', -values[values < 0])):
+        if len(part):
+            buckets, counts = np.unique(np.ceil(np.log(part) / log_gamma).astype(np.int64), return_counts=True)
+            store = sketch[key]
+            if store and isinstance(next(iter(store)), str):
+                store = sketch[key] = {int(k): v for k, v in store.items()}
+            for b, c in zip(buckets.tolist(), counts.tolist()):
+                store[b] = store.get(b, 0) + c
+    sketch['zero'] += int((values == 0).sum())
+    sketch['count'] += len(values)
+    low, high = float(values.min()), float(values.max())
+    sketch['min'] = low if sketch['min'] is None else min(sketch['min'], low)
+    sketch['max'] = high if sketch['max'] is None else max(sketch['max'], high)
+    return sketch
+
+def sketch_merge(a, b):
+    merged = new_sketch()
+    merged['gamma'] = a['gamma']
+    for key in ('pos', 'neg'):
+        store = {int(k): v for k, v in a[key].items()}
+        for k, v in b[key].items():
+            store[int(k)] = store.get(int(k), 0) + v
+        merged[key] = store
+    merged['zero'] = a['zero'] + b['zero']
+    merged['count'] = a['count'] + b['count']
+    mins = [m for m in (a['min'], b['min']) if m is not None]
+    maxs = [m for m in (a['max'], b['max']) if m is not None]
+    merged['min'] = min(mins) if mins else None
+    merged['max'] = max(maxs) if maxs else None
+    return merged
+
+def sketch_quantile(sketch, q):
+    if not sketch['count']:
+        return float('nan')
+    rank = q * (sketch['count'] - 1)
+    gamma = sketch['gamma']
+    # JSON round-trips turn bucket keys into strings
+    neg = {int(k): v for k, v in sketch['neg'].items()}
+    pos = {int(k): v for k, v in sketch['pos'].items()}
+    seen = 0
+    # Walk buckets from the most negative value upwards
+    for b in sorted(neg, reverse=True):
+        seen += neg[b]
+        if seen > rank:
+            return min(max(-2 * gamma ** b / (gamma + 1), sketch['min']), sketch['max'])
+    seen += sketch['zero']
+    if seen > rank:
+        return 0.0
+    for b in sorted(pos):
+        seen += pos[b]
+        if seen > rank:
+            return min(max(2 * gamma ** b / (gamma + 1), sketch['min']), sketch['max'])
+    return sketch['max']
+
+def iqr_bounds(sketch, k=OUTLIER_METHODS['iqr']):
+    q1, q3 = sketch_quantile(sketch, 0.25), sketch_quantile(sketch, 0.75)
+    iqr = q3 - q1
+    return q1 - k * iqr, q3 + k * iqr
+
+def sketch_bounds(sketch, method, threshold, deviations=None):
+    # Same bounds as outlier_engine.batch_bounds, from sketches; 'mad' also
+    # needs a sketch of |x - median| (see stream_bounds)
+    if method == 'iqr':
+        return iqr_bounds(sketch, threshold)
+    if method == 'percentile':
+        return sketch_quantile(sketch, threshold), sketch_quantile(sketch, 1 - threshold)
+    if method == 'mad':
+        median = sketch_quantile(sketch, 0.5)
+        half_width = threshold * sketch_quantile(deviations, 0.5) / MAD_SCALE
+        return median - half_width, median + half_width
+    raise ValueError(f"Unknown outlier method '{method}'. Choose from {', '.join(OUTLIER_METHODS)}")
+
+def stream_bounds(file_path, sketches, method=DEFAULT_METHOD, overrides=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    # {column: (lower, upper)} for the configured outlier method of every
+    # sketched column. MAD columns take one extra pass over just those
+    # columns to sketch the deviations from their median.
+    columns = [col for col, sketch in sketches.items() if sketch['count']]
+    settings = dict(zip(columns, column_settings(columns, method, None, overrides)))
+    mad_columns = [col for col in columns if settings[col][0] == 'mad']
+    deviations = {}
+    if mad_columns:
+        medians = {col: sketch_quantile(sketches[col], 0.5) for col in mad_columns}
+        deviations = {col: new_sketch() for col in mad_columns}
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size, usecols=mad_columns):
+            for col in mad_columns:
+                values = chunk[col].to_numpy(dtype=float, na_value=np.nan)
+                sketch_add(deviations[col], np.abs(values - medians[col]))
+    return {col: sketch_bounds(sketches[col], *settings[col], deviations.get(col)) for col in columns}
+
+def new_audit_state():
+    # Everything the streaming audit accumulates; JSON-serializable so the
+    # audit cache can persist it and later fold appended rows into it.
+    return {'num_rows': 0, 'columns': None, 'missing': {}, 'sketches': {},
+            'non_numeric': [], 'date_columns': {}, 'date_formats': {},
+            'date_outliers': {}, 'suspicious': {}}
+
+def update_audit_state(state, chunk, suspicious_list, max_outliers=MAX_OUTLIERS_PER_COLUMN):
+    if state['columns'] is None:
+        state['columns'] = list(chunk.columns)
+    state['num_rows'] += len(chunk)
+    missing = state['missing']
+    for col, n in chunk.isnull().sum().items():
+        if n:
+            missing[col] = missing.get(col, 0) + int(n)
+
+    sketches = state['sketches']
+    non_numeric = state['non_numeric']
+    for col in chunk.columns:
+        series = chunk[col]
+        if pd.api.types.is_numeric_dtype(series) and col not in non_numeric:
+            sketch_add(sketches.setdefault(col, new_sketch()), series.to_numpy(dtype=float, na_value=np.nan))
+            continue
+        # One non-numeric chunk makes the whole column text, as it would
+        # be for a full pd.read_csv
+        if col not in non_numeric:
+            non_numeric.append(col)
+        sketches.pop(col, None)
+
+        if col not in state['date_columns']:
+            state['date_columns'][col] = bool(looks_like_dates(series))
+        if state['date_columns'][col]:
+            dates, report = parse_date_column(series)
+            counts = state['date_formats'].setdefault(col, {})
+            for fmt, n in report.items():
+                counts[fmt] = counts.get(fmt, 0) + n
+            odd = dates[(dates < MIN_DATE) | (dates > MAX_DATE)]
+            kept = state['date_outliers'].setdefault(col, [])
+            if len(kept) < max_outliers:
+                kept.extend(odd.dt.strftime('%Y-%m-%d').head(max_outliers - len(kept)).tolist())
+
+        values = series[series.isin(suspicious_list)].dropna().unique().tolist()
+        if values:
+            seen = state['suspicious'].setdefault(col, [])
+            seen.extend(v for v in values if v not in seen)
+    return state
+
+def collect_numeric_outliers(file_path, bounds, chunk_size=DEFAULT_CHUNK_SIZE,
+                             max_outliers=MAX_OUTLIERS_PER_COLUMN):
+    # Bounded second pass over just the numeric columns
+    outliers = {}
+    numeric_cols = list(bounds)
+    for chunk in pd.read_csv(file_path, chunksize=chunk_size, usecols=numeric_cols):
+        for col in numeric_cols:
+            kept = outliers.setdefault(col, [])
+            if len(kept) >= max_outliers:
+                continue
+            lower, upper = bounds[col]
+            values = chunk[col]
+            kept.extend(values[(values < lower) | (values > upper)].head(max_outliers - len(kept)).tolist())
+    return {col: vals for col, vals in outliers.items() if vals}
+
+def audit_state_result(state, file_path, numeric_outliers, bounds):
+    outliers = {col: vals for col, vals in state['date_outliers'].items() if vals}
+    outliers.update(numeric_outliers)
+    columns = state['columns'] or []
+    return {
+        'file_name': os.path.basename(file_path),
+        'num_rows': state['num_rows'],
+        'num_columns': len(columns),
+        'columns': columns,
+        'missing_data': dict(state['missing']),
+        'outliers': outliers,
+        'date_formats': {col: winning_format(report) for col, report in state['date_formats'].items()},
+        'suspicious_values': {col: list(vals) for col, vals in state['suspicious'].items()},
+        'outlier_bounds': {col: [float(lo), float(hi)] for col, (lo, hi) in bounds.items()},
+        'streamed': True,
+    }
+
+def analyze_csv_file_streaming(file_path, suspicious_list, chunk_size=DEFAULT_CHUNK_SIZE,
+                               collect_outliers=True, max_outliers=MAX_OUTLIERS_PER_COLUMN,
+                               usecols=None, keep_state=False, method=DEFAULT_METHOD, overrides=None):
+    # Same result shape as analyze_csv_file, computed chunk by chunk so peak
+    # memory depends on chunk_size only. Numeric bounds for the outlier
+    # method (and per-column overrides) come from quantile sketches; the
+    # optional second pass collects up to max_outliers actual outlier values
+    # per column. keep_state adds the raw running state under '_state' for
+    # the audit cache.
+    state = new_audit_state()
+    with span('analyze_csv_file_streaming', file=os.path.basename(file_path), bytes=file_size(file_path)) as s:
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size, usecols=usecols):
+            update_audit_state(state, chunk, suspicious_list, max_outliers)
+
+        bounds = stream_bounds(file_path, state['sketches'], method, overrides, chunk_size)
+        numeric_outliers = {}
+        if collect_outliers and bounds:
+            numeric_outliers = collect_numeric_outliers(file_path, bounds, chunk_size, max_outliers)
+        s['rows'] = state['num_rows']
+
+    result = audit_state_result(state, file_path, numeric_outliers, bounds)
+    if keep_state:
+        result['_state'] = state
+    return result
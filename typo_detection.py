@@ -0,0 +1,112 @@
+import os
+from collections import defaultdict
+import numpy as np
+
+# Placeholder values the audit reports as suspicious. Extra entries can be
+# listed one per line in a file named by AUDIT_SENTINELS_FILE.
+DEFAULT_SENTINELS = ['Unknown', 'unknown', 'XX', 'NULL', 'null', None]
+NGRAM = 3
+MIN_VALUE_LENGTH = 4
+# A value is a typo candidate when a value at most max_distance edits away
+# occurs at least PARENT_RATIO times as often (and at least MIN_PARENT_COUNT
+# times). Unique-per-row columns such as names therefore flag nothing.
+PARENT_RATIO = 3
+MIN_PARENT_COUNT = 2
+
+def load_sentinels(path=None):
+    path = path or os.getenv("AUDIT_SENTINELS_FILE")
+    sentinels = list(DEFAULT_SENTINELS)
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                sentinels.extend(line.strip() for line in f if line.strip() and line.strip() not in sentinels)
+        except OSError as e:
+            print(f"Could not read sentinel file '{path}': {e}")
+    return sentinels
+
+def ngrams(value):
+    padded = f"{' ' * (NGRAM - 1)}{value.lower()}{' ' * (NGRAM - 1)}"
+    return [padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)]
+
+def allowed_distance(value):
+    # One edit for short words, two from ten characters up
+    return 1 if len(value) < 10 else 2
+
+def bounded_levenshtein(a, b, limit):
+    # Edit distance, or limit + 1 as soon as it is certain to exceed limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+def build_ngram_index(values):
+    index = defaultdict(list)
+    for i, value in enumerate(values):
+        for gram in set(ngrams(value)):
+            index[gram].append(i)
+    return index
+
+def find_typo_variants(series, max_results=100):
+    # Returns {rare_value: likely_intended_value}. Only the frequent values
+    # are indexed. By the q-gram lemma k edits destroy at most k*NGRAM
+    # grams, so a true match must share one of the value's k*NGRAM + 1
+    # rarest grams; only those short posting lists are looked up, and there
+    # is no all-pairs comparison even with 100k+ distinct values.
+    counts = series.dropna().astype(str).value_counts()
+    # Codes and dates legitimately differ by a single digit, so values with
+    # digits are left out
+    text = counts.index.to_series()
+    counts = counts[(text.str.len() >= MIN_VALUE_LENGTH).to_numpy() & ~text.str.contains(r"\d").to_numpy()]
+    parents = counts[counts >= MIN_PARENT_COUNT]
+    if parents.empty or len(counts) < 2:
+        return {}
+    # value_counts is sorted, so eligible parents are always a prefix
+    parent_values = parents.index.tolist()
+    parent_counts = parents.tolist()
+    descending = -parents.to_numpy()
+    parent_grams = [set(ngrams(v)) for v in parent_values]
+    index = build_ngram_index(parent_values)
+
+    found = {}
+    for value, count in counts.items():
+        eligible = int(np.searchsorted(descending, -max(PARENT_RATIO * count, MIN_PARENT_COUNT), side='right'))
+        if not eligible:
+            continue
+        limit = allowed_distance(value)
+        grams = set(ngrams(value))
+        needed = len(grams) - limit * NGRAM
+        grams = sorted(grams, key=lambda g: len(index.get(g, ())))
+        candidates = set()
+        for gram in grams[:limit * NGRAM + 1]:
+            candidates.update(i for i in index.get(gram, ()) if i < eligible)
+        best = None
+        lowered = value.lower()
+        for i in candidates:
+            candidate = parent_values[i]
+            if candidate == value or len(parent_grams[i].intersection(grams)) < needed:
+                continue
+            distance = bounded_levenshtein(lowered, candidate.lower(), limit)
+            if distance <= limit and (best is None or (distance, -parent_counts[i]) < best[:2]):
+                best = (distance, -parent_counts[i], candidate)
+        if best:
+            found[value] = best[2]
+            if len(found) >= max_results:
+                break
+    return found
+
+def find_typos(df, columns=None):
+    # {column: {variant: likely value}} over the text columns of df
+    columns = columns if columns is not None else df.select_dtypes(include=['object', 'string', 'category']).columns
+    typos = {}
+    for col in columns:
+        variants = find_typo_variants(df[col])
+        if variants:
+            typos[col] = variants
+    return typos
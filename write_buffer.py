@@ -0,0 +1,211 @@
+import os
+import shutil
+import itertools
+import tempfile
+import pandas as pd
+from instrumentation import span, file_size
+
+# Session-level write buffer for the modification agent. Edits stay in
+# memory and the CSV is only rewritten on commit, via a temp file in the
+# same directory and an atomic rename, so a crash leaves either the old or
+# the new file, never half of one. Every edit is journaled as a diff
+# (renamed/added/removed columns, added/removed rows, changed cells) so it
+# can be undone or replayed without keeping a full copy per edit.
+#
+# Working frames are handed out as shallow copies where copy-on-write is on
+# (always from pandas 3), which turns them into private copies only for the
+# columns that actually get modified; older pandas gets a deep copy, since
+# the process-wide option is left as the caller set it.
+PANDAS_MAJOR = int(pd.__version__.split('.')[0])
+
+_versions = itertools.count(1)
+
+def open_buffer(file_path, df):
+    return {'path': file_path, 'df': df, 'journal': [], 'undone': [], 'version': 0, 'saved_version': 0}
+
+def copy_on_write():
+    return PANDAS_MAJOR >= 3 or pd.get_option('mode.copy_on_write') is True
+
+def working_frame(buffer):
+    # A frame an edit (or the agent) can change freely without touching the
+    # buffered one until record_edit() is called
+    return buffer['df'].copy(deep=not copy_on_write())
+
+def is_dirty(buffer):
+    return buffer['version'] != buffer['saved_version']
+
+def changed_cells(before, after, rows):
+    # {column: (row labels, old values, new values)} for columns present on
+    # both sides with the same dtype, compared on the shared rows
+    cells = {}
+    same_rows = before.index.equals(rows) and after.index.equals(rows)
+    for col in after.columns:
+        if col not in before.columns or before[col].dtype != after[col].dtype:
+            continue
+        old = before[col] if same_rows else before[col].reindex(rows)
+        new = after[col] if same_rows else after[col].reindex(rows)
+        equal = (old == new).fillna(False).astype(bool) | (old.isna() & new.isna())
+        if not equal.all():
+            labels = rows[~equal.to_numpy()]
+            cells[col] = (labels, old.loc[labels].to_numpy(), new.loc[labels].to_numpy())
+    return cells
+
+def diff_frames(before, after):
+    # Journal entry turning before into after, or None when nothing changed
+    if before is after:
+        return None
+    if not (before.index.is_unique and after.index.is_unique
+            and before.columns.is_unique and after.columns.is_unique):
+        # Without unique labels rows and columns cannot be matched up
+        return {'kind': 'snapshot', 'before': before, 'after': after,
+                'summary': 'whole frame replaced'}
+
+    # A column that kept its position and values under a new name is a rename
+    renamed = {}
+    if len(before.columns) == len(after.columns):
+        for old, new in zip(before.columns, after.columns):
+            if (old != new and old not in after.columns and new not in before.columns
+                    and before[old].dtype == after[new].dtype
+                    and before.index.equals(after.index) and before[old].equals(after[new])):
+                renamed[old] = new
+    renamed_before = before.rename(columns=renamed) if renamed else before
+
+    removed_labels = before.index.difference(after.index, sort=False)
+    added_labels = after.index.difference(before.index, sort=False)
+    rows = after.index.difference(added_labels, sort=False) if len(added_labels) else after.index
+    removed_columns = [c for c in renamed_before.columns if c not in after.columns]
+    added_columns = [c for c in after.columns if c not in renamed_before.columns]
+    retyped = [c for c in after.columns if c in renamed_before.columns
+               and renamed_before[c].dtype != after[c].dtype]
+
+    entry = {
+        'kind': 'diff',
+        'renamed': renamed,
+        'columns_before': list(before.columns), 'columns_after': list(after.columns),
+        'index_before': before.index, 'index_after': after.index,
+        'removed_rows': renamed_before.loc[removed_labels] if len(removed_labels) else None,
+        'added_rows': after.loc[added_labels] if len(added_labels) else None,
+        'removed_columns': {c: renamed_before[c] for c in removed_columns + retyped},
+        'added_columns': {c: after[c] for c in added_columns + retyped},
+        'cells': changed_cells(renamed_before, after, rows),
+    }
+    reordered = (not entry['cells'] and not renamed and not removed_columns and not added_columns
+                 and not retyped and not len(removed_labels) and not len(added_labels))
+    if reordered and before.index.equals(after.index) and list(before.columns) == list(after.columns):
+        return None
+    entry['summary'] = describe_entry(entry)
+    return entry
+
+def describe_entry(entry):
+    parts = []
+    cells = sum(len(labels) for labels, _, _ in entry['cells'].values())
+    if cells:
+        parts.append(f"{cells} cells changed")
+    for name, key in (('rows removed', 'removed_rows'), ('rows added', 'added_rows')):
+        if entry[key] is not None:
+            parts.append(f"{len(entry[key])} {name}")
+    retyped = set(entry['removed_columns']) & set(entry['added_columns'])
+    if entry['renamed']:
+        parts.append(f"{len(entry['renamed'])} columns renamed")
+    if retyped:
+        parts.append(f"{len(retyped)} columns retyped")
+    if len(entry['removed_columns']) > len(retyped):
+        parts.append(f"{len(entry['removed_columns']) - len(retyped)} columns removed")
+    if len(entry['added_columns']) > len(retyped):
+        parts.append(f"{len(entry['added_columns']) - len(retyped)} columns added")
+    return ", ".join(parts) or "rows or columns reordered"
+
+def apply_entry(df, entry, forward=True):
+    # Replay an entry (forward) or undo it (forward=False) on df. Cells,
+    # rows and columns in the entry use the post-rename column names.
+    if entry['kind'] == 'snapshot':
+        return entry['after' if forward else 'before']
+    renamed = entry['renamed']
+    if forward:
+        df = df.rename(columns=renamed) if renamed else df
+        columns, index = entry['columns_after'], entry['index_after']
+        extra_rows, extra_columns, value_at = entry['added_rows'], entry['added_columns'], 2
+    else:
+        columns = [renamed.get(c, c) for c in entry['columns_before']]
+        index = entry['index_before']
+        extra_rows, extra_columns, value_at = entry['removed_rows'], entry['removed_columns'], 1
+
+    shared_rows = index.difference(extra_rows.index, sort=False) if extra_rows is not None else index
+    df = df.loc[shared_rows, [c for c in columns if c not in extra_columns]]
+    for col, values in entry['cells'].items():
+        df.loc[values[0], col] = values[value_at]
+    for col, series in extra_columns.items():
+        df[col] = series
+    if extra_rows is not None:
+        df = pd.concat([df, extra_rows[columns]])
+    df = df.loc[index, columns]
+    if not forward and renamed:
+        df = df.rename(columns={new: old for old, new in renamed.items()})
+    return df
+
+def record_edit(buffer, df, label):
+    # Make df the buffered frame and journal what changed; returns the
+    # entry, or None when df is unchanged
+    entry = diff_frames(buffer['df'], df)
+    if entry is None:
+        return None
+    entry['label'] = label
+    entry['version'] = next(_versions)
+    entry['parent_version'] = buffer['version']
+    buffer['journal'].append(entry)
+    buffer['undone'].clear()
+    buffer['df'] = df
+    buffer['version'] = entry['version']
+    return entry
+
+def undo(buffer):
+    if not buffer['journal']:
+        return None
+    entry = buffer['journal'].pop()
+    buffer['df'] = apply_entry(buffer['df'], entry, forward=False)
+    buffer['version'] = entry['parent_version']
+    buffer['undone'].append(entry)
+    return entry
+
+def redo(buffer):
+    if not buffer['undone']:
+        return None
+    entry = buffer['undone'].pop()
+    buffer['df'] = apply_entry(buffer['df'], entry, forward=True)
+    buffer['version'] = entry['version']
+    buffer['journal'].append(entry)
+    return entry
+
+def replay(df, journal):
+    # Re-apply journaled edits to a freshly loaded copy of the same file
+    for entry in journal:
+        df = apply_entry(df, entry, forward=True)
+    return df
+
+def atomic_write_csv(df, file_path):
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            df.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(file_path):
+            # mkstemp files are private (0600); keep the CSV's own permissions
+            shutil.copymode(file_path, temp_path)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def commit(buffer):
+    # Write the buffered frame if it changed since the last commit; returns
+    # True when the file was written
+    if not is_dirty(buffer):
+        return False
+    with span('write_csv', kind='write', file=os.path.basename(buffer['path']), rows=len(buffer['df'])) as s:
+        atomic_write_csv(buffer['df'], buffer['path'])
+        s['bytes'] = file_size(buffer['path'])
+    buffer['saved_version'] = buffer['version']
+    return True